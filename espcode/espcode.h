@@ -39,6 +39,17 @@ unsigned long reading_start_time = 0;  // PERBAIKAN: Tambah untuk reset waktu se
 bool isReading = false;  // PERBAIKAN: Mulai dengan false, tunggu command dari Python
 unsigned long sensorInterval = 100; // PERBAIKAN: Ubah ke 100ms untuk realtime
 
+// Mode payload biner: N sampel (timestamp, distance) per pesan MQTT
+// Layout (little-endian): "KR" | versi u8 | panjang ID u8 | jumlah u16 | ID | N x (f32 timestamp, f32 distance)
+const char* device_id = "ESP32_HCSR04";
+const uint8_t BINARY_VERSION = 1;
+const uint8_t MAX_BATCH = 32;
+bool binaryMode = false;       // diaktifkan dengan perintah "FORMAT:BINARY[:N]"
+uint8_t batchSize = 10;
+uint8_t batchCount = 0;
+float batchTimestamps[MAX_BATCH];
+float batchDistances[MAX_BATCH];
+
 // Improved HC-SR04 reading dengan filtering
 long readDistance() {
   digitalWrite(TRIG_PIN, LOW);
@@ -58,6 +69,40 @@ long readDistance() {
   return distance;
 }
 
+// Kirim sampel yang terkumpul sebagai satu frame biner
+void publishBinaryBatch() {
+  if (batchCount == 0) return;
+  if (!client.connected()) {
+    batchCount = 0;  // buang batch agar buffer tidak meluap
+    return;
+  }
+
+  uint8_t idLen = strlen(device_id);
+  uint8_t frame[6 + 255 + MAX_BATCH * 8];
+  size_t pos = 0;
+  frame[pos++] = 'K';
+  frame[pos++] = 'R';
+  frame[pos++] = BINARY_VERSION;
+  frame[pos++] = idLen;
+  frame[pos++] = batchCount & 0xFF;
+  frame[pos++] = (batchCount >> 8) & 0xFF;
+  memcpy(frame + pos, device_id, idLen);
+  pos += idLen;
+  for (uint8_t i = 0; i < batchCount; i++) {
+    // ESP8266/ESP32 little-endian dan float IEEE-754, jadi bisa disalin langsung
+    memcpy(frame + pos, &batchTimestamps[i], 4);
+    memcpy(frame + pos + 4, &batchDistances[i], 4);
+    pos += 8;
+  }
+
+  if (client.publish(mqtt_topic, frame, pos)) {
+    Serial.println("Published binary batch: " + String(batchCount) + " samples");
+  } else {
+    Serial.println("Failed to publish binary batch");
+  }
+  batchCount = 0;
+}
+
 void setup_wifi() {
   delay(10);
   WiFi.mode(WIFI_STA);
@@ -111,7 +156,7 @@ void callback(char* topic, byte* payload, unsigned int length) {
       JsonDocument doc;
       doc["timestamp"] = (millis() - reading_start_time) / 1000.0;  // PERBAIKAN: Gunakan reading_start_time
       doc["distance"] = distance;
-      doc["device"] = "ESP8266_HCSR04";
+      doc["device"] = device_id;  // ID yang sama dengan data streaming (satu sesi per alat)
       doc["command_response"] = true;
       
       String jsonString;
@@ -126,8 +171,24 @@ void callback(char* topic, byte* payload, unsigned int length) {
   }
   else if (message == "STOP_READING") {
     isReading = false;
+    publishBinaryBatch();  // kirim sisa sampel di buffer
     Serial.println("Stopped continuous reading");
   }
+  else if (message.startsWith("FORMAT:BINARY")) {
+    // Command untuk payload biner: "FORMAT:BINARY" atau "FORMAT:BINARY:20"
+    int newBatch = message.length() > 14 ? message.substring(14).toInt() : batchSize;
+    if (newBatch >= 1 && newBatch <= MAX_BATCH) {
+      publishBinaryBatch();
+      batchSize = newBatch;
+      binaryMode = true;
+      Serial.println("Binary format enabled, batch size: " + String(batchSize));
+    }
+  }
+  else if (message == "FORMAT:JSON") {
+    publishBinaryBatch();
+    binaryMode = false;
+    Serial.println("JSON format enabled");
+  }
   else if (message.startsWith("INTERVAL:")) {
     // Command untuk ubah interval: "INTERVAL:100"
     int newInterval = message.substring(9).toInt();
@@ -195,6 +256,7 @@ void setup() {
   
   client.setServer(mqtt_server, mqtt_port);
   client.setCallback(callback);
+  client.setBufferSize(512);  // cukup untuk frame biner MAX_BATCH sampel
   
   Serial.println("System initialized");
   Serial.println("Program start time: " + String(program_start_time));
@@ -215,12 +277,20 @@ void loop() {
     
     long distance = readDistance();
     
-    if (distance > 0 && client.connected()) {
+    if (binaryMode && distance > 0) {
+      // Mode biner: kumpulkan sampel, kirim saat batch penuh
+      batchTimestamps[batchCount] = (now - reading_start_time) / 1000.0;
+      batchDistances[batchCount] = distance;
+      batchCount++;
+      if (batchCount >= batchSize) {
+        publishBinaryBatch();
+      }
+    } else if (distance > 0 && client.connected()) {
       // PERBAIKAN: Format JSON yang sesuai dengan Python, timestamp dari reading_start_time
       JsonDocument doc;
       doc["timestamp"] = (now - reading_start_time) / 1000.0;  // PERBAIKAN: Timestamp dari 0 setiap START_READING
       doc["distance"] = distance;
-      doc["device"] = "ESP32_HCSR04";
+      doc["device"] = device_id;
       doc["uptime"] = now;
       doc["reading_time"] = (now - reading_start_time) / 1000.0;  // PERBAIKAN: Tambah info waktu pembacaan
       
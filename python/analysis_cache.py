@@ -0,0 +1,42 @@
+"""Cache hasil analisis turunan per sesi perangkat.
+
+Grafik, panel analisis dan perhitungan koefisien membaca hasil yang sama
+(statistik tinggi, pantulan, filter zero-phase, hasil analyze_run). Setiap
+hasil disimpan dengan kunci (versi data, parameter); selama kuncinya sama
+hasil dipakai ulang, sehingga refresh tanpa data atau pengaturan baru tidak
+menghitung ulang seluruh seri. Hanya satu entri per jenis hasil yang
+disimpan, jadi memori tidak bertambah selama sesi berjalan.
+"""
+
+
+class AnalysisCache:
+    """Latest value of every named result together with the key it was computed for."""
+
+    def __init__(self):
+        self._entries = {}  # nama -> (kunci, nilai)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, name, key, compute):
+        """Value of `name` for `key`, calling `compute(previous)` on a miss.
+
+        `previous` is the value stored for the older key (None if there is
+        none), so a result can be updated from it incrementally. `key` must
+        be hashable-comparable plain data (numbers, strings, tuples).
+        """
+        entry = self._entries.get(name)
+        if entry is not None and entry[0] == key:
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        value = compute(entry[1] if entry is not None else None)
+        self._entries[name] = (key, value)
+        return value
+
+    def clear(self):
+        """Forget every result (the samples were dropped)."""
+        self._entries.clear()
+
+    def summary(self):
+        """Plain dict for the performance dump."""
+        return {"hits": self.hits, "misses": self.misses, "entries": sorted(self._entries)}
@@ -0,0 +1,387 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import apex_fit
+from app_logging import get_logger
+from resampling import monotonic_samples, resample_uniform, seconds_to_samples
+
+# Pengaturan deteksi bawaan (sama dengan nilai awal di main.py)
+DEFAULT_SETTINGS = {
+    "min_height": 15.0,            # ambang tinggi pantulan (cm)
+    "min_distance": 1,             # jarak minimum antar puncak (titik data)
+    "prominence": 3.0,             # prominence minimum puncak (cm)
+    "min_height_difference": 0.1,  # selisih tinggi minimum antar puncak (cm)
+    "min_spacing": None,           # jarak minimum antar puncak (detik) pada grid seragam;
+                                   # None = deteksi langsung pada sampel (min_distance)
+    "apex_fit": False,             # tambahkan estimasi puncak dari fit lintasan parabola
+}
+MIN_SAMPLES = 10       # titik data minimum untuk analisis
+MIN_PEAK_SAMPLES = 20  # titik data minimum untuk deteksi puncak
+RECORD_VERSION = 1     # versi format record JSON hasil analisis
+
+log = get_logger("analysis")
+
+# Batas bawah koefisien untuk setiap kelas material (dicek dari atas)
+MATERIAL_CLASSES = (
+    (0.9, "Super Ball / Elastisitas Tinggi", "Sangat Baik"),
+    (0.8, "Bola Karet / Elastisitas Baik", "Baik Sekali"),
+    (0.6, "Bola Tenis / Elastisitas Sedang", "Baik"),
+    (0.4, "Bola Lunak / Elastisitas Rendah", "Cukup"),
+    (-np.inf, "Material Sangat Lunak / Elastisitas Buruk", "Buruk"),
+)
+
+
+def filter_descending_peaks(peak_heights, min_height_difference, verbose=False):
+    """Indices of the peaks that keep a natural, descending bounce trend.
+
+    The first peak is always kept; a later peak is kept only if it is not
+    higher than the last kept peak and differs from it by at least
+    `min_height_difference`. With `verbose`, rejected peaks are logged at
+    DEBUG level.
+    """
+    kept = []
+    for i, h in enumerate(peak_heights):
+        if not kept:
+            kept.append(i)
+            continue
+        last = peak_heights[kept[-1]]
+        height_diff = abs(h - last)
+
+        # Hanya tambahkan jika selisih ketinggian cukup DAN tinggi menurun (pantulan alami)
+        if height_diff >= min_height_difference and h <= last:
+            kept.append(i)
+        elif verbose and h > last:
+            log.debug("Puncak diabaikan: tinggi %.1fcm > puncak sebelum %.1fcm (trend naik tidak wajar)", h, last)
+        elif verbose:
+            log.debug("Puncak diabaikan: tinggi %.1fcm, selisih %.1fcm < %scm", h, height_diff, min_height_difference)
+    return kept
+
+
+def select_by_distance(indices, peak_heights, min_distance):
+    """Keep-mask for peaks at sorted `indices` under a minimum sample distance.
+
+    Same rule as the `distance` option of `scipy.signal.find_peaks` (the
+    highest remaining peak removes its neighbours closer than
+    `min_distance`), except that equal heights are always resolved in favour
+    of the earlier peak. scipy orders ties with an unstable sort, so its
+    choice depends on the number of peaks and cannot be reproduced by the
+    streaming detector.
+    """
+    indices = np.asarray(indices)
+    distance = max(int(np.ceil(min_distance)), 1)
+    keep = np.ones(len(indices), dtype=bool)
+    if distance == 1 or len(indices) < 2:
+        return keep
+    for j in np.argsort(-np.asarray(peak_heights, dtype=np.float64), kind="stable"):
+        if not keep[j]:
+            continue
+        k = j - 1
+        while k >= 0 and indices[j] - indices[k] < distance:
+            keep[k] = False
+            k -= 1
+        k = j + 1
+        while k < len(indices) and indices[k] - indices[j] < distance:
+            keep[k] = False
+            k += 1
+    return keep
+
+
+def find_bounce_peaks(values, min_height, min_distance=1, prominence=None):
+    """Indices of the peaks of `values`, like `find_peaks(height=, distance=, prominence=)`.
+
+    The filters run in scipy's order (height, distance, prominence); the
+    distance rule is `select_by_distance`, so the result matches
+    StreamingBounceDetector.
+    """
+    from scipy.signal import find_peaks, peak_prominences  # impor lazily: scipy.signal lambat dimuat
+
+    values = np.asarray(values, dtype=np.float64)
+    peaks, _ = find_peaks(values, height=min_height)
+    peaks = peaks[select_by_distance(peaks, values[peaks], min_distance)]
+    if prominence is not None and len(peaks):
+        peaks = peaks[peak_prominences(values, peaks)[0] >= prominence]
+    return peaks
+
+
+def detect_bounces(heights, times, min_height, min_distance=1, prominence=3.0,
+                   min_height_difference=0.1, verbose=False):
+    """Detect bounce apexes (height maxima) in a run.
+
+    Peaks come from `find_bounce_peaks`; afterwards only peaks that keep
+    a descending trend and differ by at least `min_height_difference` from
+    the previously accepted peak are kept. Returns (times, heights) as lists
+    of floats.
+    """
+    if len(heights) < MIN_PEAK_SAMPLES:
+        return [], []
+
+    # Find peaks (maximum values) directly - no inversion needed
+    peaks = find_bounce_peaks(heights, min_height, min_distance, prominence)
+    peaks = peaks[peaks < len(times)]
+
+    # PERBAIKAN: Filter peaks berdasarkan selisih ketinggian minimal dan trend menurun
+    peak_heights = [float(heights[p]) for p in peaks]
+    kept = filter_descending_peaks(peak_heights, min_height_difference, verbose)
+    filtered_times = [float(times[peaks[i]]) for i in kept]
+    filtered_heights = [peak_heights[i] for i in kept]
+
+    if verbose and log.isEnabledFor(logging.DEBUG):
+        log.debug("Detected %d valid bounces at heights: %s", len(filtered_heights),
+                  [round(h, 1) for h in filtered_heights])
+    return filtered_times, filtered_heights
+
+
+def detect_bounces_resampled(heights, times, min_height, min_spacing, prominence=3.0,
+                             min_height_difference=0.1, verbose=False, fs=None):
+    """Detect bounce apexes on a uniform grid built from the real timestamps.
+
+    The samples are interpolated onto a grid at the estimated sample rate (or
+    `fs`), so `min_spacing` is in seconds and holds at any sampling interval.
+    Peaks inside timestamp gaps are discarded; every grid peak is then
+    snapped to the highest real sample within one grid interval, so the
+    reported apexes are measured values. Returns (times, heights, series)
+    where `series` is the UniformSeries (None if the rate is unknown).
+    """
+    series = resample_uniform(times, heights, fs)
+    if series is None or len(series) < MIN_PEAK_SAMPLES:
+        return [], [], series
+
+    peaks = find_bounce_peaks(series.values, min_height,
+                              seconds_to_samples(min_spacing, series.fs), prominence)
+    peaks = peaks[series.valid[peaks]]
+
+    raw_times, raw_heights = monotonic_samples(np.asarray(times, dtype=np.float64),
+                                               np.asarray(heights, dtype=np.float64))
+    lo = np.searchsorted(raw_times, series.times[peaks] - series.interval, side="left")
+    hi = np.searchsorted(raw_times, series.times[peaks] + series.interval, side="right")
+    apex = [a + int(np.argmax(raw_heights[a:b])) for a, b in zip(lo, hi)]
+    # Dua puncak grid bisa menunjuk sampel yang sama
+    apex = list(dict.fromkeys(apex))
+
+    peak_heights = [float(raw_heights[i]) for i in apex]
+    kept = filter_descending_peaks(peak_heights, min_height_difference, verbose)
+    filtered_times = [float(raw_times[apex[i]]) for i in kept]
+    filtered_heights = [peak_heights[i] for i in kept]
+    if verbose and log.isEnabledFor(logging.DEBUG):
+        log.debug("Detected %d valid bounces at %.1f Hz (%d gaps): %s", len(filtered_heights),
+                  series.fs, len(series.gaps), [round(h, 1) for h in filtered_heights])
+    return filtered_times, filtered_heights, series
+
+
+def fit_bounce_apexes(times, heights, bounce_times, bounce_heights, min_height):
+    """Refine detected apexes with a free-fall parabola fit (see apex_fit).
+
+    Returns a JSON-friendly dict with the fitted apex times and heights,
+    which apexes were fitted, the height-based coefficient per valid pair
+    (same pairs as the raw analysis), the flight-time coefficients and
+    their means (None when there are none). Flight-time coefficients are
+    only given when the fit confirmed that the timestamps follow real time
+    (gravity consistent with 981 cm/s²); otherwise `gravity` reports the
+    median gravity implied by the timestamps.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    # Indeks sampel tiap puncak (timestamp bisa tidak monoton, jadi lewat urutan tersortir)
+    order = np.argsort(times, kind="stable")
+    positions = np.searchsorted(times[order], np.asarray(bounce_times, dtype=np.float64))
+    indices = order[np.minimum(positions, len(order) - 1)]
+    fit = apex_fit.fit_apexes(times, heights, np.sort(indices))
+
+    coefficients = [float(e) for e, h1, h2 in zip(apex_fit.height_coefficients(fit["heights"]),
+                                                  bounce_heights, bounce_heights[1:])
+                    if h1 >= min_height and h2 >= min_height]
+    flight = []
+    if fit["fixed_gravity"]:
+        flight = [float(e) for e in apex_fit.flight_time_coefficients(fit["times"])]
+    gravity = fit["gravity"][fit["fitted"]]
+    return {
+        "times": fit["times"].tolist(),
+        "heights": fit["heights"].tolist(),
+        "fitted": fit["fitted"].tolist(),
+        "rms": [None if np.isnan(r) else float(r) for r in fit["rms"]],
+        "coefficients": coefficients,
+        "mean": float(np.mean(coefficients)) if coefficients else None,
+        "flight_coefficients": flight,
+        "flight_mean": float(np.mean(flight)) if flight else None,
+        "gravity": float(np.median(gravity)) if len(gravity) else apex_fit.GRAVITY,
+        "fixed_gravity": fit["fixed_gravity"],
+    }
+
+
+def classify_coefficient(coefficient):
+    """Return (material type, bounce quality) for an average coefficient."""
+    for lower_bound, material_type, quality in MATERIAL_CLASSES:
+        if coefficient >= lower_bound:
+            return material_type, quality
+    return MATERIAL_CLASSES[-1][1:]
+
+
+def analyze_run(times, heights, min_height=None, min_distance=None, prominence=None,
+                min_height_difference=None, verbose=False, min_spacing=None, apex_fit=None):
+    """Compute the coefficient of restitution of one run without any GUI state.
+
+    `times` / `heights` are the ball heights (cm) over time (s); settings that
+    are None fall back to DEFAULT_SETTINGS. Returns a dict with a `status`
+    ("ok", "insufficient_data", "invalid_data", "invalid_time",
+    "too_few_bounces", "too_few_valid" or "no_pairs"), the detected bounces,
+    one entry per consecutive pair in `pairs` and, when status is "ok", the
+    statistics and material classification. With `min_spacing` (seconds)
+    the bounces are detected on a uniform grid (see
+    `detect_bounces_resampled`) and `resampling` describes the grid. With
+    `apex_fit`, `apex_fit` holds the trajectory-fit apexes and the
+    coefficients derived from them (see `fit_bounce_apexes`).
+    """
+    settings = dict(DEFAULT_SETTINGS)
+    for key, value in (("min_height", min_height), ("min_distance", min_distance),
+                       ("prominence", prominence), ("min_height_difference", min_height_difference),
+                       ("min_spacing", min_spacing), ("apex_fit", apex_fit)):
+        if value is not None:
+            settings[key] = value
+
+    times = np.asarray(times, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    result = {
+        "status": "ok",
+        "settings": settings,
+        "n_samples": int(len(heights)),
+        "duration": float(times.max()) if len(times) else 0.0,
+        "bounce_times": [],
+        "bounce_heights": [],
+        "valid_heights": [],
+        "decreasing_trend": True,
+        "pairs": [],
+        "coefficients": [],
+        "intervals": [],
+        "valid_pairs": 0,
+        "stats": None,
+        "material_type": None,
+        "quality": None,
+        "resampling": None,
+        "apex_fit": None,
+    }
+
+    if len(heights) < MIN_SAMPLES:
+        result["status"] = "insufficient_data"
+        return result
+    # PERBAIKAN: Cek adanya NaN atau Inf
+    if not np.isfinite(heights).all():
+        result["status"] = "invalid_data"
+        return result
+    if not np.isfinite(times).all():
+        result["status"] = "invalid_time"
+        return result
+
+    min_height = settings["min_height"]
+    if settings["min_spacing"] is not None:
+        bounce_times, bounce_heights, series = detect_bounces_resampled(
+            heights, times, min_height, settings["min_spacing"], settings["prominence"],
+            settings["min_height_difference"], verbose=verbose)
+        result["resampling"] = series.summary() if series is not None else None
+    else:
+        bounce_times, bounce_heights = detect_bounces(
+            heights, times, min_height, settings["min_distance"], settings["prominence"],
+            settings["min_height_difference"], verbose=verbose)
+    result["bounce_times"] = bounce_times
+    result["bounce_heights"] = bounce_heights
+    result["valid_heights"] = [h for h in bounce_heights if h >= min_height]
+    result["decreasing_trend"] = all(b <= a for a, b in zip(bounce_heights, bounce_heights[1:]))
+
+    if settings["apex_fit"] and bounce_times:
+        result["apex_fit"] = fit_bounce_apexes(times, heights, bounce_times, bounce_heights, min_height)
+
+    if len(bounce_heights) < 2:
+        result["status"] = "too_few_bounces"
+        return result
+    if len(result["valid_heights"]) < 2:
+        result["status"] = "too_few_valid"
+        return result
+
+    # Koefisien antar pantulan berurutan: e = sqrt(h2 / h1)
+    for i in range(1, len(bounce_heights)):
+        h_before, h_after = bounce_heights[i - 1], bounce_heights[i]
+        pair = {
+            "index": i,
+            "h_before": h_before,
+            "h_after": h_after,
+            "dt": bounce_times[i] - bounce_times[i - 1],
+            "e": None,
+            "valid": False,
+        }
+        if h_before >= min_height and h_after >= min_height:  # PERBAIKAN: Validasi kedua ketinggian
+            e = float(np.sqrt(h_after / h_before))
+            if np.isfinite(e):
+                pair["e"] = e
+                pair["valid"] = True
+                result["coefficients"].append(e)
+                result["intervals"].append(pair["dt"])
+        result["pairs"].append(pair)
+    result["valid_pairs"] = len(result["coefficients"])
+
+    coefficients = result["coefficients"]
+    if not coefficients:
+        result["status"] = "no_pairs"
+        return result
+
+    # Statistical analysis
+    mean = float(np.mean(coefficients))
+    std = float(np.std(coefficients))
+    minimum = float(np.min(coefficients))
+    maximum = float(np.max(coefficients))
+    energy_retention = mean ** 2  # e² = energy ratio
+    result["stats"] = {
+        "mean": mean,
+        "std": std,
+        "min": minimum,
+        "max": maximum,
+        "range": maximum - minimum,
+        "energy_retention": energy_retention,
+        "energy_loss_percent": (1 - energy_retention) * 100,
+    }
+    result["material_type"], result["quality"] = classify_coefficient(mean)
+    return result
+
+
+def build_record(result, ball_type=None, sensor_height=None, **metadata):
+    """Turn an `analyze_run` result into a JSON-serializable record.
+
+    Extra keyword arguments (e.g. `trial`, `device`, `source`) are stored
+    under `metadata`.
+    """
+    return {
+        "version": RECORD_VERSION,
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "ball_type": ball_type,
+        "sensor_height": None if sensor_height is None else float(sensor_height),
+        "metadata": metadata,
+        "status": result["status"],
+        "settings": result["settings"],
+        "n_samples": result["n_samples"],
+        "duration": result["duration"],
+        "bounces": {"times": result["bounce_times"], "heights": result["bounce_heights"]},
+        "decreasing_trend": result["decreasing_trend"],
+        "pairs": result["pairs"],
+        "valid_pairs": result["valid_pairs"],
+        "stats": result["stats"],
+        "material_type": result["material_type"],
+        "quality": result["quality"],
+        "resampling": result["resampling"],
+        "apex_fit": result["apex_fit"],
+    }
+
+
+def record_path(path):
+    """Sidecar path of a record next to a report, e.g. Analisis_X.txt -> Analisis_X.json."""
+    return os.path.splitext(path)[0] + ".json"
+
+
+def save_record(path, record):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(record, f, ensure_ascii=False, indent=1)
+
+
+def load_record(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
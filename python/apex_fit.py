@@ -0,0 +1,187 @@
+"""Estimasi puncak pantulan dengan fit lintasan jatuh bebas (parabola).
+
+HC-SR04 dibaca dalam cm bulat dan dicuplik tiap ~100 ms, sehingga sampel
+tertinggi hampir tidak pernah tepat di puncak: tinggi puncak terbaca lebih
+rendah dan e = sqrt(h2/h1) menjadi bising. Di sini setiap segmen terbang
+di sekitar puncak yang terdeteksi di-fit dengan parabola
+
+    h(t) = H - g/2 (t - t0)^2
+
+dengan kuadrat terkecil, semua segmen sekaligus (persamaan normal yang
+ditumpuk, tanpa loop Python per titik). Hasilnya tinggi puncak H dan waktu
+puncak t0 per pantulan, serta dua estimasi koefisien restitusi:
+
+  * dari tinggi:      e_k = sqrt(H_(k+1) / H_k)
+  * dari waktu terbang: jarak antar puncak = (T_k + T_(k+1)) / 2 dengan
+    T_(k+1) = e T_k, sehingga e_k = (t0_(k+2) - t0_(k+1)) / (t0_(k+1) - t0_k).
+    Estimasi ini tidak bergantung pada tinggi lantai/sensor maupun nilai g.
+"""
+import numpy as np
+
+GRAVITY = 981.0      # cm/s²
+MIN_FRACTION = 0.3   # hanya sampel di atas fraksi ini dari tinggi puncak yang ikut di-fit
+MIN_POINTS = 3       # sampel minimum per segmen (parabola g tetap punya 2 parameter)
+MAX_RMS = 1.5        # cm, residual fit di atas ini berarti segmen bukan lintasan bebas
+# readDistance memotong jarak ke cm bulat, sehingga tinggi (sensor - jarak) terbaca
+# rata-rata setengah langkah lebih tinggi; offset ini menggeser e = sqrt(h2/h1) ke atas
+QUANTIZATION_STEP = 1.0  # cm
+GRAVITY_TOLERANCE = 0.25  # mode otomatis: g tetap jika g hasil fit bebas dalam +-25% GRAVITY
+
+
+def flight_segments(times, heights, apex_indices, min_fraction=MIN_FRACTION):
+    """(start, stop) sample ranges of the flight around every apex.
+
+    A segment is the contiguous run of samples around the apex whose height
+    is at least `min_fraction` of the apex height, bounded by the floor
+    contacts (the lowest sample towards each neighbouring apex, or towards
+    the ends of the run). The part near the floor (contact, sensor dead
+    zone) and a held ball before the drop are excluded, where the free-fall
+    model does not hold.
+    """
+    heights = np.asarray(heights, dtype=np.float64)
+    apex_indices = np.asarray(apex_indices, dtype=np.intp)
+    n = len(heights)
+    # Kontak lantai: sampel terendah di antara dua puncak (dan menuju ujung run)
+    lowest = np.where(np.isfinite(heights), heights, np.inf)
+    bounds = np.concatenate(([0], apex_indices, [n - 1]))
+    contacts = [lo + int(np.argmin(lowest[lo:hi + 1])) for lo, hi in zip(bounds[:-1], bounds[1:])]
+    left_limits = np.array(contacts[:-1]) + 1
+    right_limits = np.array(contacts[1:]) - 1
+
+    # Sampel di bawah ambang memutus segmen: cari ambang terdekat di kiri/kanan puncak
+    segments = []
+    for apex, lo_limit, hi_limit in zip(apex_indices, left_limits, right_limits):
+        floor = heights[apex] * min_fraction
+        window = heights[lo_limit:hi_limit + 1] >= floor
+        window &= np.isfinite(heights[lo_limit:hi_limit + 1])
+        local = apex - lo_limit
+        below_left = np.flatnonzero(~window[:local])
+        below_right = np.flatnonzero(~window[local:])
+        start = lo_limit + (below_left[-1] + 1 if len(below_left) else 0)
+        stop = apex + (below_right[0] if len(below_right) else hi_limit - apex + 1)
+        segments.append((int(start), int(stop)))
+    return segments
+
+
+def _stack(times, heights, segments, origins):
+    """Pad the segments into (k, m) arrays of relative time, height and weight."""
+    lengths = np.array([stop - start for start, stop in segments], dtype=np.intp)
+    width = int(lengths.max()) if len(lengths) else 0
+    offsets = np.arange(width)
+    index = np.array([start for start, _ in segments], dtype=np.intp)[:, None] + offsets
+    weight = offsets < lengths[:, None]
+    index = np.where(weight, index, 0)
+    t = np.where(weight, times[index] - origins[:, None], 0.0)
+    h = np.where(weight, heights[index], 0.0)
+    return t, h, weight.astype(np.float64), lengths
+
+
+def fit_apexes(times, heights, apex_indices, g=GRAVITY, min_fraction=MIN_FRACTION,
+               fixed_gravity=None, quantization=QUANTIZATION_STEP):
+    """Fit a free-fall parabola to the flight around every apex, all at once.
+
+    With `fixed_gravity=True` the curvature is -g/2 and only the apex height
+    and time are fitted, a 2-parameter linear least-squares problem that is
+    well posed with 3 samples. With False a general parabola is fitted and
+    the implied gravity is reported per segment. The default (None) fits
+    the general parabola first and switches to fixed gravity only if the
+    median implied gravity is within GRAVITY_TOLERANCE of `g`; otherwise
+    the timestamps do not follow real time (e.g. a wrong sample interval)
+    and the general fit is kept.
+
+    Segments with too few samples, a fitted apex outside the segment or a
+    residual above MAX_RMS keep the raw apex sample (`fitted` is False for
+    them). All returned heights, fitted or raw, are lowered by half the
+    sensor `quantization` step (the mean over-read of truncated distances),
+    so ratios between any two apexes carry no offset bias.
+    Returns a dict of arrays: `times`, `heights`, `fitted`, `points`,
+    `rms` (residual, cm) and `gravity` (cm/s², NaN with fixed gravity),
+    plus `fixed_gravity` (the mode that was used).
+    """
+    if fixed_gravity is None:
+        free = fit_apexes(times, heights, apex_indices, g, min_fraction, False, quantization)
+        gravity = free["gravity"][free["fitted"]]
+        if len(gravity) and abs(np.median(gravity) - g) > GRAVITY_TOLERANCE * g:
+            return free
+        return fit_apexes(times, heights, apex_indices, g, min_fraction, True, quantization)
+
+    times = np.asarray(times, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+    apex_indices = np.asarray(apex_indices, dtype=np.intp)
+    k = len(apex_indices)
+    result = {
+        "times": times[apex_indices].copy(),
+        "heights": heights[apex_indices].copy(),
+        "fitted": np.zeros(k, dtype=bool),
+        "points": np.zeros(k, dtype=np.intp),
+        "rms": np.full(k, np.nan),
+        "gravity": np.full(k, np.nan),
+        "fixed_gravity": bool(fixed_gravity),
+    }
+    if k == 0:
+        return result
+
+    segments = flight_segments(times, heights, apex_indices, min_fraction)
+    origins = times[apex_indices]  # waktu relatif terhadap puncak mentah: matriks terkondisi baik
+    t, h, w, lengths = _stack(times, heights, segments, origins)
+    result["points"] = lengths
+
+    if fixed_gravity:
+        # h + g/2 t^2 = p0 + p1 t  dengan p1 = g t0, p0 = H - g/2 t0^2
+        y = h + 0.5 * g * t ** 2
+        s, st, stt = w.sum(1), (w * t).sum(1), (w * t * t).sum(1)
+        sy, sty = (w * y).sum(1), (w * t * y).sum(1)
+        det = s * stt - st ** 2
+        ok = (lengths >= MIN_POINTS) & (det > 1e-12)
+        det = np.where(ok, det, 1.0)
+        p1 = (s * sty - st * sy) / det
+        p0 = (stt * sy - st * sty) / det
+        t0 = p1 / g
+        apex_height = p0 + 0.5 * g * t0 ** 2
+        model = apex_height[:, None] - 0.5 * g * (t - t0[:, None]) ** 2
+    else:
+        # h = a t^2 + b t + c, sistem normal 3x3 per segmen diselesaikan bertumpuk
+        powers = np.stack([w * t ** p for p in range(5)])  # sum w t^p, p = 0..4
+        sums = powers.sum(2)
+        A = np.stack([np.stack([sums[4], sums[3], sums[2]], -1),
+                      np.stack([sums[3], sums[2], sums[1]], -1),
+                      np.stack([sums[2], sums[1], sums[0]], -1)], 1)
+        rhs = np.stack([(w * t ** 2 * h).sum(1), (w * t * h).sum(1), (w * h).sum(1)], -1)
+        ok = (lengths >= MIN_POINTS + 1) & (np.abs(np.linalg.det(A)) > 1e-12)
+        A[~ok] = np.eye(3)
+        a, b, c = np.linalg.solve(A, rhs[..., None])[..., 0].T
+        ok &= a < 0
+        a = np.where(ok, a, -1.0)
+        t0 = -b / (2 * a)
+        apex_height = c - b ** 2 / (4 * a)
+        model = a[:, None] * t ** 2 + b[:, None] * t + c[:, None]
+        result["gravity"] = np.where(ok, -2 * a, np.nan)
+
+    residual = np.sqrt((w * (h - model) ** 2).sum(1) / np.maximum(w.sum(1), 1))
+    # Puncak hasil fit harus berada di dalam segmen yang di-fit
+    span_lo = np.where(w > 0, t, np.inf).min(1)
+    span_hi = np.where(w > 0, t, -np.inf).max(1)
+    ok &= (t0 >= span_lo) & (t0 <= span_hi) & np.isfinite(apex_height) & (residual <= MAX_RMS)
+
+    result["times"] = np.where(ok, origins + t0, result["times"])
+    # Offset kuantisasi untuk semua puncak (juga sampel mentah) agar rasio h2/h1 tidak bias
+    result["heights"] = np.where(ok, apex_height, result["heights"]) - 0.5 * quantization
+    result["fitted"] = ok
+    result["rms"] = np.where(ok, residual, np.nan)
+    return result
+
+
+def height_coefficients(apex_heights):
+    """e_k = sqrt(H_(k+1) / H_k) for consecutive apex heights."""
+    apex_heights = np.asarray(apex_heights, dtype=np.float64)
+    if len(apex_heights) < 2:
+        return np.empty(0)
+    return np.sqrt(apex_heights[1:] / apex_heights[:-1])
+
+
+def flight_time_coefficients(apex_times):
+    """e_k from the ratio of consecutive apex intervals (needs three apexes per value)."""
+    intervals = np.diff(np.asarray(apex_times, dtype=np.float64))
+    if len(intervals) < 2:
+        return np.empty(0)
+    return intervals[1:] / intervals[:-1]
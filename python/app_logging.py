@@ -0,0 +1,175 @@
+"""Logging berlevel untuk jalur data (ingest, deteksi, tabel, jurnal).
+
+Pengganti `print()` di jalur panas: pesan diformat secara lazy (hanya
+jika lolos level), konsol dibatasi lajunya per jenis pesan (template
+format, bukan teks hasil format) dan pesan yang ditahan dihitung, lalu
+dilaporkan bersama pesan berikutnya yang lolos. Sink JSONL opsional
+menyimpan setiap record (tanpa pembatasan laju) untuk analisis offline.
+
+    from app_logging import get_logger
+    log = get_logger("ingest")
+    log.warning("Format payload tidak terduga: %r", payload)
+
+Contoh (main.py):
+    python main.py --log-level DEBUG --log-file log_sesi.jsonl
+"""
+import json
+import logging
+import sys
+import threading
+import time
+
+ROOT_LOGGER = "koefisien"
+DEFAULT_LEVEL = "INFO"
+RATE_INTERVAL = 5.0  # detik, jendela pembatasan laju per jenis pesan
+RATE_BURST = 5       # pesan per jenis yang tetap tampil dalam satu jendela
+
+
+def get_logger(name):
+    """Logger of one component (child of the application root logger)."""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name}")
+
+
+class RateLimitFilter(logging.Filter):
+    """Let through at most `burst` records per message type every `interval` seconds.
+
+    The message type is (logger, format string), so "%d data diabaikan"
+    with different counts is one type. Suppressed records are counted per
+    type; the next record of that type that passes reports how many were
+    held back.
+    """
+
+    def __init__(self, interval=RATE_INTERVAL, burst=RATE_BURST):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.suppressed = {}  # jenis pesan -> total ditahan
+        self._windows = {}    # jenis pesan -> [awal jendela, jumlah lolos, ditahan sejak lolos terakhir]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        key = (record.name, str(record.msg))
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                held = window[2] if window is not None else 0
+                window = self._windows[key] = [now, 0, held]
+            if window[1] >= self.burst:
+                window[2] += 1
+                self.suppressed[key] = self.suppressed.get(key, 0) + 1
+                return False
+            window[1] += 1
+            held, window[2] = window[2], 0
+        if held:
+            record.suppressed = held
+        return True
+
+    def summary(self):
+        """{"logger: format": count} of every suppressed message type."""
+        with self._lock:
+            return {f"{name}: {msg}": count for (name, msg), count in self.suppressed.items()}
+
+
+class ConsoleFormatter(logging.Formatter):
+    """Plain message like the old prints; warnings and errors get a level prefix."""
+
+    def format(self, record):
+        text = super().format(record)
+        if record.levelno >= logging.WARNING:
+            text = f"[{record.levelname}] {text}"
+        held = getattr(record, "suppressed", 0)
+        if held:
+            text += f" (+{held} pesan serupa ditahan)"
+        return text
+
+
+class JsonlHandler(logging.Handler):
+    """Structured sink: one JSON object per record, for offline analysis.
+
+    Besides the formatted message, the format string and its arguments are
+    stored separately, so records of one type can be grouped and their
+    values (counts, device IDs) analysed without parsing text.
+    """
+
+    def __init__(self, path, level=logging.DEBUG):
+        super().__init__(level)
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def emit(self, record):
+        try:
+            entry = {
+                "time": record.created,
+                "level": record.levelname,
+                "logger": record.name,
+                "format": str(record.msg),
+                "args": [arg if isinstance(arg, (int, float, str, bool, type(None))) else repr(arg)
+                         for arg in (record.args if isinstance(record.args, tuple) else ())],
+                "message": record.getMessage(),
+                "thread": record.threadName,
+            }
+            if record.exc_info:
+                entry["exception"] = self.format(record).split("\n", 1)[-1]
+            self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        except Exception:
+            self.handleError(record)
+
+    def flush(self):
+        with self.lock:
+            if not self._file.closed:
+                self._file.flush()
+
+    def close(self):
+        with self.lock:
+            if not self._file.closed:
+                self._file.close()
+        super().close()
+
+
+# Filter konsol bersama (dibaca untuk penghitung pesan yang ditahan)
+rate_limiter = RateLimitFilter()
+
+
+def configure(level=DEFAULT_LEVEL, jsonl_path=None, jsonl_level=logging.DEBUG,
+              interval=RATE_INTERVAL, burst=RATE_BURST):
+    """Set up the console handler (rate-limited) and the optional JSONL sink.
+
+    The root logger level is the lowest level any handler needs, so with
+    the defaults DEBUG calls in the hot paths return immediately.
+    """
+    console_level = logging.getLevelName(level) if isinstance(level, str) else level
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+        handler.close()
+    logger.propagate = False
+
+    rate_limiter.interval = interval
+    rate_limiter.burst = burst
+    console = logging.StreamHandler(sys.stdout)
+    console.setLevel(console_level)
+    console.setFormatter(ConsoleFormatter("%(message)s"))
+    console.addFilter(rate_limiter)
+    logger.addHandler(console)
+
+    levels = [console_level]
+    if jsonl_path:
+        logger.addHandler(JsonlHandler(jsonl_path, jsonl_level))
+        levels.append(jsonl_level)
+    logger.setLevel(min(levels))
+    return logger
+
+
+def suppressed_counts():
+    """Messages held back by the console rate limit, per message type."""
+    return rate_limiter.summary()
+
+
+def shutdown():
+    """Flush and close the handlers (the JSONL sink) on exit."""
+    logger = logging.getLogger(ROOT_LOGGER)
+    for handler in list(logger.handlers):
+        handler.flush()
+        handler.close()
+        logger.removeHandler(handler)
@@ -0,0 +1,146 @@
+"""Analisis ulang seluruh arsip data percobaan tanpa GUI.
+
+Contoh:
+    python batch_analysis.py
+    python batch_analysis.py --threshold 12 --prominence 2.5 -o hasil_batch.xlsx
+"""
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+import analysis_core
+from run_archive import default_data_dir, list_runs, load_run
+
+DEFAULT_OUTPUT = "hasil_analisis_batch.xlsx"
+
+
+def analyze_file(job):
+    """Worker: analyze one archive file and return one flat result row."""
+    ball_type, trial, path, settings, records_dir = job
+    row = {
+        "Jenis Bola": ball_type,
+        "Percobaan": trial,
+        "File": os.path.basename(path),
+    }
+    try:
+        times, heights, sensor_height = load_run(path)
+        result = analysis_core.analyze_run(times, heights, **settings)
+        if records_dir:
+            # Analisis_Bola_Bekel_1.json, sama dengan nama laporan teks dari GUI
+            record = analysis_core.build_record(result, ball_type, sensor_height,
+                                                trial=trial, source=os.path.basename(path))
+            stem = os.path.splitext(os.path.basename(path))[0].replace("Data_", "Analisis_", 1)
+            analysis_core.save_record(os.path.join(records_dir, stem + ".json"), record)
+    except Exception as e:
+        row["Status"] = f"error: {e}"
+        return row
+
+    stats = result["stats"] or {}
+    row.update({
+        "Tinggi Sensor (cm)": sensor_height,
+        "Jumlah Data": result["n_samples"],
+        "Durasi (s)": result["duration"],
+        "Jumlah Pantulan": len(result["bounce_heights"]),
+        "Pasangan Valid": result["valid_pairs"],
+        "Koefisien Rata-rata": stats.get("mean"),
+        "Standar Deviasi": stats.get("std"),
+        "Koefisien Minimum": stats.get("min"),
+        "Koefisien Maksimum": stats.get("max"),
+        "Retensi Energi (%)": stats["energy_retention"] * 100 if stats else None,
+        "Klasifikasi Material": result["material_type"],
+        "Kualitas Pantulan": result["quality"],
+        "Tinggi Pantulan (cm)": ", ".join(f"{h:.2f}" for h in result["bounce_heights"]),
+        "Koefisien per Pasangan": ", ".join(f"{e:.4f}" for e in result["coefficients"]),
+        "Status": result["status"],
+    })
+    fit = result["apex_fit"]
+    if fit:
+        row.update({
+            "Koefisien Fit Parabola": fit["mean"],
+            "Koefisien Waktu Terbang": fit["flight_mean"],
+            "g Tersirat (cm/s²)": fit["gravity"],
+        })
+    return row
+
+
+def analyze_archive(data_dir, settings, workers=None, records_dir=None):
+    """Analyze every run in `data_dir` in a process pool; returns a DataFrame.
+
+    If `records_dir` is given, a JSON record per run is written there as well.
+    """
+    runs = list_runs(data_dir)
+    if records_dir:
+        os.makedirs(records_dir, exist_ok=True)
+    jobs = [(ball_type, trial, path, settings, records_dir) for ball_type, trial, path in runs]
+    if workers == 1:
+        rows = [analyze_file(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            rows = list(pool.map(analyze_file, jobs, chunksize=max(1, len(jobs) // 32)))
+    return pd.DataFrame(rows)
+
+
+def summarize(results):
+    """Mean/std of the average coefficient per ball type."""
+    ok = results[results["Status"] == "ok"]
+    return ok.groupby("Jenis Bola")["Koefisien Rata-rata"].agg(["count", "mean", "std"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Analisis ulang arsip data koefisien restitusi")
+    parser.add_argument("--data-dir", default=default_data_dir(),
+                        help="folder arsip run (npz + manifest) atau Data_Bola_*.xlsx")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="file hasil (.xlsx atau .csv)")
+    parser.add_argument("--threshold", type=float, default=analysis_core.DEFAULT_SETTINGS["min_height"],
+                        help="ambang tinggi pantulan (cm)")
+    parser.add_argument("--min-distance", type=int, default=analysis_core.DEFAULT_SETTINGS["min_distance"],
+                        help="jarak minimum antar puncak (titik data)")
+    parser.add_argument("--prominence", type=float, default=analysis_core.DEFAULT_SETTINGS["prominence"],
+                        help="prominence minimum puncak (cm)")
+    parser.add_argument("--min-height-diff", type=float,
+                        default=analysis_core.DEFAULT_SETTINGS["min_height_difference"],
+                        help="selisih tinggi minimum antar puncak (cm)")
+    parser.add_argument("--min-spacing", type=float, default=analysis_core.DEFAULT_SETTINGS["min_spacing"],
+                        help="jarak minimum antar puncak (detik); deteksi pada grid seragam dari timestamp")
+    parser.add_argument("--apex-fit", action="store_true",
+                        help="tambahkan koefisien dari fit lintasan parabola dan waktu terbang")
+    parser.add_argument("--records", default=None,
+                        help="folder untuk record JSON per percobaan (untuk create_lampiran_tex.py)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="jumlah proses (bawaan: semua CPU)")
+    args = parser.parse_args()
+
+    settings = {
+        "min_height": args.threshold,
+        "min_distance": args.min_distance,
+        "prominence": args.prominence,
+        "min_height_difference": args.min_height_diff,
+        "min_spacing": args.min_spacing,
+        "apex_fit": args.apex_fit,
+    }
+
+    start = time.perf_counter()
+    results = analyze_archive(args.data_dir, settings, args.workers, args.records)
+    elapsed = time.perf_counter() - start
+    if results.empty:
+        print(f"Tidak ada file run di {args.data_dir}")
+        return
+
+    if args.output.lower().endswith(".csv"):
+        results.to_csv(args.output, index=False)
+    else:
+        results.to_excel(args.output, index=False, engine="openpyxl")
+
+    failed = results[results["Status"] != "ok"]
+    print(f"{len(results)} percobaan dianalisis dalam {elapsed:.2f} detik -> {args.output}")
+    print(f"Pengaturan: {settings}")
+    print(summarize(results).round(4).to_string())
+    if not failed.empty:
+        print(f"\n{len(failed)} percobaan tanpa hasil:")
+        print(failed[["File", "Status"]].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
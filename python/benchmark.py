@@ -0,0 +1,383 @@
+"""Benchmark jalur panas (ingest, filter, deteksi, analisis, tabel, grafik).
+
+Setiap benchmark diukur pada beberapa panjang seri (bawaan 1k-1M sampel)
+sehingga terlihat kurva skalanya. Hasil ditulis sebagai JSON agar dapat
+dibandingkan antar commit (--compare). Pada ukuran acuan (10k sampel)
+setiap benchmark punya anggaran waktu; anggaran terlampaui atau hasil
+analisis yang berbeda dari laporan di data/analisis-percobaan membuat
+program keluar dengan kode 1.
+
+Contoh:
+    python benchmark.py -o bench_baru.json
+    python benchmark.py --sizes 1000,10000 --compare bench_lama.json
+    python benchmark.py --only detect_bounces,analyze_run
+    python benchmark.py --correctness-only
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import analysis_core
+from esp_simulator import SensorModel, bounce_heights
+from ingest import decode_messages, encode_binary_frame
+from run_archive import XLSX_DIR, list_runs, load_run
+
+RESULT_VERSION = 1
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+DEFAULT_OUTPUT = "hasil_benchmark.json"
+ANALYSIS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "analisis-percobaan")
+SAMPLE_INTERVAL = 0.05  # detik, sama dengan LOWPASS_FS di main.py
+SENSOR_HEIGHT = 35.0
+
+# Anggaran waktu (ms) per panggilan pada REFERENCE_SIZE sampel. Decode: satu
+# batch penuh (INGEST_BATCH_LIMIT = 5000 pesan) paling lama setengah frame.
+# Benchmark per frame (tabel, grafik): interval periodic_update (50 ms).
+REFERENCE_SIZE = 10000
+BUDGETS_MS = {
+    "decode_json": 50.0,
+    "decode_text": 50.0,
+    "decode_raw": 50.0,
+    "decode_binary": 10.0,
+    "lowpass_filter": 50.0,
+    "detect_bounces": 20.0,
+    "analyze_run": 30.0,
+    "update_data_table": 50.0,
+    "update_plot_render": 50.0,
+}
+REGRESSION_RATIO = 1.25  # --compare: lebih lambat dari ini dianggap regresi
+
+
+# ----------------------------------------------------------------------
+# Data sintetis
+# ----------------------------------------------------------------------
+def synthetic_run(n, seed=0):
+    """(times, heights) of `n` samples: repeated drops of a bouncing ball
+    (e ~ 0.9) with sensor noise, whole-cm readings and no dropouts."""
+    rng = np.random.default_rng(seed)
+    times = np.arange(n) * SAMPLE_INTERVAL
+    trial_length = 8.0  # detik per percobaan (tahan, jatuh, memantul, diam)
+    heights = bounce_heights(times % trial_length, 32.0, 0.9, hold=0.5)
+    distances = SensorModel(noise=0.3, dropout=0.0, rng=rng).read(SENSOR_HEIGHT - heights)
+    return times, SENSOR_HEIGHT - np.maximum(distances, 2)
+
+
+def synthetic_messages(times, heights, fmt, device="BENCH"):
+    """Drained-queue style `(topic, payload, receive_time)` tuples in one payload format."""
+    distances = SENSOR_HEIGHT - heights
+    if fmt == "json":
+        payloads = [json.dumps({"timestamp": t, "distance": d, "device": device}).encode()
+                    for t, d in zip(times.tolist(), distances.tolist())]
+    elif fmt == "text":
+        payloads = [f"distance:{d:.1f}".encode() for d in distances.tolist()]
+    elif fmt == "raw":
+        payloads = [f"{d:.1f}".encode() for d in distances.tolist()]
+    elif fmt == "binary":
+        batch = 32  # MAX_BATCH di firmware
+        payloads = [encode_binary_frame(times[i:i + batch], distances[i:i + batch], device)
+                    for i in range(0, len(times), batch)]
+    else:
+        raise ValueError(f"Format tidak dikenal: {fmt}")
+    return [("sensor/distance", payload, float(i)) for i, payload in enumerate(payloads)]
+
+
+# ----------------------------------------------------------------------
+# Pengukuran
+# ----------------------------------------------------------------------
+def measure(fn, repeat, setup=None):
+    """Best and median wall time (s) of `fn(*setup())` over `repeat` runs.
+
+    `setup` is called before every run and is not timed.
+    """
+    timings = []
+    for _ in range(repeat):
+        args = setup() if setup is not None else ()
+        start = time.perf_counter()
+        fn(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), float(np.median(timings))
+
+
+def repeats_for(n, repeat):
+    # Seri besar cukup diulang sedikit agar satu sesi benchmark tetap singkat
+    if n >= 1000000:
+        return max(1, min(repeat, 2))
+    if n >= 100000:
+        return max(1, min(repeat, 3))
+    return repeat
+
+
+def bench_decode(fmt):
+    def run(n, repeat):
+        times, heights = synthetic_run(n)
+        messages = synthetic_messages(times, heights, fmt)
+        return measure(decode_messages, repeats_for(n, repeat), lambda: (messages,))
+    return run
+
+
+def bench_lowpass_filter(n, repeat):
+    import main
+    _, heights = synthetic_run(n)
+    main.lowpass_filter(heights[:100])  # impor scipy tidak ikut terukur
+    return measure(main.lowpass_filter, repeats_for(n, repeat), lambda: (heights,))
+
+
+def bench_detect_bounces(n, repeat):
+    times, heights = synthetic_run(n)
+    settings = analysis_core.DEFAULT_SETTINGS
+    return measure(lambda: analysis_core.detect_bounces(
+        heights, times, settings["min_height"], settings["min_distance"],
+        settings["prominence"], settings["min_height_difference"]), repeats_for(n, repeat))
+
+
+def bench_analyze_run(n, repeat):
+    times, heights = synthetic_run(n)
+    return measure(lambda: analysis_core.analyze_run(times, heights), repeats_for(n, repeat))
+
+
+def _tk_root():
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        return None, str(e)
+    root.withdraw()
+    return root, None
+
+
+def bench_update_data_table(n, repeat):
+    """One refresh of the tail-mode table after a frame's worth of new samples
+    arrived in a store already holding `n` samples (real ttk.Treeview)."""
+    from tkinter import ttk
+
+    from data_table import DataTable
+    from sample_store import SampleStore
+
+    root, error = _tk_root()
+    if root is None:
+        raise RuntimeError(f"Tk tidak tersedia ({error})")
+    try:
+        tree = ttk.Treeview(root, columns=("no", "time", "height", "raw"), show="headings")
+        scrollbar = ttk.Scrollbar(root, orient="vertical", command=tree.yview)
+        table = DataTable(tree, scrollbar)
+        times, heights = synthetic_run(n + 10 * repeat)
+        store = SampleStore()
+        store.extend(times[:n], heights[:n])
+        table.refresh(store, SENSOR_HEIGHT)
+        position = [n]
+
+        def new_frame():
+            # 10 sampel baru per frame (mis. 200 Hz x 50 ms)
+            i = position[0]
+            store.extend(times[i:i + 10], heights[i:i + 10])
+            position[0] += 10
+            return store, SENSOR_HEIGHT
+        return measure(table.refresh, repeat, new_frame)
+    finally:
+        root.destroy()
+
+
+def bench_update_plot_render(n, repeat):
+    """One live frame of the plot (LivePlotRenderer.update on the Agg canvas)
+    with `n` samples, as update_plot does while collecting."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    from plot_renderer import LivePlotRenderer
+
+    fig = Figure(figsize=(10, 8), dpi=100)
+    ax = fig.add_subplot(111)
+    canvas = FigureCanvasAgg(fig)
+    renderer = LivePlotRenderer(fig, ax, canvas)
+    times, heights = synthetic_run(n + 10 * repeat)
+    peaks = analysis_core.detect_bounces(heights[:n], times[:n], 15.0, 1, 3.0, 0.1)
+    position = [n]
+
+    def frame():
+        position[0] += 10
+        return times[:position[0]], heights[:position[0]]
+
+    def render(frame_times, frame_heights):
+        renderer.update(frame_times, frame_heights, peaks[0], peaks[1],
+                        title="Benchmark", line_label="Tinggi", follow=True)
+
+    render(times[:n], heights[:n])  # frame pertama: gambar penuh & background blit
+    canvas.draw()
+    return measure(render, repeat, frame)
+
+
+BENCHMARKS = {
+    "decode_json": bench_decode("json"),
+    "decode_text": bench_decode("text"),
+    "decode_raw": bench_decode("raw"),
+    "decode_binary": bench_decode("binary"),
+    "lowpass_filter": bench_lowpass_filter,
+    "detect_bounces": bench_detect_bounces,
+    "analyze_run": bench_analyze_run,
+    "update_data_table": bench_update_data_table,
+    "update_plot_render": bench_update_plot_render,
+}
+
+
+def run_benchmarks(names, sizes, repeat):
+    """Run the selected benchmarks at every size; returns the result rows."""
+    results = []
+    for name in names:
+        for n in sizes:
+            row = {"name": name, "n": n}
+            try:
+                best, median = BENCHMARKS[name](n, repeat)
+            except Exception as e:
+                row["skipped"] = str(e)
+                print(f"{name:20s} {n:>9d}  dilewati: {e}")
+                results.append(row)
+                break
+            row.update({"best_s": best, "median_s": median, "per_sample_us": best / n * 1e6})
+            if n == REFERENCE_SIZE and name in BUDGETS_MS:
+                row["budget_ms"] = BUDGETS_MS[name]
+                row["within_budget"] = best * 1000 <= BUDGETS_MS[name]
+            flag = "" if row.get("within_budget", True) else f"  MELEBIHI ANGGARAN {BUDGETS_MS[name]:g} ms"
+            print(f"{name:20s} {n:>9d}  {best * 1000:10.2f} ms  {row['per_sample_us']:8.3f} us/sampel{flag}")
+            results.append(row)
+    return results
+
+
+# ----------------------------------------------------------------------
+# Baseline kebenaran: analisis ulang arsip vs laporan di data/analisis-percobaan
+# ----------------------------------------------------------------------
+def reported_coefficients(path):
+    """(mean e, per-pair e) as printed in an Analisis_*.txt report."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    mean = re.search(r"Koefisien Rata-rata \(e\)\s*:\s*([\d.]+)", text)
+    pairs = [float(e) for e in re.findall(r"Koefisien: e = .*= ([\d.]+)", text)]
+    return (float(mean.group(1)) if mean else None), pairs
+
+
+def check_correctness(data_dir=XLSX_DIR, analysis_dir=ANALYSIS_DIR):
+    """Re-analyze every archived run that has a report and compare e.
+
+    The reports print the mean to 4 and each pair to 3 decimals, so the
+    recomputed values are rounded the same way before comparing.
+    """
+    runs = {(ball_type, trial): path for ball_type, trial, path in list_runs(data_dir)}
+    checked = 0
+    mismatches = []
+    for filename in sorted(os.listdir(analysis_dir)):
+        match = re.match(r"^Analisis_(Bola_.+)_(\d+)\.txt$", filename)
+        if not match:
+            continue
+        key = (match.group(1).replace("_", " "), int(match.group(2)))
+        if key not in runs:
+            mismatches.append({"report": filename, "error": "file run tidak ditemukan"})
+            continue
+        reported_mean, reported_pairs = reported_coefficients(os.path.join(analysis_dir, filename))
+        times, heights, _ = load_run(runs[key])
+        result = analysis_core.analyze_run(times, heights)
+        mean = result["stats"]["mean"] if result["stats"] else None
+        pairs = [round(e, 3) for e in result["coefficients"]]
+        checked += 1
+        if mean is None or reported_mean is None or round(mean, 4) != reported_mean or pairs != reported_pairs:
+            mismatches.append({"report": filename, "reported_mean": reported_mean, "mean": mean,
+                               "reported_pairs": reported_pairs, "pairs": pairs})
+    return {"checked": checked, "matched": checked - len(mismatches), "mismatches": mismatches}
+
+
+# ----------------------------------------------------------------------
+# Perbandingan antar commit
+# ----------------------------------------------------------------------
+def compare_results(current, baseline_path, ratio=REGRESSION_RATIO):
+    """Print the speed ratio against a previous result file; returns the regressions."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(row["name"], row["n"]): row for row in baseline["results"] if "best_s" in row}
+    regressions = []
+    print(f"\nPerbandingan dengan {baseline_path} (commit {baseline.get('git_commit') or '?'}):")
+    for row in current:
+        old = previous.get((row["name"], row["n"]))
+        if old is None or "best_s" not in row:
+            continue
+        change = row["best_s"] / old["best_s"]
+        flag = "  REGRESI" if change > ratio else ""
+        print(f"  {row['name']:20s} {row['n']:>9d}  {old['best_s'] * 1000:9.2f} -> "
+              f"{row['best_s'] * 1000:9.2f} ms  x{change:.2f}{flag}")
+        if flag:
+            regressions.append({"name": row["name"], "n": row["n"], "ratio": change})
+    return regressions
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark jalur panas aplikasi koefisien restitusi")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="panjang seri, dipisah koma")
+    parser.add_argument("--only", default=None, help="nama benchmark dipisah koma: " + ", ".join(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=5, help="jumlah pengulangan per ukuran")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="file hasil JSON")
+    parser.add_argument("--compare", default=None, help="file hasil JSON sebelumnya untuk dibandingkan")
+    parser.add_argument("--data-dir", default=XLSX_DIR, help="folder Data_Bola_*.xlsx untuk baseline kebenaran")
+    parser.add_argument("--skip-correctness", action="store_true", help="lewati baseline kebenaran")
+    parser.add_argument("--correctness-only", action="store_true", help="hanya baseline kebenaran")
+    args = parser.parse_args()
+
+    sizes = [int(n) for n in args.sizes.split(",") if n.strip()]
+    names = [name.strip() for name in args.only.split(",")] if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmark tidak dikenal: {', '.join(unknown)}")
+
+    report = {
+        "version": RESULT_VERSION,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+        "reference_size": REFERENCE_SIZE,
+        "results": [],
+    }
+    failed = False
+
+    if not args.correctness_only:
+        report["results"] = run_benchmarks(names, sizes, args.repeat)
+        over_budget = [row for row in report["results"] if row.get("within_budget") is False]
+        if over_budget:
+            failed = True
+            print(f"\n{len(over_budget)} benchmark melebihi anggaran pada {REFERENCE_SIZE} sampel")
+
+    if not args.skip_correctness:
+        start = time.perf_counter()
+        correctness = check_correctness(args.data_dir)
+        report["correctness"] = correctness
+        print(f"\nBaseline kebenaran: {correctness['matched']}/{correctness['checked']} laporan cocok "
+              f"({time.perf_counter() - start:.2f} detik)")
+        for mismatch in correctness["mismatches"]:
+            print(f"  BERBEDA: {mismatch}")
+        failed = failed or bool(correctness["mismatches"])
+
+    if args.compare and report["results"]:
+        report["regressions"] = compare_results(report["results"], args.compare)
+        failed = failed or bool(report["regressions"])
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=1)
+    print(f"\nHasil disimpan ke {args.output}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
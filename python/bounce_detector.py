@@ -0,0 +1,206 @@
+from collections import deque
+
+import numpy as np
+
+from analysis_core import select_by_distance
+
+
+class StreamingBounceDetector:
+    """Incremental version of `detect_bounces` that consumes samples as they arrive.
+
+    The detector reproduces `analysis_core.find_bounce_peaks` (scipy
+    `find_peaks(height=..., distance=..., prominence=...)`) followed by the descending-height / minimum-difference
+    filter of `detect_bounces`, but it only looks at each new sample once:
+
+    - local maxima (including plateaus) are recognised as soon as the signal
+      drops again,
+    - the left prominence base comes from a monotonic stack of previous maxima,
+    - the right base is confirmed once the signal falls `prominence` below the
+      peak (or rejected when it rises above the peak first),
+    - peaks closer than `min_distance` samples are resolved per cluster with
+      the same priority rule as scipy (highest peak wins, the earlier one on
+      equal heights; see `analysis_core.select_by_distance`).
+
+    Each `push` is O(1) amortized. `bounces()` returns the same result that
+    `analysis_core.detect_bounces` would give on all samples pushed so far.
+    """
+
+    MIN_SAMPLES = 20  # sama dengan batas minimum di detect_bounces
+
+    def __init__(self, min_height, min_distance=1, prominence=3.0, min_height_difference=0.1):
+        self.min_height = float(min_height)
+        self.min_distance = max(int(np.ceil(min_distance)), 1)
+        self.prominence = float(prominence)
+        self.min_height_difference = float(min_height_difference)
+        self.reset()
+
+    def reset(self):
+        """Forget all samples and detected peaks."""
+        self.count = 0
+        self._prev = None            # nilai sampel sebelumnya
+        self._plateau_start = None   # indeks awal kandidat puncak (naik lalu datar)
+        self._plateau_value = None
+        self._plateau_min = None     # minimum kiri kandidat (dari stack monoton)
+        self._plateau_times = []     # waktu sampel sepanjang plateau kandidat
+        self._stack = []             # [nilai, minimum segmen] dengan nilai menurun tegas
+        self._pending_prominence = deque()  # puncak yang menunggu dasar kanan
+        self._cluster = []           # puncak yang jaraknya < min_distance satu sama lain
+        self._queue = deque()        # puncak urut indeks, menunggu keputusan akhir
+        self._accepted_times = []
+        self._accepted_heights = []
+
+    def configure(self, min_height=None, min_distance=None, prominence=None, min_height_difference=None):
+        """Update parameters. Returns True if anything changed (caller must re-feed data)."""
+        new = (
+            self.min_height if min_height is None else float(min_height),
+            self.min_distance if min_distance is None else max(int(np.ceil(min_distance)), 1),
+            self.prominence if prominence is None else float(prominence),
+            self.min_height_difference if min_height_difference is None else float(min_height_difference),
+        )
+        old = (self.min_height, self.min_distance, self.prominence, self.min_height_difference)
+        if new == old:
+            return False
+        self.min_height, self.min_distance, self.prominence, self.min_height_difference = new
+        self.reset()
+        return True
+
+    def extend(self, times, heights):
+        """Push a batch of samples."""
+        for t, h in zip(np.asarray(times, dtype=np.float64).tolist(),
+                        np.asarray(heights, dtype=np.float64).tolist()):
+            self.push(t, h)
+
+    def push(self, t, h):
+        """Consume one sample (time in s, ball height in cm)."""
+        t = float(t)
+        h = float(h)
+        i = self.count
+        self.count += 1
+        prev = self._prev
+        self._prev = h
+
+        # Kandidat puncak / plateau
+        if self._plateau_start is not None:
+            if h == self._plateau_value:
+                self._plateau_times.append(t)
+            elif h < self._plateau_value:
+                self._add_peak(i - 1)
+                self._plateau_start = None
+            else:
+                self._plateau_start = None
+
+        # Dasar kanan: puncak yang tertunda dikonfirmasi/ditolak oleh sampel ini.
+        # Nilai puncak tertunda tidak naik terhadap waktu, jadi cukup cek kedua ujung deque.
+        pending = self._pending_prominence
+        while pending and pending[-1]["height"] < h:
+            pending.pop()["prominent"] = False
+        while pending and pending[0]["height"] - h >= self.prominence:
+            pending.popleft()["prominent"] = True
+
+        # Stack monoton untuk dasar kiri prominence
+        segment_min = h
+        stack = self._stack
+        while stack and stack[-1][0] <= h:
+            segment_min = min(segment_min, stack.pop()[1])
+        stack.append([h, segment_min])
+
+        if self._plateau_start is None and prev is not None and prev < h:
+            self._plateau_start = i
+            self._plateau_value = h
+            self._plateau_min = None
+            self._plateau_times = [t]
+        if self._plateau_start is not None:
+            # Minimum kiri selalu segmen teratas stack selama plateau berlangsung
+            self._plateau_min = stack[-1][1]
+
+        self._close_cluster_if_done()
+        self._drain_queue()
+
+    def _add_peak(self, last_index):
+        start = self._plateau_start
+        mid = (start + last_index) // 2
+        value = self._plateau_value
+        if not value >= self.min_height:
+            return
+
+        peak = {
+            "index": mid,
+            "time": self._plateau_times[mid - start],
+            "height": value,
+            "prominent": None,
+            "kept": None,
+        }
+        if value - self._plateau_min >= self.prominence:
+            self._pending_prominence.append(peak)
+        else:
+            peak["prominent"] = False
+
+        if self._cluster and mid - self._cluster[-1]["index"] >= self.min_distance:
+            self._resolve_cluster(self._cluster)
+            self._cluster = []
+        self._cluster.append(peak)
+        self._queue.append(peak)
+
+    def _close_cluster_if_done(self):
+        if not self._cluster:
+            return
+        # Puncak berikutnya paling cepat berada di awal plateau yang sedang berjalan
+        # atau di sampel terakhir
+        next_index = self._plateau_start if self._plateau_start is not None else self.count - 1
+        if next_index - self._cluster[-1]["index"] >= self.min_distance:
+            self._resolve_cluster(self._cluster)
+            self._cluster = []
+
+    def _resolve_cluster(self, cluster, commit=True):
+        """Apply the distance rule to one cluster; returns the kept flags."""
+        keep = select_by_distance([p["index"] for p in cluster], [p["height"] for p in cluster],
+                                  self.min_distance).tolist()
+        if commit:
+            for peak, flag in zip(cluster, keep):
+                peak["kept"] = flag
+        return keep
+
+    def _drain_queue(self):
+        queue = self._queue
+        while queue and queue[0]["kept"] is not None:
+            peak = queue[0]
+            if peak["kept"] is False or peak["prominent"] is False:
+                queue.popleft()
+                continue
+            if peak["prominent"] is None:
+                break
+            queue.popleft()
+            self._apply_trend_filter(peak["time"], peak["height"],
+                                     self._accepted_times, self._accepted_heights)
+
+    def _apply_trend_filter(self, t, h, times, heights):
+        # PERBAIKAN (sama seperti detect_bounces): hanya puncak yang menurun dengan selisih cukup
+        if not heights:
+            times.append(t)
+            heights.append(h)
+        elif abs(h - heights[-1]) >= self.min_height_difference and h <= heights[-1]:
+            times.append(t)
+            heights.append(h)
+
+    def bounces(self):
+        """Return (bounce_times, bounce_heights) for all samples pushed so far."""
+        if self.count < self.MIN_SAMPLES:
+            return [], []
+
+        times = list(self._accepted_times)
+        heights = list(self._accepted_heights)
+        if not self._queue:
+            return times, heights
+
+        # Keputusan sementara untuk cluster yang belum tertutup; puncak yang
+        # dasar kanannya belum terkonfirmasi dianggap tidak prominent (seperti batch).
+        provisional = {}
+        if self._cluster:
+            for peak, flag in zip(self._cluster, self._resolve_cluster(self._cluster, commit=False)):
+                provisional[id(peak)] = flag
+
+        for peak in self._queue:
+            kept = peak["kept"] if peak["kept"] is not None else provisional.get(id(peak), False)
+            if kept and peak["prominent"] is True:
+                self._apply_trend_filter(peak["time"], peak["height"], times, heights)
+        return times, heights
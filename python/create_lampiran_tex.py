@@ -1,3 +1,4 @@
+import json
 import pandas as pd
 import re
 import matplotlib.pyplot as plt
@@ -18,25 +19,17 @@ list_bola = [
 # mendapatkan seluruh file dari direktori data
 data_files = [f for f in os.listdir(data_dir) if f.endswith('.xlsx')]
 analisis_files = [f for f in os.listdir(data_dir) if f.endswith('.txt')]
+record_files = [f for f in os.listdir(data_dir) if f.startswith('Analisis_') and f.endswith('.json')]
 image_files = [f for f in os.listdir(data_dir) if f.endswith('.png') or f.endswith('.jpg')]
 
-def extract_ringkasan_statistik(filename, jenis_bola, percobaan):
+def hitung_ringkasan(pasangan_tinggi, tinggi_awal):
     """
-    Ekstrak jumlah pantulan valid, koefisien rata-rata, dan standar deviasi
-    dari bagian 'RINGKASAN STATISTIK' file analisis bola.
-    Return: DataFrame dengan kolom ['Jumlah Pantulan', 'Koefisien Rata-rata', 'Standar Deviasi']
+    Hitung jumlah pantulan valid, koefisien rata-rata, dan standar deviasi
+    dari pasangan tinggi (sebelum, sesudah) setiap pantulan valid.
+    Return: dict dengan kunci ['Jumlah Pantulan', 'Koefisien Rata-rata', 'Standar Deviasi']
     """
-    with open(filename, encoding='utf-8') as f:
-        text = f.read()
-
-    pantulan = re.search(r'Pasangan Pantulan Valid\s*:\s*(\d+)', text)
-
-    tinggi_awal = 35  # cm
     tinggi_list = []
-    # Ambil semua ketinggian pada bagian PERHITUNGAN KOEFISIEN
-    # Format: Tinggi: 33.00 cm → 25.00 cm
-    tinggi_matches = re.findall(r'Tinggi:\s*([\d.]+)\s*cm\s*→\s*([\d.]+)\s*cm', text)
-    for awal, akhir in tinggi_matches:
+    for awal, akhir in pasangan_tinggi:
         tinggi_list.append(float(awal))
         tinggi_list.append(float(akhir))
 
@@ -67,42 +60,82 @@ def extract_ringkasan_statistik(filename, jenis_bola, percobaan):
     else:
         stddev = None
 
-    data = {
-        'Jumlah Pantulan': [int(jumlah_pantulan) if jumlah_pantulan else None],
-        'Koefisien Rata-rata': [float(rata_rata_koefisien) if rata_rata_koefisien else None],
-        'Standar Deviasi': [float(stddev) if stddev else None]
+    return {
+        'Jumlah Pantulan': int(jumlah_pantulan) if jumlah_pantulan else None,
+        'Koefisien Rata-rata': float(rata_rata_koefisien) if rata_rata_koefisien else None,
+        'Standar Deviasi': float(stddev) if stddev else None
     }
-    dataframe = pd.DataFrame(data)
-    dataframe['Ketelitian (%)'] = (1 - dataframe['Standar Deviasi'] / dataframe['Koefisien Rata-rata']) * 100
-    dataframe['Jenis Bola'] = jenis_bola
-    dataframe['Percobaan'] = percobaan
-    return dataframe
-
-# Gabungkan semua DataFrame hasil ekstraksi ke satu DataFrame
-all_stats = []
-
-for analisis in analisis_files:
-    # format file 
-    # Analisis_{jenis_bola}_{percobaan}.txt
-    # Contoh:
-    # Analisis_Bola_Tenis_Lapang_17.txt
-    # Mengambil jenis bola dan percobaan dari nama file
-    jenis_bola = analisis.split('_')[2]  # Ambil semua bagian kecuali 'Analisis' dan '.txt'
+
+def ringkasan_dari_record(filename):
+    """
+    Ringkasan dari record JSON hasil analisis (sidecar dari main.py atau
+    batch_analysis.py --records). Jumlah pasangan valid, koefisien rata-rata
+    dan standar deviasi diambil langsung dari record, tanpa dihitung ulang.
+    """
+    with open(filename, encoding='utf-8') as f:
+        record = json.load(f)
+    stats = record['stats'] or {}
+    return {
+        'Jumlah Pantulan': record['valid_pairs'] or None,
+        'Koefisien Rata-rata': stats.get('mean'),
+        'Standar Deviasi': stats.get('std'),
+        'Tinggi Sensor (cm)': record['sensor_height']
+    }
+
+def extract_ringkasan_statistik(filename):
+    """
+    Fallback untuk laporan lama tanpa record JSON: ekstrak pasangan tinggi
+    dari bagian 'PERHITUNGAN KOEFISIEN' dan tinggi sensor dari laporan.
+    """
+    with open(filename, encoding='utf-8') as f:
+        text = f.read()
+
+    # Format: Tinggi Sensor dari Lantai    : 35.0 cm (laporan sangat lama: 35 cm)
+    sensor = re.search(r'Tinggi Sensor dari Lantai\s*:\s*([\d.]+)\s*cm', text)
+    tinggi_sensor = float(sensor.group(1)) if sensor else 35.0
+    # Format: Tinggi: 33.00 cm → 25.00 cm
+    tinggi_matches = re.findall(r'Tinggi:\s*([\d.]+)\s*cm\s*→\s*([\d.]+)\s*cm', text)
+    ringkasan = hitung_ringkasan(tinggi_matches, tinggi_sensor)
+    ringkasan['Tinggi Sensor (cm)'] = tinggi_sensor
+    return ringkasan
+
+def jenis_dan_percobaan(analisis):
+    """
+    format file
+    Analisis_{jenis_bola}_{percobaan}.txt / .json
+    Contoh:
+    Analisis_Bola_Tenis_Lapang_17.txt
+    """
+    jenis_bola = analisis.split('_')[2]
     # jika jenis_bola menghasilkan teks tenis, maka yang diambil adalah indeks selanjutnya dari split
     if jenis_bola == 'Tenis':
         jenis_bola = analisis.split('_')[3]
+    percobaan = os.path.splitext(analisis)[0].split('_')[-1]
+    return jenis_bola, percobaan
 
-    percobaan = analisis.split('_')[-1].replace('.txt', '')
-    print(f"Memproses {analisis} untuk Jenis Bola: {jenis_bola}, Percobaan: {percobaan}")
-
-    # print(f"Jenis Bola {jenis_bola}, Percobaan {percobaan}")
+# Record JSON dipakai bila ada; laporan teks hanya untuk analisis lama tanpa record
+sumber_analisis = {os.path.splitext(f)[0]: f for f in analisis_files}
+sumber_analisis.update({os.path.splitext(f)[0]: f for f in record_files})
 
-    df = extract_ringkasan_statistik(os.path.join(data_dir, analisis), jenis_bola, percobaan)
-    # print(df)
-    all_stats.append(df)
+rows = []
+for nama, analisis in sorted(sumber_analisis.items()):
+    jenis_bola, percobaan = jenis_dan_percobaan(analisis)
+    print(f"Memproses {analisis} untuk Jenis Bola: {jenis_bola}, Percobaan: {percobaan}")
 
-# Gabungkan semua DataFrame menjadi satu
-combined_df = pd.concat(all_stats, ignore_index=True)
+    path = os.path.join(data_dir, analisis)
+    if analisis.endswith('.json'):
+        row = ringkasan_dari_record(path)
+    else:
+        row = extract_ringkasan_statistik(path)
+    row['Jenis Bola'] = jenis_bola
+    row['Percobaan'] = percobaan
+    rows.append(row)
+
+# Gabungkan semua hasil menjadi satu DataFrame (sekali bangun, tanpa concat per file)
+combined_df = pd.DataFrame(rows, columns=['Jumlah Pantulan', 'Koefisien Rata-rata', 'Standar Deviasi',
+                                          'Jenis Bola', 'Percobaan', 'Tinggi Sensor (cm)'])
+combined_df.insert(3, 'Ketelitian (%)',
+                   (1 - combined_df['Standar Deviasi'] / combined_df['Koefisien Rata-rata']) * 100)
 # Simpan DataFrame gabungan ke file Excel
 output_file = os.path.join(output_dir, 'ringkasan_statistik.xlsx')
 combined_df.to_excel(output_file, index=False)
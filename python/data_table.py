@@ -0,0 +1,189 @@
+import numpy as np
+
+from app_logging import get_logger
+
+log = get_logger("table")
+
+
+class DataTable:
+    """Keeps the `ttk.Treeview` data table in sync with a SampleStore incrementally.
+
+    Tail mode (default) shows the newest `max_rows` samples: each refresh only
+    inserts the rows that arrived since the previous refresh and trims the
+    oldest rows from the top, instead of deleting and re-inserting everything.
+
+    Virtual mode lets the operator browse the whole run. The Treeview holds a
+    fixed pool of `max_rows` items whose values are rewritten for the visible
+    window; the scrollbar is mapped onto the full sample range, so tens of
+    thousands of samples never become Treeview items.
+    """
+
+    def __init__(self, tree, scrollbar, max_rows=50):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.max_rows = max_rows
+        self.virtual = False
+        self.store = None
+        self._source = None        # (store, generation) yang sedang ditampilkan
+        self.sensor_height = None
+        self._rows = []            # indeks absolut baris yang tampil (mode tail)
+        self._last_total = 0
+        self._offset = 0           # indeks baris pertama yang tampil (mode virtual)
+        self._follow_tail = True
+        self._rendered_key = None
+        tree.bind("<MouseWheel>", self._on_mousewheel, add="+")
+        tree.bind("<Button-4>", self._on_mousewheel, add="+")
+        tree.bind("<Button-5>", self._on_mousewheel, add="+")
+
+    # ------------------------------------------------------------------
+    def refresh(self, store, sensor_height):
+        """Bring the table up to date with `store`."""
+        self.store = store
+        source = (id(store), store.generation)
+        if source != self._source:
+            # Store lain atau store yang di-clear lalu terisi lagi: baris lama tidak berlaku
+            self._source = source
+            self.reset()
+        if sensor_height != self.sensor_height:
+            # Kolom jarak mentah bergantung pada tinggi sensor: bangun ulang
+            self.sensor_height = sensor_height
+            self._clear_rows()
+        if self.virtual:
+            self._render_virtual()
+        else:
+            self._refresh_tail()
+
+    def set_virtual(self, enabled):
+        """Switch between tail mode and whole-run virtual scrolling."""
+        self.virtual = enabled
+        self._clear_rows()
+        if enabled:
+            self.tree.configure(yscrollcommand=lambda *args: None)
+            self.scrollbar.config(command=self._on_scroll)
+            self._follow_tail = True
+        else:
+            self.tree.configure(yscrollcommand=self.scrollbar.set)
+            self.scrollbar.config(command=self.tree.yview)
+        if self.store is not None:
+            self.refresh(self.store, self.sensor_height)
+
+    def reset(self):
+        """Drop all rows, e.g. when the table is pointed at another store."""
+        self._clear_rows()
+        self._offset = 0
+        self._follow_tail = True
+
+    def _clear_rows(self):
+        children = self.tree.get_children()
+        if children:
+            self.tree.delete(*children)
+        self._rows = []
+        self._last_total = 0
+        self._rendered_key = None
+
+    def _format_rows(self, start, stop):
+        """Format store rows [start, stop) (relative to the store window)."""
+        times = self.store.times[start:stop]
+        heights = self.store.heights[start:stop]
+        raw = self.sensor_height - heights
+        first_number = self.store.first_index + start + 1
+        rows = []
+        for i, (t, d, r) in enumerate(zip(times.tolist(), heights.tolist(), raw.tolist())):
+            rows.append((first_number + i, f"{t:.2f}", f"{d:.1f}", f"{r:.1f}"))
+        return rows
+
+    # ------------------------------------------------------------------
+    # Mode tail: tambah baris baru, buang baris lama dari atas
+    # ------------------------------------------------------------------
+    def _refresh_tail(self):
+        store = self.store
+        total = store.total_count
+        if total == self._last_total:
+            return
+
+        first_new = max(self._last_total, total - self.max_rows, store.first_index)
+        start = first_new - store.first_index
+        times = store.times[start:]
+        heights = store.heights[start:]
+        # PERBAIKAN: Validasi data sebelum menampilkan (sekaligus untuk semua baris baru)
+        valid = np.isfinite(times) & np.isfinite(heights)
+
+        for offset, row in enumerate(self._format_rows(start, len(store))):
+            if not valid[offset]:
+                log.debug("Skipping invalid data point %d: NaN or Inf values", row[0] - 1)
+                continue
+            iid = str(row[0])
+            self.tree.insert('', 'end', iid=iid, values=row)
+            self._rows.append(iid)
+
+        excess = len(self._rows) - self.max_rows
+        if excess > 0:
+            self.tree.delete(*self._rows[:excess])
+            del self._rows[:excess]
+        self._last_total = total
+
+        # Scroll to bottom
+        if self._rows:
+            self.tree.see(self._rows[-1])
+
+    # ------------------------------------------------------------------
+    # Mode virtual: pool item tetap, nilai ditulis ulang sesuai jendela
+    # ------------------------------------------------------------------
+    def _max_offset(self):
+        return max(len(self.store) - self.max_rows, 0) if self.store is not None else 0
+
+    def _render_virtual(self):
+        store = self.store
+        n = len(store)
+        if self._follow_tail:
+            self._offset = self._max_offset()
+        self._offset = min(max(self._offset, 0), self._max_offset())
+
+        key = (self._offset, store.version, n)
+        if key == self._rendered_key:
+            return
+        self._rendered_key = key
+
+        rows = self._format_rows(self._offset, min(self._offset + self.max_rows, n))
+        for i, row in enumerate(rows):
+            iid = f"v{i}"
+            if i < len(self._rows):
+                self.tree.item(iid, values=row)
+            else:
+                self.tree.insert('', 'end', iid=iid, values=row)
+                self._rows.append(iid)
+        if len(self._rows) > len(rows):
+            self.tree.delete(*self._rows[len(rows):])
+            del self._rows[len(rows):]
+
+        if n:
+            self.scrollbar.set(self._offset / n, min(self._offset + self.max_rows, n) / n)
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def _scroll_to(self, offset):
+        self._offset = min(max(int(offset), 0), self._max_offset())
+        self._follow_tail = self._offset >= self._max_offset()
+        self._render_virtual()
+
+    def _on_scroll(self, action, amount, unit=None):
+        """Scrollbar command in virtual mode ('moveto' / 'scroll')."""
+        if self.store is None:
+            return
+        if action == "moveto":
+            self._scroll_to(round(float(amount) * len(self.store)))
+        elif action == "scroll":
+            step = self.max_rows if unit == "pages" else 1
+            self._scroll_to(self._offset + int(amount) * step)
+
+    def _on_mousewheel(self, event):
+        if not self.virtual or self.store is None:
+            return None
+        if getattr(event, "num", None) == 4:
+            delta = -3
+        elif getattr(event, "num", None) == 5:
+            delta = 3
+        else:
+            delta = -3 if event.delta > 0 else 3
+        self._scroll_to(self._offset + delta)
+        return "break"
@@ -0,0 +1,247 @@
+import numpy as np
+
+
+class MinMaxPyramid:
+    """Multi-resolution min/max index of a (time, value) series for plotting.
+
+    Level k summarizes blocks of `factor**(k + 1)` samples by the index of
+    their minimum and maximum. A query for a visible index window picks the
+    coarsest level that still has at least one block per pixel column, merges
+    those blocks into one group per column and returns the min and max sample
+    of every group in index order. The drawn line keeps the full envelope
+    (every apex and every floor contact) while the number of points is
+    bounded by the screen width instead of the data length.
+
+    Live data only grows at the end, so `extend` recomputes just the last
+    (partial) block of every level, writing into buffers that grow by
+    doubling like SampleStore. Blocks are aligned to absolute sample indices
+    (`first` = SampleStore.first_index), so when a ring-mode store drops its
+    oldest samples only the blocks before the new first sample are discarded
+    and the first (partial) block is recomputed; `rebuild` starts over when
+    the series was replaced.
+    """
+
+    def __init__(self, factor=4, min_blocks=64):
+        self.factor = factor
+        self.min_blocks = min_blocks
+        self.rebuild(np.empty(0))
+
+    def rebuild(self, values, first=0):
+        self._reset(first)
+        self.extend(values, first)
+
+    def _reset(self, first):
+        self.first = first  # indeks absolut values[0]
+        self.count = 0
+        # Per level: buffer argmin, buffer argmax (indeks absolut), offset buffer,
+        # nomor blok absolut pertama, jumlah blok terisi
+        self._levels = []
+
+    @property
+    def levels(self):
+        """(argmin, argmax) absolute index arrays per level, finest first."""
+        return [(lo[off:off + size], hi[off:off + size]) for lo, hi, off, base, size in self._levels]
+
+    def _store(self, level, first_block, lo, hi):
+        """Write blocks [first_block, first_block + len(lo)) of `level`, growing its buffers if needed."""
+        stop_block = first_block + len(lo)
+        if level == len(self._levels):
+            capacity = max(len(lo), 64)
+            self._levels.append([np.empty(capacity, dtype=np.intp),
+                                 np.empty(capacity, dtype=np.intp), 0, first_block, 0])
+        entry = self._levels[level]
+        off, base = entry[2], entry[3]
+        if off + stop_block - base > len(entry[0]):
+            # Geser ke awal buffer (blok depan yang dibuang) dan/atau perbesar
+            keep = entry[4]
+            capacity = max(stop_block - base, 2 * keep, 64)
+            for i in (0, 1):
+                grown = np.empty(capacity, dtype=np.intp)
+                grown[:keep] = entry[i][off:off + keep]
+                entry[i] = grown
+            entry[2] = off = 0
+        pos = off + first_block - base
+        entry[0][pos:pos + len(lo)] = lo
+        entry[1][pos:pos + len(hi)] = hi
+        entry[4] = max(entry[4], stop_block - base)
+
+    def _drop_front(self, level, first_block):
+        """Discard the blocks of `level` before `first_block` (samples left the ring)."""
+        entry = self._levels[level]
+        drop = min(max(first_block - entry[3], 0), entry[4])
+        entry[2] += drop
+        entry[3] += drop
+        entry[4] -= drop
+
+    def __len__(self):
+        return self.count
+
+    def extend(self, values, first=0):
+        """Index the new samples of `values`, the whole series (or ring window) so far.
+
+        `first` is the absolute index of `values[0]`; it only grows while the
+        same series is extended.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        n = len(values)
+        end = first + n
+        old_first, old_end = self.first, self.first + self.count
+        if self.count and (first < old_first or end < old_end or first >= old_end):
+            self._reset(first)
+            old_first = old_end = first
+        elif not self.count:
+            self.first = old_first = old_end = first
+        if first == old_first and end == old_end:
+            return
+        self.first = first
+
+        block = 1
+        level = 0
+        while True:
+            child_block = block
+            block *= self.factor
+            first_block = first // block
+            stop_block = -(-end // block)
+            n_blocks = stop_block - first_block
+            if level > 0 and n_blocks < self.min_blocks:
+                del self._levels[level:]
+                break
+            if level < len(self._levels):
+                self._drop_front(level, first_block)
+                if first != old_first:
+                    # Blok depan kehilangan sampel terlama
+                    self._compute(values, level, first_block, first_block + 1, child_block)
+                # Blok pertama yang berubah di ujung belakang
+                tail = max(old_end // block, first_block)
+            else:
+                # Level baru dihitung seluruhnya
+                tail = first_block
+            self._compute(values, level, tail, stop_block, child_block)
+            level += 1
+            if n_blocks <= 1:
+                del self._levels[level:]
+                break
+        self.count = n
+
+    def _compute(self, values, level, first_block, stop_block, child_block):
+        """Recompute blocks [first_block, stop_block) of `level` and store them."""
+        if stop_block <= first_block:
+            return
+        block = child_block * self.factor
+        if level == 0:
+            start = max(first_block * block, self.first)
+            stop = min(stop_block * block, self.first + len(values))
+            lo, hi = self._reduce_raw(values, self.first, start, stop, block)
+        else:
+            lo_buf, hi_buf, off, base, size = self._levels[level - 1]
+            # Blok anak yang tersedia (blok anak sebelum sampel pertama sudah dibuang)
+            c_start = max(first_block * self.factor, base)
+            c_stop = min(stop_block * self.factor, base + size)
+            lo, hi = self._reduce_groups(values, lo_buf[off + c_start - base:off + c_stop - base],
+                                         hi_buf[off + c_start - base:off + c_stop - base],
+                                         self.factor, self.first, c_start % self.factor)
+        self._store(level, first_block, lo, hi)
+
+    @staticmethod
+    def _reduce_raw(values, first, start, stop, block):
+        """(argmin, argmax) absolute indices per block for absolute samples [start, stop)."""
+        chunk = values[start - first:stop - first]
+        front = start % block
+        pad = -stop % block
+        # Sampel NaN tidak boleh terpilih sebagai min/max
+        lo_src = np.where(np.isnan(chunk), np.inf, chunk)
+        hi_src = np.where(np.isnan(chunk), -np.inf, chunk)
+        if front or pad:
+            lo_src = np.concatenate((np.full(front, np.inf), lo_src, np.full(pad, np.inf)))
+            hi_src = np.concatenate((np.full(front, -np.inf), hi_src, np.full(pad, -np.inf)))
+        offsets = start - front + np.arange(0, len(lo_src), block)
+        lo = offsets + lo_src.reshape(-1, block).argmin(axis=1)
+        hi = offsets + hi_src.reshape(-1, block).argmax(axis=1)
+        # Blok pertama/terakhir yang terpotong tidak boleh menunjuk ke padding
+        return np.clip(lo, start, stop - 1), np.clip(hi, start, stop - 1)
+
+    @staticmethod
+    def _reduce_groups(values, lo_idx, hi_idx, group, first=0, front=0):
+        """(argmin, argmax) per run of `group` consecutive blocks given their own
+        argmin/argmax absolute indices; the first run lacks its `front` first blocks."""
+        pad = -(front + len(lo_idx)) % group
+        lo_vals = values[lo_idx - first]
+        hi_vals = values[hi_idx - first]
+        lo_vals = np.where(np.isnan(lo_vals), np.inf, lo_vals)
+        hi_vals = np.where(np.isnan(hi_vals), -np.inf, hi_vals)
+        if front or pad:
+            lo_idx = np.concatenate((np.repeat(lo_idx[:1], front), lo_idx, np.repeat(lo_idx[-1:], pad)))
+            hi_idx = np.concatenate((np.repeat(hi_idx[:1], front), hi_idx, np.repeat(hi_idx[-1:], pad)))
+            lo_vals = np.concatenate((np.full(front, np.inf), lo_vals, np.full(pad, np.inf)))
+            hi_vals = np.concatenate((np.full(front, -np.inf), hi_vals, np.full(pad, -np.inf)))
+        rows = np.arange(len(lo_idx) // group)
+        lo_pick = lo_vals.reshape(-1, group).argmin(axis=1)
+        hi_pick = hi_vals.reshape(-1, group).argmax(axis=1)
+        return (lo_idx.reshape(-1, group)[rows, lo_pick],
+                hi_idx.reshape(-1, group)[rows, hi_pick])
+
+    @staticmethod
+    def _raw_extremes(values, start, stop):
+        """Indices of the minimum and maximum of samples [start, stop) (empty if none)."""
+        if stop <= start:
+            return np.empty(0, dtype=np.intp)
+        chunk = values[start:stop]
+        return start + np.array([np.where(np.isnan(chunk), np.inf, chunk).argmin(),
+                                 np.where(np.isnan(chunk), -np.inf, chunk).argmax()])
+
+    def query(self, values, start, stop, n_bins, keep=None):
+        """Sorted sample indices to draw for samples [start, stop) at `n_bins`
+        pixel columns. Indices in `keep` (e.g. bounce apexes) inside the range
+        are always included."""
+        start = max(0, start)
+        stop = min(stop, self.count)
+        span = stop - start
+        if span <= 0:
+            return np.empty(0, dtype=np.intp)
+        if span <= 2 * n_bins or not self._levels:
+            return np.arange(start, stop)
+
+        # Level paling kasar yang masih memberi >= n_bins blok di jendela
+        level = -1
+        block = 1
+        while level + 1 < len(self._levels) and span // (block * self.factor) >= n_bins:
+            level += 1
+            block *= self.factor
+        if level < 0:
+            return np.arange(start, stop)
+
+        lo_buf, hi_buf, off, base, size = self._levels[level]
+        # Hanya blok yang seluruhnya di dalam jendela; potongan blok di kedua tepi
+        # dipindai langsung agar ekstremnya tidak tertukar dengan sampel di luar jendela
+        first = -(-(start + self.first) // block)
+        last = max((stop + self.first) // block, first)
+        edge_start, edge_stop = first * block - self.first, last * block - self.first
+        # Gabungkan blok menjadi kira-kira satu kelompok per kolom piksel
+        group = max(1, -(-(last - first) // n_bins))
+        lo, hi = self._reduce_groups(values, lo_buf[off + first - base:off + last - base],
+                                     hi_buf[off + first - base:off + last - base], group, self.first)
+        lo, hi = lo - self.first, hi - self.first
+        parts = [lo, hi, self._raw_extremes(values, start, min(edge_start, stop)),
+                 self._raw_extremes(values, max(edge_stop, start), stop)]
+        parts.append([start, stop - 1])
+        if keep is not None and len(keep):
+            keep = np.asarray(keep, dtype=np.intp)
+            parts.append(keep[(keep >= start) & (keep < stop)])
+        indices = np.unique(np.concatenate(parts).astype(np.intp))
+        return indices[(indices >= start) & (indices < stop)]
+
+
+def visible_range(times, t_lo, t_hi):
+    """Index range [start, stop) of the samples inside [t_lo, t_hi], widened by
+    one sample on each side so the line runs to the edges of the axes."""
+    start = int(np.searchsorted(times, t_lo, side="left")) - 1
+    stop = int(np.searchsorted(times, t_hi, side="right")) + 1
+    return max(start, 0), min(stop, len(times))
+
+
+def apex_indices(times, apex_times):
+    """Sample indices of apexes given by time (as returned by the bounce detectors)."""
+    if len(apex_times) == 0 or len(times) == 0:
+        return np.empty(0, dtype=np.intp)
+    indices = np.searchsorted(times, np.asarray(apex_times, dtype=np.float64))
+    return np.clip(indices, 0, len(times) - 1)
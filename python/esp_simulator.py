@@ -0,0 +1,451 @@
+"""Simulator ESP8266/ESP32 + HC-SR04 untuk menguji sisi Python tanpa alat fisik.
+
+Perilaku mengikuti espcode/espcode.h:
+  - data di `sensor/distance`: JSON {"timestamp", "distance", "device", "uptime",
+    "reading_time"} atau frame biner "KR" (FORMAT:BINARY[:N])
+  - perintah di `sensor/distance/cmd`: START_READING, STOP_READING,
+    INTERVAL:<ms>, FORMAT:BINARY[:N], FORMAT:JSON, READ_DISTANCE
+  - jarak dibulatkan ke bawah ke cm utuh, pembacaan < 2 cm atau > 400 cm dibuang
+
+Lintasan bola dihitung secara fisika (jatuh bebas, tumbukan dengan koefisien
+restitusi e), ditambah derau sensor, kuantisasi dan pembacaan yang hilang.
+
+Contoh:
+    python esp_simulator.py --broker localhost --devices 3 --rate 20
+    python esp_simulator.py --inprocess --devices 10 --rate 100 --duration 10 --autostart
+"""
+import argparse
+import json
+import threading
+import time
+
+import numpy as np
+
+from ingest import IngestQueue, decode_messages, encode_binary_frame
+
+DATA_TOPIC = "sensor/distance"
+CMD_TOPIC = DATA_TOPIC + "/cmd"
+GRAVITY = 981.0            # cm/s²
+MIN_DISTANCE = 2           # batas bawah HC-SR04 di firmware (cm)
+MAX_DISTANCE = 400         # batas atas HC-SR04 di firmware (cm)
+FIRMWARE_INTERVAL = (50, 5000)  # rentang INTERVAL:<ms> yang diterima firmware
+MAX_BATCH = 32             # batas FORMAT:BINARY:N di firmware
+
+
+def bounce_heights(t, drop_height, restitution, hold=0.5, min_speed=5.0):
+    """Height (cm) of a ball released from `drop_height` after `hold` seconds.
+
+    Free fall between impacts; each impact multiplies the speed by
+    `restitution`. Once the take-off speed drops below `min_speed` (cm/s)
+    the ball is at rest on the floor. `t` may be an array.
+    """
+    t = np.asarray(t, dtype=np.float64) - hold
+    heights = np.full(t.shape, float(drop_height))
+
+    # Kecepatan lepas landas setiap pantulan dan waktu tumbukannya
+    v0 = np.sqrt(2 * GRAVITY * drop_height)
+    if restitution > 0 and v0 * restitution >= min_speed:
+        n_bounces = int(np.floor(np.log(min_speed / (v0 * restitution)) / np.log(restitution))) + 1
+    else:
+        n_bounces = 0
+    speeds = v0 * restitution ** np.arange(1, n_bounces + 1)
+    first_impact = v0 / GRAVITY
+    impacts = first_impact + np.concatenate(([0.0], np.cumsum(2 * speeds / GRAVITY)))
+
+    falling = (t >= 0) & (t < first_impact)
+    heights[falling] = drop_height - 0.5 * GRAVITY * t[falling] ** 2
+
+    after = t >= first_impact
+    segment = np.searchsorted(impacts, t[after], side="right") - 1
+    in_flight = segment < n_bounces
+    dt = t[after] - impacts[np.minimum(segment, n_bounces)]
+    flight = np.zeros(dt.shape)
+    v = speeds[segment[in_flight]]
+    flight[in_flight] = v * dt[in_flight] - 0.5 * GRAVITY * dt[in_flight] ** 2
+    heights[after] = np.maximum(flight, 0.0)
+    return heights
+
+
+class SensorModel:
+    """HC-SR04 reading model: Gaussian noise, whole-cm truncation (as
+    `duration * 0.034 / 2` cast to long) and random dropouts."""
+
+    def __init__(self, noise=0.3, dropout=0.02, rng=None):
+        self.noise = noise
+        self.dropout = dropout
+        self.rng = rng if rng is not None else np.random.default_rng()
+
+    def read(self, true_distance):
+        """Measured distances (cm, integer valued); -1 where the reading failed."""
+        true_distance = np.asarray(true_distance, dtype=np.float64)
+        measured = true_distance + self.rng.normal(0.0, self.noise, true_distance.shape)
+        distance = np.floor(measured)
+        lost = self.rng.random(true_distance.shape) < self.dropout
+        invalid = lost | (distance < MIN_DISTANCE) | (distance > MAX_DISTANCE)
+        return np.where(invalid, -1, distance).astype(np.int64)
+
+
+class InProcessTransport:
+    """Minimal in-process broker stand-in: synchronous publish/subscribe.
+
+    Subscribers get paho-style callbacks `(client, userdata, msg)` where
+    `msg` has `topic` and `payload` (bytes), so `main.on_message` can be
+    attached directly.
+    """
+
+    class Message:
+        __slots__ = ("topic", "payload")
+
+        def __init__(self, topic, payload):
+            self.topic = topic
+            self.payload = payload
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topic, callback):
+        with self._lock:
+            self._subscribers.setdefault(topic, []).append(callback)
+
+    def publish(self, topic, payload):
+        if isinstance(payload, str):
+            payload = payload.encode()
+        self.published += 1
+        msg = self.Message(topic, payload)
+        for callback in self._subscribers.get(topic, ()):
+            callback(self, None, msg)
+        return True
+
+
+class PahoTransport:
+    """Transport over a real MQTT broker (e.g. a local mosquitto)."""
+
+    def __init__(self, host="localhost", port=1883, client_id=None):
+        import paho.mqtt.client as mqtt
+
+        try:
+            self.client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=client_id or "")
+        except AttributeError:
+            self.client = mqtt.Client(client_id=client_id or "")
+        self._subscribers = {}
+        self.published = 0
+        self.client.on_message = self._on_message
+        self.client.on_connect = self._on_connect
+        self.client.connect(host, port, 60)
+        self.client.loop_start()
+
+    def _on_connect(self, client, userdata, flags, reason_code, properties=None):
+        for topic in self._subscribers:
+            client.subscribe(topic)
+
+    def _on_message(self, client, userdata, msg):
+        for callback in self._subscribers.get(msg.topic, ()):
+            callback(client, userdata, msg)
+
+    def subscribe(self, topic, callback):
+        self._subscribers.setdefault(topic, []).append(callback)
+        self.client.subscribe(topic)
+
+    def publish(self, topic, payload):
+        self.published += 1
+        return self.client.publish(topic, payload).rc == 0
+
+    def close(self):
+        self.client.disconnect()
+        self.client.loop_stop()
+
+
+class SimulatedESP:
+    """One ESP + HC-SR04 rig with the command handling of espcode.h.
+
+    Time is passed in explicitly (`tick(now_ms)`), so the same device can be
+    driven in real time or as fast as possible with a virtual clock.
+    """
+
+    def __init__(self, device_id, transport, interval_ms=100, restitution=0.9,
+                 drop_height=32.0, sensor_height=35.0, sensor=None, seed=None,
+                 strict=True):
+        self.device_id = device_id
+        self.transport = transport
+        self.interval_ms = interval_ms
+        self.restitution = restitution
+        self.drop_height = drop_height
+        self.sensor_height = sensor_height
+        self.rng = np.random.default_rng(seed)
+        self.sensor = sensor if sensor is not None else SensorModel(rng=self.rng)
+        self.strict = strict  # batasi perintah INTERVAL/FORMAT seperti firmware
+        # Perintah datang dari thread lain (Tk / jaringan paho) saat tick berjalan di
+        # thread simulator; satu lock menjaga batch biner dan jam perangkat tetap konsisten
+        self._lock = threading.RLock()
+
+        self.is_reading = False
+        self.binary_mode = False
+        self.batch_size = 10
+        self._batch_t = []
+        self._batch_d = []
+        self.now_ms = 0
+        self.reading_start_ms = 0
+        self.last_read_ms = 0
+        self._trial = None
+        self.sent_samples = 0
+        self.dropped_samples = 0
+        transport.subscribe(CMD_TOPIC, self._on_command)
+
+    # ------------------------------------------------------------------
+    # Perintah
+    # ------------------------------------------------------------------
+    def _on_command(self, client, userdata, msg):
+        payload = msg.payload.decode(errors="replace") if isinstance(msg.payload, bytes) else str(msg.payload)
+        self.handle_command(payload)
+
+    def handle_command(self, message):
+        with self._lock:
+            self._handle_command(message)
+
+    def _handle_command(self, message):
+        if message == "START_READING":
+            self.is_reading = True
+            self.reading_start_ms = self.now_ms
+            self.last_read_ms = self.now_ms  # bacaan pertama satu interval setelah START, bukan susulan masa idle
+            self._new_trial()
+        elif message == "STOP_READING":
+            self.is_reading = False
+            self._publish_batch()
+        elif message == "READ_DISTANCE":
+            distance = self._read(np.array([self._elapsed()]))[0]
+            if distance > 0:
+                self._publish_json(distance, command_response=True)
+        elif message.startswith("FORMAT:BINARY"):
+            size = int(message[14:]) if len(message) > 14 and message[14:].isdigit() else self.batch_size
+            if 1 <= size <= MAX_BATCH or not self.strict:
+                self._publish_batch()
+                self.batch_size = size
+                self.binary_mode = True
+        elif message == "FORMAT:JSON":
+            self._publish_batch()
+            self.binary_mode = False
+        elif message.startswith("INTERVAL:"):
+            try:
+                interval = int(message[9:])
+            except ValueError:
+                return
+            low, high = FIRMWARE_INTERVAL
+            if low <= interval <= high or (not self.strict and interval > 0):
+                self.interval_ms = interval
+
+    def announce(self):
+        """Status message the firmware publishes after (re)connecting."""
+        self.transport.publish(DATA_TOPIC, json.dumps({
+            "timestamp": self.now_ms / 1000.0,
+            "message": "Device connected",
+            "device": self.device_id,
+            "status": "online",
+        }))
+
+    # ------------------------------------------------------------------
+    # Loop
+    # ------------------------------------------------------------------
+    def _new_trial(self):
+        # Variasi kecil antar percobaan seperti di praktikum
+        self._trial = {
+            "drop_height": self.drop_height + self.rng.normal(0, 0.5),
+            "restitution": float(np.clip(self.restitution + self.rng.normal(0, 0.01), 0, 0.99)),
+            "hold": self.rng.uniform(0.3, 1.0),
+        }
+
+    def _elapsed(self):
+        return (self.now_ms - self.reading_start_ms) / 1000.0
+
+    def _read(self, t):
+        if self._trial is None:
+            self._new_trial()
+        heights = bounce_heights(t, self._trial["drop_height"], self._trial["restitution"],
+                                 self._trial["hold"])
+        return self.sensor.read(self.sensor_height - heights)
+
+    def tick(self, now_ms):
+        """Advance the device clock to `now_ms` and take every reading that is due."""
+        with self._lock:
+            return self._tick(now_ms)
+
+    def _tick(self, now_ms):
+        self.now_ms = int(now_ms)
+        if not self.is_reading:
+            self.last_read_ms = self.now_ms
+            return 0
+        due = (self.now_ms - self.last_read_ms) // self.interval_ms
+        if due <= 0:
+            return 0
+        read_ms = self.last_read_ms + self.interval_ms * np.arange(1, due + 1)
+        self.last_read_ms = int(read_ms[-1])
+        t = (read_ms - self.reading_start_ms) / 1000.0
+        distances = self._read(t)
+        valid = distances > 0
+        self.dropped_samples += int(np.count_nonzero(~valid))
+        for ts, distance in zip(t[valid].tolist(), distances[valid].tolist()):
+            if self.binary_mode:
+                self._batch_t.append(ts)
+                self._batch_d.append(distance)
+                if len(self._batch_t) >= self.batch_size:
+                    self._publish_batch()
+            else:
+                self._publish_json(distance, timestamp=ts)
+        return int(np.count_nonzero(valid))
+
+    def _publish_json(self, distance, timestamp=None, command_response=False):
+        timestamp = self._elapsed() if timestamp is None else timestamp
+        doc = {"timestamp": round(timestamp, 3), "distance": int(distance), "device": self.device_id}
+        if command_response:
+            doc["command_response"] = True
+        else:
+            doc["uptime"] = self.now_ms
+            doc["reading_time"] = round(timestamp, 3)
+        if self.transport.publish(DATA_TOPIC, json.dumps(doc)):
+            self.sent_samples += 1
+
+    def _publish_batch(self):
+        if not self._batch_t:
+            return
+        frame = encode_binary_frame(self._batch_t, self._batch_d, self.device_id)
+        if self.transport.publish(DATA_TOPIC, frame):
+            self.sent_samples += len(self._batch_t)
+        self._batch_t = []
+        self._batch_d = []
+
+
+class Simulation:
+    """N simulated devices sharing one transport, driven by one scheduler."""
+
+    def __init__(self, transport, devices=1, rate_hz=10, restitution=0.9, seed=0,
+                 binary_batch=None, **device_options):
+        interval_ms = max(1, int(round(1000 / rate_hz)))
+        strict = interval_ms >= FIRMWARE_INTERVAL[0]
+        self.transport = transport
+        self.devices = [
+            SimulatedESP(f"SIM_{i + 1:02d}", transport, interval_ms, restitution,
+                         seed=None if seed is None else seed + i, strict=strict, **device_options)
+            for i in range(devices)
+        ]
+        if binary_batch:
+            for device in self.devices:
+                device.handle_command(f"FORMAT:BINARY:{binary_batch}")
+        self._stop = threading.Event()
+        self._thread = None
+
+    def command(self, message):
+        """Send a command to every device through the transport (like the GUI)."""
+        self.transport.publish(CMD_TOPIC, message)
+
+    def run(self, duration, realtime=True, step_ms=None):
+        """Run the devices for `duration` seconds.
+
+        With `realtime=False` a virtual clock advances in `step_ms` steps
+        (default: one sample interval) without sleeping.
+        """
+        step_ms = step_ms or min(device.interval_ms for device in self.devices)
+        start = time.perf_counter()
+        now_ms = 0
+        end_ms = duration * 1000
+        while now_ms < end_ms and not self._stop.is_set():
+            if realtime:
+                now_ms = (time.perf_counter() - start) * 1000
+            else:
+                now_ms += step_ms
+            for device in self.devices:
+                device.tick(now_ms)
+            if realtime:
+                next_due = min(device.last_read_ms + device.interval_ms for device in self.devices)
+                time.sleep(max(0.0, (next_due - now_ms) / 1000))
+        return time.perf_counter() - start
+
+    def start(self, duration=float("inf")):
+        """Run in a background thread (real time)."""
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, args=(duration,), name="esp-simulator", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    @property
+    def sent_samples(self):
+        return sum(device.sent_samples for device in self.devices)
+
+    @property
+    def dropped_samples(self):
+        return sum(device.dropped_samples for device in self.devices)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulator ESP + HC-SR04 (protokol espcode.h)")
+    parser.add_argument("--devices", type=int, default=1, help="jumlah perangkat (N)")
+    parser.add_argument("--rate", type=float, default=10, help="laju sampel per perangkat (Hz)")
+    parser.add_argument("--restitution", type=float, default=0.9, help="koefisien restitusi e")
+    parser.add_argument("--drop-height", type=float, default=32.0, help="tinggi lepas bola (cm)")
+    parser.add_argument("--sensor-height", type=float, default=35.0, help="tinggi sensor dari lantai (cm)")
+    parser.add_argument("--noise", type=float, default=0.3, help="simpangan baku derau sensor (cm)")
+    parser.add_argument("--dropout", type=float, default=0.02, help="peluang pembacaan hilang")
+    parser.add_argument("--binary", type=int, default=None, metavar="N", help="mulai dalam mode biner, N sampel/frame")
+    parser.add_argument("--duration", type=float, default=float("inf"), help="lama simulasi (detik)")
+    parser.add_argument("--seed", type=int, default=0, help="seed acak (reproduksibel)")
+    parser.add_argument("--autostart", action="store_true", help="mulai membaca tanpa menunggu START_READING")
+    parser.add_argument("--broker", default="localhost", help="alamat broker MQTT")
+    parser.add_argument("--port", type=int, default=1883, help="port broker MQTT")
+    parser.add_argument("--inprocess", action="store_true",
+                        help="pakai transport dalam proses dan ukur throughput ingest (tanpa broker)")
+    args = parser.parse_args()
+
+    device_options = {
+        "drop_height": args.drop_height,
+        "sensor_height": args.sensor_height,
+    }
+
+    if args.inprocess:
+        transport = InProcessTransport()
+        queue = IngestQueue()
+        transport.subscribe(DATA_TOPIC, lambda client, userdata, msg: queue.put(msg.topic, msg.payload))
+    else:
+        transport = PahoTransport(args.broker, args.port, client_id=f"esp-simulator-{int(time.time())}")
+
+    simulation = Simulation(transport, args.devices, args.rate, args.restitution, args.seed,
+                            args.binary, **device_options)
+    for device in simulation.devices:
+        device.sensor.noise = args.noise
+        device.sensor.dropout = args.dropout
+        device.announce()
+    if args.autostart:
+        simulation.command("START_READING")
+
+    if args.inprocess:
+        duration = 10.0 if args.duration == float("inf") else args.duration
+        elapsed = simulation.run(duration, realtime=False)
+        simulation.command("STOP_READING")  # kirim sisa batch biner
+        messages = queue.drain()
+        start = time.perf_counter()
+        t, d, _, devices = decode_messages(messages)
+        decode_time = time.perf_counter() - start
+        print(f"{args.devices} perangkat x {args.rate:g} Hz x {duration:g} s simulasi: "
+              f"{simulation.sent_samples} sampel dalam {len(messages)} pesan "
+              f"({simulation.dropped_samples} pembacaan hilang), dibuat dalam {elapsed:.2f} s")
+        print(f"decode_messages: {len(t)} sampel dalam {decode_time * 1000:.1f} ms "
+              f"({len(t) / max(decode_time, 1e-9):,.0f} sampel/s)")
+        return
+
+    print(f"{args.devices} perangkat x {args.rate:g} Hz ke {args.broker}:{args.port} "
+          f"({'menunggu START_READING' if not args.autostart else 'langsung membaca'}); Ctrl+C untuk berhenti")
+    try:
+        simulation.run(args.duration, realtime=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transport.close()
+        print(f"Terkirim {simulation.sent_samples} sampel, {simulation.dropped_samples} pembacaan hilang")
+
+
+if __name__ == "__main__":
+    main()
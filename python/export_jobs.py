@@ -0,0 +1,233 @@
+"""Antrean ekspor di thread latar: Excel, grafik PNG dan teks analisis.
+
+Thread Tk hanya mengambil snapshot (salinan array, teks dan pengaturan
+grafik) lalu memasukkan job ke antrean; satu thread pekerja menulis file
+satu per satu sementara pengumpulan data tetap berjalan:
+
+  * Excel ditulis bertahap dengan openpyxl mode write-only
+    (run_journal.export_xlsx), memori konstan berapa pun panjang run
+  * PNG dirender pada Figure Agg tersendiri, bukan kanvas Tk grafik live;
+    garis didesimasi untuk resolusi ekspor seperti pada grafik live
+  * teks analisis dengan record JSON sidecar
+
+Kemajuan dan hasil setiap job dikirim lewat antrean dan dibaca thread Tk
+dengan `poll()` (status bar).
+
+    exports = ExportQueue()
+    exports.submit(ExportJob("Excel", [("Excel", excel_task(path, snapshot))]))
+    for event in exports.poll():
+        print(event.job.name, event.label, event.fraction, event.done)
+"""
+import queue
+import threading
+
+import numpy as np
+
+import analysis_core
+from app_logging import get_logger
+from decimation import MinMaxPyramid, apex_indices, visible_range
+import run_journal
+
+PNG_DPI = 300
+
+log = get_logger("export")
+
+
+class PlotSnapshot:
+    """What the live plot shows, copied on the Tk thread for a PNG export."""
+
+    def __init__(self, times, heights, bounce_times, bounce_heights, title, line_label,
+                 xlim=None, ylim=None, figsize=(10, 8)):
+        self.times = np.array(times, dtype=np.float64)
+        self.heights = np.array(heights, dtype=np.float64)
+        self.bounce_times = list(bounce_times)
+        self.bounce_heights = list(bounce_heights)
+        self.title = title
+        self.line_label = line_label
+        self.xlim = xlim
+        self.ylim = ylim
+        self.figsize = tuple(figsize)
+
+
+class RunSnapshot:
+    """Copy of one run and its results, independent of later samples.
+
+    With `journal_path` the Excel export reads the samples from a finished
+    journal instead of `times` / `heights`; with `journal` (a JournalWriter
+    still recording) it reads back the first `journal_samples` samples,
+    waiting for the journal writer on the export thread.
+    """
+
+    def __init__(self, ball_type, sensor_height, times=None, heights=None, journal_path=None,
+                 plot=None, analysis_text="", analysis_record=None, journal=None, journal_samples=0):
+        self.ball_type = ball_type
+        self.sensor_height = sensor_height
+        self.times = None if times is None else np.array(times, dtype=np.float64)
+        self.heights = None if heights is None else np.array(heights, dtype=np.float64)
+        self.journal_path = journal_path
+        self.journal = journal
+        self.journal_samples = journal_samples
+        self.plot = plot
+        self.analysis_text = analysis_text
+        self.analysis_record = analysis_record
+
+
+# ----------------------------------------------------------------------
+# Penulis file (dijalankan di thread pekerja)
+# ----------------------------------------------------------------------
+def render_png(path, plot, dpi=PNG_DPI):
+    """Render a PlotSnapshot on its own Agg figure and save it to `path`."""
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=plot.figsize, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(111)
+    ax.set_xlabel("Waktu (detik)")
+    ax.set_ylabel("Tinggi Bola (cm)")
+    ax.set_title(plot.title)
+    ax.grid(True, alpha=0.3)
+
+    times, heights = plot.times, plot.heights
+    if len(times):
+        xlim = plot.xlim or (float(times.min()), float(times.max()))
+        start, stop = visible_range(times, *sorted(xlim))
+        # Desimasi min/max untuk lebar gambar ekspor (puncak pantulan selalu dipertahankan)
+        pyramid = MinMaxPyramid()
+        pyramid.rebuild(heights)
+        n_bins = max(int(plot.figsize[0] * dpi), 1)
+        indices = pyramid.query(heights, start, stop, n_bins,
+                                keep=apex_indices(times, plot.bounce_times))
+        ax.plot(times[indices], heights[indices], 'b-', linewidth=2, label=plot.line_label)
+        if plot.bounce_times:
+            ax.plot(plot.bounce_times, plot.bounce_heights, "ro", markersize=8, label="Puncak Pantulan")
+            for bt, bh in zip(plot.bounce_times, plot.bounce_heights):
+                ax.annotate(f'{bh:.1f}', (bt, bh), textcoords="offset points", xytext=(0, 10),
+                            ha='center', fontsize=8, color='red', weight='bold')
+        ax.legend(loc='upper right')
+        ax.set_xlim(*xlim)
+        if plot.ylim is not None:
+            ax.set_ylim(*plot.ylim)
+    fig.savefig(path, dpi=dpi, bbox_inches='tight', facecolor='white', edgecolor='none')
+    return path
+
+
+def write_analysis_text(path, text, record=None):
+    """Write the analysis report (and its JSON record as a sidecar)."""
+    # PERBAIKAN: Validasi dan bersihkan teks analisis
+    clean_text = text.replace('\x00', '').replace('\r\n', '\n').replace('\r', '\n')
+    with open(path, 'w', encoding='utf-8', errors='replace') as f:
+        f.write(clean_text)
+    # Sidecar JSON dengan nama yang sama (dibaca create_lampiran_tex.py)
+    if record is not None:
+        analysis_core.save_record(analysis_core.record_path(path), record)
+    return path
+
+
+def excel_task(path, snapshot):
+    """Task writing the run of a RunSnapshot to Excel (+ npz copy)."""
+    def task(progress):
+        if snapshot.journal is not None:
+            times, heights = snapshot.journal.read_back(snapshot.journal_samples)
+            source = {"times": times, "heights": heights}
+        elif snapshot.journal_path is not None:
+            source = {"journal_path": snapshot.journal_path}
+        else:
+            source = {"times": snapshot.times, "heights": snapshot.heights}
+        count = run_journal.export_xlsx(path, snapshot.ball_type, snapshot.sensor_height,
+                                        progress=progress, **source)
+        return f"{path} ({count} baris)"
+    return task
+
+
+def png_task(path, snapshot, dpi=PNG_DPI):
+    """Task rendering the plot of a RunSnapshot to an image file."""
+    return lambda progress: render_png(path, snapshot.plot, dpi)
+
+
+def analysis_task(path, snapshot):
+    """Task writing the analysis text (and record) of a RunSnapshot."""
+    return lambda progress: write_analysis_text(path, snapshot.analysis_text, snapshot.analysis_record)
+
+
+# ----------------------------------------------------------------------
+# Antrean
+# ----------------------------------------------------------------------
+class ExportJob:
+    """Named list of (label, task) steps; `task(progress)` returns a description of its output."""
+
+    def __init__(self, name, tasks):
+        self.name = name
+        self.tasks = list(tasks)
+
+
+class ExportEvent:
+    """Progress of a job: `fraction` of all its steps; `done` with `results` and `errors` at the end."""
+
+    def __init__(self, job, label, fraction, done=False, results=(), errors=()):
+        self.job = job
+        self.label = label
+        self.fraction = fraction
+        self.done = done
+        self.results = list(results)
+        self.errors = list(errors)
+
+
+class ExportQueue:
+    """Run export jobs one at a time on a background worker thread.
+
+    Jobs run in submission order, so files are never written concurrently;
+    a failing step is reported in the job's final event and does not stop
+    the remaining steps. `submit` and `poll` are called from the Tk thread.
+    """
+
+    def __init__(self):
+        self.pending = 0
+        self._jobs = queue.Queue()
+        self._events = queue.SimpleQueue()
+        self._thread = None
+
+    def submit(self, job):
+        self.pending += 1
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="export", daemon=True)
+            self._thread.start()
+        self._jobs.put(job)
+
+    def poll(self):
+        """Events since the last call, oldest first."""
+        events = []
+        while True:
+            try:
+                events.append(self._events.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= sum(1 for event in events if event.done)
+        return events
+
+    def shutdown(self, wait=True):
+        """Stop the worker after the queued jobs (waiting for them if `wait`)."""
+        if self._thread is None:
+            return
+        self._jobs.put(None)
+        if wait:
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                return
+            results, errors = [], []
+            total = len(job.tasks)
+            for i, (label, task) in enumerate(job.tasks):
+                def progress(fraction, i=i, label=label):
+                    self._events.put(ExportEvent(job, label, (i + min(fraction, 1.0)) / total))
+                progress(0.0)
+                try:
+                    results.append(task(progress))
+                except Exception as e:
+                    log.exception("Ekspor %s gagal: %s", label, e)
+                    errors.append((label, e))
+            self._events.put(ExportEvent(job, None, 1.0, True, results, errors))
@@ -0,0 +1,232 @@
+import json
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+from app_logging import get_logger
+
+# Format payload biner ringkas (lihat publishBinaryBatch di espcode/espcode.h):
+#   header  : magic "KR", versi (uint8), panjang ID perangkat (uint8), jumlah sampel (uint16)
+#   device  : ID perangkat (ASCII)
+#   sampel  : N x (timestamp float32 [s], distance float32 [cm]), little-endian
+BINARY_MAGIC = b"KR"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<2sBBH")
+BINARY_SAMPLE_DTYPE = np.dtype([("timestamp", "<f4"), ("distance", "<f4")])
+DEFAULT_DEVICE = "ESP_Device"  # perangkat untuk payload tanpa ID (atau ID tidak valid)
+
+log = get_logger("ingest")
+
+
+class IngestQueue:
+    """Hand-off of raw MQTT payloads from the paho network thread to the Tk thread.
+
+    The MQTT callback only appends `(topic, payload, receive_time)` to a
+    `collections.deque`; `append` and `popleft` are atomic, so no lock is
+    needed. The Tk `periodic_update` drains the queue in batches and does all
+    parsing and GUI work on its own thread.
+    """
+
+    def __init__(self, maxlen=None):
+        self._items = deque(maxlen=maxlen)
+        self.received = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def put(self, topic, payload):
+        """Enqueue one raw message (called from the MQTT thread)."""
+        self._items.append((topic, payload, time.time()))
+        self.received += 1
+
+    def drain(self, max_items=None):
+        """Remove and return up to `max_items` queued messages, oldest first."""
+        items = self._items
+        count = len(items) if max_items is None else min(len(items), max_items)
+        return [items.popleft() for _ in range(count)]
+
+    def clear(self):
+        self._items.clear()
+
+
+def _device_id(value):
+    """Device ID as a string (numeric IDs are converted, anything else is the default device)."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+    log.warning("ID perangkat tidak valid: %r", value)
+    return DEFAULT_DEVICE
+
+
+def _parse_dict(payload):
+    """Extract (timestamp, distance, device) from a decoded JSON object, or None."""
+    # Angka polos ("25.4") juga JSON yang sah: perlakukan sebagai format mentah
+    if isinstance(payload, (int, float)) and not isinstance(payload, bool):
+        return 0, float(payload), "ESP_Raw"
+    if not isinstance(payload, dict):
+        log.warning("Format payload tidak terduga: %r", payload)
+        return None
+
+    # Handle status messages
+    if "status" in payload or "error" in payload:
+        log.info("Pesan perangkat: %s", payload)
+        return None
+
+    # Modern format with multiple fields
+    t = payload.get("timestamp", payload.get("time", 0))
+    d = payload.get("distance", payload.get("dist", 0))
+    device = _device_id(payload.get("device", payload.get("id", DEFAULT_DEVICE)))
+    return t, d, device
+
+
+def parse_payload(raw):
+    """Parse one payload (JSON, "distance:25.4" text or a bare number).
+
+    Returns (timestamp, distance, device) or None if the message is not a
+    sensor reading.
+    """
+    try:
+        msg_str = raw.decode() if isinstance(raw, (bytes, bytearray)) else str(raw)
+    except UnicodeDecodeError:
+        log.warning("Tidak dapat mengurai pesan: %r", raw)
+        return None
+
+    # Try to parse as JSON first (teks "distance:25.4" langsung ke parser teks, tanpa exception JSON)
+    if not msg_str[:9].lower().startswith(("distance:", "dist:")):
+        try:
+            return _parse_dict(json.loads(msg_str))
+        except json.JSONDecodeError:
+            pass
+
+    # Handle simple text format: "distance:25.4"
+    msg_str = msg_str.strip()
+    if ":" in msg_str:
+        parts = msg_str.split(":")
+        if len(parts) == 2 and parts[0].lower() in ["distance", "dist"]:
+            try:
+                return 0, float(parts[1]), "ESP_Text"
+            except ValueError:
+                log.warning("Nilai jarak tidak valid: %s", parts[1])
+                return None
+        log.warning("Format teks tidak dikenal: %s", msg_str)
+        return None
+
+    # Try direct number
+    try:
+        return 0, float(msg_str), "ESP_Raw"
+    except ValueError:
+        log.warning("Tidak dapat mengurai pesan: %s", msg_str)
+        return None
+
+
+def parse_payloads(payloads):
+    """Parse a batch of payloads, returning a list aligned with the input.
+
+    The common case (every payload is a JSON object from the ESP) is decoded
+    with a single `json.loads` over a JSON array built from the batch; if
+    that fails the payloads are parsed one by one.
+    """
+    if not payloads:
+        return []
+    try:
+        joined = b"[" + b",".join(
+            p if isinstance(p, (bytes, bytearray)) else str(p).encode() for p in payloads
+        ) + b"]"
+        decoded = json.loads(joined)
+        if len(decoded) == len(payloads):
+            return [_parse_dict(item) for item in decoded]
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        pass
+    return [parse_payload(p) for p in payloads]
+
+
+def is_binary_frame(raw):
+    """True if the payload is a packed binary batch."""
+    return isinstance(raw, (bytes, bytearray)) and raw[:2] == BINARY_MAGIC
+
+
+def encode_binary_frame(timestamps, distances, device):
+    """Pack samples into a binary batch frame (same layout as the ESP firmware)."""
+    device_bytes = device.encode("ascii")[:255]
+    samples = np.empty(len(timestamps), dtype=BINARY_SAMPLE_DTYPE)
+    samples["timestamp"] = timestamps
+    samples["distance"] = distances
+    header = BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(device_bytes), len(samples))
+    return header + device_bytes + samples.tobytes()
+
+
+def decode_binary_frame(raw):
+    """Unpack a binary batch frame into (timestamps, distances, device), or None if invalid."""
+    if len(raw) < BINARY_HEADER.size:
+        log.warning("Frame biner terlalu pendek: %d byte", len(raw))
+        return None
+    magic, version, device_len, count = BINARY_HEADER.unpack_from(raw)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        log.warning("Versi frame biner tidak didukung: %s", version)
+        return None
+    offset = BINARY_HEADER.size + device_len
+    expected = offset + count * BINARY_SAMPLE_DTYPE.itemsize
+    if len(raw) != expected:
+        log.warning("Ukuran frame biner tidak sesuai: %d byte, seharusnya %d", len(raw), expected)
+        return None
+    device = bytes(raw[BINARY_HEADER.size:offset]).decode("ascii", errors="replace")
+    samples = np.frombuffer(raw, dtype=BINARY_SAMPLE_DTYPE, count=count, offset=offset)
+    return (samples["timestamp"].astype(np.float64),
+            samples["distance"].astype(np.float64),
+            device)
+
+
+def _to_float(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return np.nan
+
+
+def decode_messages(messages):
+    """Decode drained `(topic, payload, receive_time)` messages into flat arrays.
+
+    JSON/text payloads give one sample each, binary frames give N samples;
+    arrival order is preserved. Returns (timestamps, distances, receive_times,
+    devices): the arrays are float64 (non-numeric fields become NaN) and
+    `devices` is a list with one device ID per sample.
+    """
+    text_payloads = [payload for _, payload, _ in messages if not is_binary_frame(payload)]
+    parsed = iter(parse_payloads(text_payloads))
+
+    chunks = []      # potongan (timestamps, distances, received) sesuai urutan kedatangan
+    devices = []
+    pending = ([], [], [])  # pembacaan teks berurutan yang belum dijadikan array
+
+    def flush_pending():
+        if pending[0]:
+            chunks.append(tuple(np.asarray(values, dtype=np.float64) for values in pending))
+            for values in pending:
+                values.clear()
+
+    for _, payload, received_at in messages:
+        if is_binary_frame(payload):
+            frame = decode_binary_frame(payload)
+            if frame is None:
+                continue
+            flush_pending()
+            t, d, device = frame
+            chunks.append((t, d, np.full(len(t), received_at)))
+            devices.extend([device] * len(t))
+        else:
+            reading = next(parsed)
+            if reading is None:
+                continue
+            t, d, device = reading
+            pending[0].append(_to_float(t))
+            pending[1].append(_to_float(d))
+            pending[2].append(received_at)
+            devices.append(device)
+    flush_pending()
+
+    if not chunks:
+        empty = np.empty(0, dtype=np.float64)
+        return empty, empty, empty, []
+    return tuple(np.concatenate(column) for column in zip(*chunks)) + (devices,)
@@ -1,20 +1,35 @@
+import time
+STARTUP_T0 = time.perf_counter()  # acuan mode --startup-time
+
 import tkinter as tk
 from tkinter import filedialog, messagebox, simpledialog, ttk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
 from matplotlib.figure import Figure
-import pandas as pd
-from scipy.signal import butter, filtfilt, find_peaks
-import paho.mqtt.client as mqtt
 import numpy as np
-import json
-import time
+import argparse
 import os
+import queue
+import threading
+
+import analysis_core
+import app_logging
+from data_table import DataTable
+from esp_simulator import InProcessTransport
+from export_jobs import ExportJob, ExportQueue, PlotSnapshot, RunSnapshot, analysis_task, excel_task, png_task
+from ingest import DEFAULT_DEVICE, IngestQueue, decode_messages
+from perf_monitor import monitor as perf
+from plot_renderer import LivePlotRenderer
+from replay import RunReplayer
+from resampling import resample_uniform, seconds_to_samples
+from run_archive import DATA_ROOT
+import run_journal
+from sessions import SessionRegistry
+from streaming_filter import butter_lowpass
+from trial_segmenter import TrialPipeline, TrialSegmenter
 
 # Global variables
-time_data = []
-distance_data = []
+MAX_SAMPLES = None  # isi angka (mis. 200000) untuk mode ring: hanya sampel terbaru yang disimpan
 collecting = False
-start_time = None
 update_needed = False
 sensor_height = 35  # cm
 selected_ball_type = "Bola Bekel"  # Default ball type
@@ -23,6 +38,63 @@ selected_ball_type = "Bola Bekel"  # Default ball type
 bounce_threshold = 15.0  # minimum bounce height (cm) - PERBAIKAN: dari 5.0 ke 15.0
 min_bounce_distance = 1  # minimum distance between bounces (data points)
 min_height_difference = 0.1 # minimum height difference between consecutive peaks (cm)
+BOUNCE_PROMINENCE = 3.0  # PERBAIKAN: tingkatkan prominence dari 2.0 ke 3.0
+
+# Antrean pesan MQTT: thread paho hanya mengantrekan, thread Tk memproses per batch
+INGEST_BATCH_LIMIT = 5000  # maksimum pesan yang diproses per frame
+ingest_queue = IngestQueue()
+
+# Logging jalur data: pesan per batch/frame dibatasi lajunya, detail per sampel hanya di DEBUG
+log = app_logging.get_logger("main")
+
+# Filter low-pass (kausal untuk grafik real-time, filtfilt sekali setelah berhenti)
+LOWPASS_CUTOFF = 5  # Hz
+LOWPASS_FS = 20     # Hz
+LOWPASS_ORDER = 4
+
+# Resampling ke grid seragam dari timestamp asli (opsional, --resample): laju sampel
+# diperkirakan dari data sehingga cutoff (Hz) dan jarak antar pantulan (detik) tetap
+# benar untuk interval sampling berapa pun, bukan mengandaikan LOWPASS_FS
+RESAMPLE_UNIFORM = False
+MIN_BOUNCE_SPACING_S = 0.1  # detik, jarak minimum antar pantulan pada grid seragam
+
+# Estimasi puncak dari fit lintasan parabola (ditampilkan di samping hasil sampel tertinggi)
+APEX_FIT = True
+
+# Mode kontinu (--continuous): aliran dipecah otomatis menjadi percobaan bernomor
+# (jatuh -> pantul -> diam) yang dianalisis & disimpan di thread latar, tanpa
+# START/STOP, hitung, simpan dan reset per percobaan
+CONTINUOUS_MODE = False
+CONTINUOUS_DIR = os.path.join(DATA_ROOT, "sesi-kontinu")  # run .npz + record .json per percobaan
+trial_pipeline = None
+
+# Sesi per perangkat: sample store, filter, detektor pantulan & hasil analisis
+# dipisah berdasarkan field "device" sehingga beberapa alat bisa berjalan bersamaan
+sessions = SessionRegistry((bounce_threshold, min_bounce_distance, BOUNCE_PROMINENCE, min_height_difference),
+                           (LOWPASS_CUTOFF, LOWPASS_FS, LOWPASS_ORDER), MAX_SAMPLES)
+active_session = sessions.get(DEFAULT_DEVICE)
+
+# Alias ke sesi yang sedang ditampilkan (diganti oleh select_device)
+samples = active_session.samples                    # waktu & tinggi bola dalam array NumPy
+filtered_samples = active_session.filtered_samples  # hasil filter kausal untuk grafik
+bounce_detector = active_session.bounce_detector    # detektor pantulan inkremental (data mentah)
+plot_bounce_detector = active_session.plot_bounce_detector
+
+# Jurnal biner selama pengumpulan (dipulihkan otomatis bila aplikasi berhenti mendadak)
+JOURNAL_ENABLED = True
+
+# Ekspor (Excel, PNG, teks analisis) di thread latar dari snapshot data; GUI tidak menunggu disk
+export_queue = ExportQueue()
+
+# Putar ulang run terekam lewat jalur ingest yang sama (on_message -> ingest_queue)
+replayer = None
+
+# Instrumentasi per tahap (perf_monitor); panel performa opsional di GUI
+PERF_REFRESH_MS = 1000
+perf_frame = None
+perf_label = None
+perf_visible = False
+perf_dump_path = None  # --perf-dump: simpan statistik saat aplikasi ditutup
 
 # MQTT Configuration - Compatible with ESP8266 and ESP32
 MQTT_BROKER = "broker.hivemq.com"  # Public broker for testing
@@ -30,23 +102,35 @@ MQTT_TOPIC = "sensor/distance"     # Generic topic name
 MQTT_PORT = 1883
 MQTT_KEEPALIVE = 60
 
-# Initialize MQTT client - Compatible with both ESP versions
-try:
-    # Try new API first (for newer paho-mqtt versions)
-    client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
-except:
-    # Fallback to old API (for older paho-mqtt versions)
-    client = mqtt.Client()
+MQTT_RECONNECT_MIN_DELAY = 1   # detik, backoff awal saat koneksi gagal/terputus
+MQTT_RECONNECT_MAX_DELAY = 60  # detik, backoff maksimum
+
+# Client MQTT dibuat saat setup_mqtt (paho diimpor saat itu, bukan saat modul dimuat)
+client = None
+# Status koneksi dari thread paho, diterapkan ke status_label oleh periodic_update (thread Tk)
+mqtt_status_updates = queue.SimpleQueue()
+
+# Modul berat (scipy.signal) diimpor lazily; dipanaskan di thread latar setelah jendela tampil
+PRELOAD_MODULES = ("scipy.signal",)
+startup_timing = False
 
 # GUI components
 root = None
 fig = None
 ax = None
 canvas = None
+plot_renderer = None
 status_label = None
+status_frame = None
 data_count_label = None
 latest_data_label = None
 data_tree = None
+data_table = None
+table_frame = None
+table_virtual_var = None
+continuous_var = None
+device_var = None
+device_selector = None
 analysis_text = None
 
 bola = ["Bola Bekel","Bola Tenis Meja", "Bola Tenis Lapang", 
@@ -54,27 +138,25 @@ bola = ["Bola Bekel","Bola Tenis Meja", "Bola Tenis Lapang",
 
 # Global variables untuk analisis
 latest_analysis_text = ""
+latest_analysis_record = None  # hasil analisis terstruktur (disimpan sebagai sidecar .json)
+analysis_display_text = None  # teks yang sedang tampil di analysis_text (widget hanya ditulis bila berubah)
 
-def lowpass_filter(data, cutoff=5, fs=20, order=4):
-    """Apply low-pass filter to smooth distance data"""
+def lowpass_filter(data, cutoff=LOWPASS_CUTOFF, fs=LOWPASS_FS, order=LOWPASS_ORDER):
+    """Apply zero-phase low-pass filter to smooth distance data"""
     min_length = max(order * 6, 20)
     if len(data) < min_length:
         return data
     
     try:
-        nyq = 0.5 * fs
-        normal_cutoff = cutoff / nyq
-        b, a = butter(order, normal_cutoff, btype='low', analog=False)
+        from scipy.signal import filtfilt
+        b, a, _ = butter_lowpass(cutoff, fs, order)
         return filtfilt(b, a, data)
     except ValueError as e:
-        print(f"Filter error: {e}")
+        log.warning("Filter error: %s", e)
         return data
 
 def detect_bounces(distance_data, time_data, min_height=None, min_distance=None):
     """Detect ball bounce peaks (maximum heights) from distance data"""
-    if len(distance_data) < 20:
-        return [], []
-    
     # Use global parameters if not provided
     if min_height is None:
         min_height = bounce_threshold
@@ -82,44 +164,220 @@ def detect_bounces(distance_data, time_data, min_height=None, min_distance=None)
         min_distance = min_bounce_distance
     
     try:
-        # Find peaks (maximum values) directly - no inversion needed
-        peaks, properties = find_peaks(distance_data, 
-                                     height=min_height,           # minimum peak height
-                                     distance=min_distance,       # minimum distance between peaks
-                                     prominence=3.0)              # PERBAIKAN: tingkatkan prominence dari 2.0 ke 3.0
-        
-        bounce_times = [time_data[p] for p in peaks if p < len(time_data)]
-        bounce_distances = [distance_data[p] for p in peaks if p < len(distance_data)]
-        
-        # PERBAIKAN: Filter peaks berdasarkan selisih ketinggian minimal 1 cm dan trend menurun
-        filtered_times = []
-        filtered_distances = []
-        
-        if bounce_distances:
-            # Tambahkan puncak pertama
-            filtered_times.append(bounce_times[0])
-            filtered_distances.append(bounce_distances[0])
-            
-            # Filter puncak selanjutnya berdasarkan selisih ketinggian dan trend menurun
-            for i in range(1, len(bounce_distances)):
-                height_diff = abs(bounce_distances[i] - filtered_distances[-1])
-                
-                # PERBAIKAN: Hanya tambahkan jika selisih ketinggian >= 1 cm DAN tinggi menurun (untuk pantulan alami)
-                if height_diff >= min_height_difference and bounce_distances[i] <= filtered_distances[-1]:
-                    filtered_times.append(bounce_times[i])
-                    filtered_distances.append(bounce_distances[i])
-                elif bounce_distances[i] > filtered_distances[-1]:
-                    print(f"Puncak diabaikan: tinggi {bounce_distances[i]:.1f}cm > puncak sebelum {filtered_distances[-1]:.1f}cm (trend naik tidak wajar)")
-                else:
-                    print(f"Puncak diabaikan: tinggi {bounce_distances[i]:.1f}cm, selisih {height_diff:.1f}cm < {min_height_difference}cm")
-        
-        print(f"Detected {len(filtered_distances)} valid bounces at heights: {[round(h, 1) for h in filtered_distances]}")
-        
-        return filtered_times, filtered_distances
+        return analysis_core.detect_bounces(distance_data, time_data, min_height, min_distance,
+                                            BOUNCE_PROMINENCE, min_height_difference, verbose=True)
     except Exception as e:
-        print(f"Bounce detection error: {e}")
+        log.error("Bounce detection error: %s", e)
         return [], []
 
+def sync_bounce_detector():
+    """Apply current detection settings to the streaming detectors of every device"""
+    sessions.configure_detection((bounce_threshold, min_bounce_distance,
+                                  BOUNCE_PROMINENCE, min_height_difference))
+
+def get_final_filtered():
+    """Return (times, zero-phase filtered heights, fs), running filtfilt only when the data changed"""
+    session = active_session
+    
+    def compute(previous):
+        times, heights, fs = session.samples.times, session.samples.heights, LOWPASS_FS
+        if RESAMPLE_UNIFORM:
+            # Filter pada grid seragam dengan laju sampel sebenarnya
+            series = resample_uniform(times, heights)
+            if series is not None:
+                times, heights, fs = series.times, series.values, series.fs
+        return times, lowpass_filter(heights, fs=fs), fs
+    
+    return session.analysis_cache.get("final_filtered", (session.samples.version, RESAMPLE_UNIFORM), compute)
+
+def get_final_bounces():
+    """Return (times, filtered, bounce times, bounce heights) of the zero-phase filtered data, detected once per data version and settings"""
+    time_data, filtered, fs = get_final_filtered()
+    distance = bounce_min_distance(fs)
+    key = (active_session.samples.version, RESAMPLE_UNIFORM, bounce_threshold, distance,
+           BOUNCE_PROMINENCE, min_height_difference)
+    
+    def compute(previous):
+        if len(filtered) <= 20:
+            return [], []
+        return detect_bounces(filtered, time_data, bounce_threshold, distance)
+    
+    bounce_times, bounce_heights = active_session.analysis_cache.get("final_bounces", key, compute)
+    return time_data, filtered, bounce_times, bounce_heights
+
+def get_run_analysis():
+    """analyze_run on the raw samples of the active device, computed once per data version and settings"""
+    settings = detection_settings()
+    key = (samples.version, tuple(sorted(settings.items())))
+    store = samples
+    return active_session.analysis_cache.get(
+        "run_analysis", key,
+        lambda previous: analysis_core.analyze_run(store.times, store.heights, verbose=True, **settings))
+
+def get_height_stats():
+    """Min/max/mean/std and duration of the active device's heights (only new samples are read while the store grows)"""
+    store = samples
+    
+    def compute(previous):
+        n = len(store)
+        # Tanpa mode ring sampel lama tidak berubah: cukup tambahkan sampel baru ke jumlahan
+        if previous is not None and store.max_samples is None and previous["count"] <= n:
+            start, stats = previous["count"], dict(previous)
+        else:
+            start, stats = 0, {"sum": 0.0, "sum_sq": 0.0, "min": np.inf, "max": -np.inf, "time_max": -np.inf}
+        new_heights = store.heights[start:]
+        if len(new_heights):
+            stats["sum"] += float(new_heights.sum())
+            stats["sum_sq"] += float(np.dot(new_heights, new_heights))
+            stats["min"] = min(stats["min"], float(new_heights.min()))
+            stats["max"] = max(stats["max"], float(new_heights.max()))
+            stats["time_max"] = max(stats["time_max"], float(store.times[start:].max()))
+        stats["count"] = n
+        stats["mean"] = stats["sum"] / n if n else np.nan
+        stats["std"] = float(np.sqrt(max(stats["sum_sq"] / n - stats["mean"] ** 2, 0.0))) if n else np.nan
+        return stats
+    
+    return active_session.analysis_cache.get("height_stats", store.version, compute)
+
+def get_live_bounces():
+    """Return (bounce heights, coefficients) of the streaming detector on the raw data, cached per data version and settings"""
+    key = (samples.version, bounce_threshold, min_bounce_distance, BOUNCE_PROMINENCE, min_height_difference)
+    detector = bounce_detector
+    
+    def compute(previous):
+        # Bounce detection (inkremental, tidak menghitung ulang seluruh riwayat)
+        _, bounce_distances = detector.bounces()
+        heights = np.asarray(bounce_distances, dtype=np.float64)
+        before, after = heights[:-1], heights[1:]
+        positive = before > 0
+        return list(bounce_distances), np.sqrt(after[positive] / before[positive])
+    
+    return active_session.analysis_cache.get("live_bounces", key, compute)
+
+def detection_settings():
+    """Current detection settings as analyze_run keyword arguments"""
+    return {
+        "min_height": bounce_threshold,
+        "min_distance": min_bounce_distance,
+        "prominence": BOUNCE_PROMINENCE,
+        "min_height_difference": min_height_difference,
+        "min_spacing": MIN_BOUNCE_SPACING_S if RESAMPLE_UNIFORM else None,
+        "apex_fit": APEX_FIT,
+    }
+
+def bounce_min_distance(fs):
+    """Minimum peak spacing in samples: from seconds at rate `fs` when resampling"""
+    if RESAMPLE_UNIFORM:
+        return seconds_to_samples(MIN_BOUNCE_SPACING_S, fs)
+    return min_bounce_distance
+
+def enable_resampling():
+    """Switch filtering and detection to the uniform grid (--resample)"""
+    global RESAMPLE_UNIFORM
+    RESAMPLE_UNIFORM = True
+    sessions.adaptive_rate = True
+    for session in sessions:
+        session.adaptive_rate = True
+
+def select_device(device):
+    """Switch the live view (plot, table, analysis) to another device session"""
+    global active_session, samples, filtered_samples, bounce_detector, plot_bounce_detector
+    global latest_analysis_text, latest_analysis_record, update_needed
+    
+    if device == active_session.device:
+        return
+    
+    # Simpan hasil analisis sesi lama, lalu arahkan alias ke sesi baru
+    active_session.latest_analysis_text = latest_analysis_text
+    active_session.latest_analysis_record = latest_analysis_record
+    active_session = sessions.get(device)
+    samples = active_session.samples
+    filtered_samples = active_session.filtered_samples
+    bounce_detector = active_session.bounce_detector
+    plot_bounce_detector = active_session.plot_bounce_detector
+    latest_analysis_text = active_session.latest_analysis_text
+    latest_analysis_record = active_session.latest_analysis_record
+    
+    if device_var is not None:
+        device_var.set(device)
+    plot_renderer.reset_view()
+    data_table.reset()
+    data_count_label.config(text=f"Jumlah Data: {len(samples)}")
+    last = samples.last()
+    latest_data_label.config(text=f"Terbaru: {last[1]:.1f}cm @ {last[0]:.2f}s [{device}]" if last else "Terbaru: -")
+    update_needed = True
+    print(f"Tampilan dialihkan ke perangkat: {device}")
+
+def refresh_device_selector():
+    """Update the device dropdown after a new device has been seen"""
+    if device_selector is not None:
+        device_selector.config(values=sessions.devices())
+
+def on_device_selected(event=None):
+    """Callback for the device dropdown"""
+    select_device(device_var.get())
+
+def open_session_journal(session):
+    """Start the on-disk journal of a session (no-op if already open or disabled)"""
+    if not JOURNAL_ENABLED or session.journal is not None:
+        return
+    try:
+        session.open_journal({
+            "device": session.device,
+            "ball_type": selected_ball_type,
+            "sensor_height": sensor_height,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+        })
+        print(f"Jurnal {session.device}: {session.journal.path}")
+    except OSError as e:
+        print(f"Gagal membuka jurnal untuk {session.device}: {e}")
+
+def close_session_journals():
+    """Finalize the journals of all devices"""
+    for session in sessions:
+        try:
+            path = session.close_journal()
+            if path:
+                print(f"Jurnal {session.device} disimpan: {path}")
+        except OSError as e:
+            print(f"Gagal menutup jurnal {session.device}: {e}")
+
+def recover_unfinished_journals():
+    """Offer to restore runs whose journal was not finalized (application crashed)"""
+    global update_needed
+    unfinished = run_journal.find_unfinished()
+    if not unfinished:
+        return
+    restore = messagebox.askyesno(
+        "Pemulihan Data",
+        f"Ditemukan {len(unfinished)} rekaman yang tidak selesai (aplikasi berhenti mendadak).\n"
+        f"Muat kembali data tersebut?")
+    restored = []
+    for path in unfinished:
+        try:
+            final_path, metadata, times, heights = run_journal.recover(path)
+        except (OSError, ValueError) as e:
+            print(f"Gagal memulihkan {path}: {e}")
+            continue
+        if final_path is None:
+            continue
+        print(f"Jurnal dipulihkan: {final_path} ({len(times)} sampel)")
+        if restore:
+            session = sessions.get(metadata.get("device", DEFAULT_DEVICE))
+            session.reset()
+            session.extend(times, heights)
+            session.journal_path = final_path
+            restored.append(session.device)
+    if restored:
+        refresh_device_selector()
+        if active_session.device in restored:
+            data_table.reset()
+            data_count_label.config(text=f"Jumlah Data: {len(samples)}")
+            update_needed = True
+        else:
+            select_device(restored[-1])
+        status_label.config(text=f"Status: {len(restored)} rekaman dipulihkan", fg="blue")
+
 def set_ball_type():
     """Set ball type from dropdown"""
     global selected_ball_type, update_needed
@@ -172,108 +430,90 @@ def set_ball_type():
 
 def calculate_restitution_coefficient():
     """Calculate coefficient of restitution from bounce data"""
-    global latest_analysis_text
-    
-    if len(distance_data) < 10:
-        messagebox.showwarning("Peringatan", "Tidak cukup data untuk menghitung koefisien\nMinimum diperlukan: 10 titik data")
-        return
-    
-    # PERBAIKAN: Validasi data sebelum analisis
-    if len(time_data) != len(distance_data):
-        messagebox.showerror("Error", f"Ketidakcocokan data:\nWaktu: {len(time_data)}\nJarak: {len(distance_data)}")
-        return
-    
-    # PERBAIKAN: Cek adanya NaN atau Inf
-    if any(np.isnan(d) or np.isinf(d) for d in distance_data):
-        messagebox.showerror("Error", "Data mengandung nilai tidak valid (NaN/Inf)")
-        return
-    
-    if any(np.isnan(t) or np.isinf(t) for t in time_data):
-        messagebox.showerror("Error", "Data waktu mengandung nilai tidak valid (NaN/Inf)")
-        return
+    global latest_analysis_text, latest_analysis_record
     
     try:
         # Use current data without additional filtering to preserve bounce patterns
-        filtered_data = distance_data
-        bounce_times, bounce_distances = detect_bounces(filtered_data, time_data)
+        with perf.stage("coefficient"):
+            result = get_run_analysis()
+        status = result["status"]
+        
+        if status == "insufficient_data":
+            messagebox.showwarning("Peringatan", "Tidak cukup data untuk menghitung koefisien\nMinimum diperlukan: 10 titik data")
+            return
+        if status == "invalid_data":
+            messagebox.showerror("Error", "Data mengandung nilai tidak valid (NaN/Inf)")
+            return
+        if status == "invalid_time":
+            messagebox.showerror("Error", "Data waktu mengandung nilai tidak valid (NaN/Inf)")
+            return
+        
+        heights = result["bounce_heights"]  # Already ball heights from ground
+        bounce_times = result["bounce_times"]
+        valid_heights = result["valid_heights"]
+        decreasing_trend = result["decreasing_trend"]
         
-        if len(bounce_distances) < 2:
+        if status == "too_few_bounces":
             messagebox.showwarning("Peringatan", 
                                  f"Perlu setidaknya 2 pantulan untuk menghitung koefisien\n"
-                                 f"Saat ini terdeteksi: {len(bounce_distances)} pantulan\n"
+                                 f"Saat ini terdeteksi: {len(heights)} pantulan\n"
                                  f"Coba sesuaikan pengaturan:\n"
                                  f"- Ambang pantulan (saat ini: {bounce_threshold}cm)\n"
                                  f"- Selisih tinggi minimum (saat ini: {min_height_difference}cm)\n"
                                  f"CATATAN: Sistem otomatis mengabaikan puncak yang naik (tidak wajar)")
             return
         
-        # PERBAIKAN: Validasi tambahan untuk ketinggian pantulan dan trend menurun
-        valid_heights = [h for h in bounce_distances if h >= bounce_threshold]
-        
-        # PERBAIKAN: Validasi trend menurun untuk pantulan natural
-        decreasing_trend = True
-        for i in range(1, len(bounce_distances)):
-            if bounce_distances[i] > bounce_distances[i-1]:
-                decreasing_trend = False
-                break
-        
-        if len(valid_heights) < 2:
+        if status == "too_few_valid":
             messagebox.showwarning("Peringatan", 
                                  f"Tidak cukup pantulan dengan ketinggian minimal {bounce_threshold}cm\n"
-                                 f"Pantulan terdeteksi: {len(bounce_distances)}\n"
+                                 f"Pantulan terdeteksi: {len(heights)}\n"
                                  f"Pantulan valid (>= {bounce_threshold}cm): {len(valid_heights)}\n"
                                  f"Trend menurun: {'Ya' if decreasing_trend else 'Tidak'}\n"
                                  f"Kurangi ambang pantulan atau lakukan pengukuran ulang")
             return
         
-        # Calculate coefficients between consecutive bounces
-        heights = bounce_distances  # Already ball heights from ground
-        coefficients = []
-        bounce_intervals = []
-        
-        for i in range(1, len(heights)):
-            if heights[i-1] >= bounce_threshold and heights[i] >= bounce_threshold:  # PERBAIKAN: Validasi kedua ketinggian
-                e = np.sqrt(heights[i] / heights[i-1])
-                # PERBAIKAN: Validasi koefisien
-                if not (np.isnan(e) or np.isinf(e)):
-                    coefficients.append(e)
-                    
-                    # Calculate time interval between bounces
-                    time_interval = bounce_times[i] - bounce_times[i-1]
-                    bounce_intervals.append(time_interval)
-        
-        if coefficients:
-            # Statistical analysis
-            avg_coefficient = np.mean(coefficients)
-            std_coefficient = np.std(coefficients)
-            min_coefficient = np.min(coefficients)
-            max_coefficient = np.max(coefficients)
-            
-            # PERBAIKAN: Validasi hasil statistik
-            if any(np.isnan([avg_coefficient, std_coefficient, min_coefficient, max_coefficient])):
-                messagebox.showerror("Error", "Hasil perhitungan mengandung nilai tidak valid")
-                return
-            
-            # Energy loss calculation
-            energy_retention = avg_coefficient ** 2  # e² = energy ratio
-            energy_loss_percent = (1 - energy_retention) * 100
-            
-            # Material classification based on coefficient
-            if avg_coefficient >= 0.9:
-                material_type = "Super Ball / Elastisitas Tinggi"
-                quality = "Sangat Baik"
-            elif avg_coefficient >= 0.8:
-                material_type = "Bola Karet / Elastisitas Baik"
-                quality = "Baik Sekali"
-            elif avg_coefficient >= 0.6:
-                material_type = "Bola Tenis / Elastisitas Sedang"
-                quality = "Baik"
-            elif avg_coefficient >= 0.4:
-                material_type = "Bola Lunak / Elastisitas Rendah"
-                quality = "Cukup"
+        if status == "ok":
+            stats = result["stats"]
+            avg_coefficient = stats["mean"]
+            std_coefficient = stats["std"]
+            min_coefficient = stats["min"]
+            max_coefficient = stats["max"]
+            energy_retention = stats["energy_retention"]
+            energy_loss_percent = stats["energy_loss_percent"]
+            material_type = result["material_type"]
+            quality = result["quality"]
+            bounce_intervals = result["intervals"]
+            valid_pairs = result["valid_pairs"]
+            time_data = samples.times
+            if result["resampling"]:
+                resampling = result["resampling"]
+                spacing_text = (f"{MIN_BOUNCE_SPACING_S:.2f} detik (grid {resampling['fs']:.1f} Hz, "
+                                f"{len(resampling['gaps'])} celah, {resampling['dropouts']} sampel hilang)")
             else:
-                material_type = "Material Sangat Lunak / Elastisitas Buruk"
-                quality = "Buruk"
+                spacing_text = f"{min_bounce_distance} titik data"
+            fit_text = ""
+            if result["apex_fit"]:
+                fit = result["apex_fit"]
+                fit_mean = f"{fit['mean']:.4f}" if fit["mean"] is not None else "-"
+                if fit["flight_mean"] is not None:
+                    flight_text = f"{fit['flight_mean']:.4f}"
+                elif fit["fixed_gravity"]:
+                    flight_text = "- (perlu 3 pantulan)"
+                else:
+                    flight_text = f"- (timestamp tidak sesuai waktu nyata, g tersirat {fit['gravity']:.0f} cm/s²)"
+                fit_text = f"""
+{'─'*60}
+ESTIMASI PUNCAK (FIT LINTASAN PARABOLA):
+  • Puncak Ter-fit               : {sum(fit['fitted'])} dari {len(fit['fitted'])}
+  • Tinggi Puncak Fit (cm)       : {', '.join([f'{h:.2f}' for h in fit['heights']])}
+  • e per Pasangan (fit)         : {', '.join([f'{e:.3f}' for e in fit['coefficients']])}
+  • e Rata-rata dari Tinggi Fit  : {fit_mean}
+  • e dari Waktu Terbang         : {flight_text}
+"""
+            
+            # Record terstruktur di samping teks laporan (untuk agregasi tanpa parsing teks)
+            latest_analysis_record = analysis_core.build_record(
+                result, selected_ball_type, sensor_height, device=active_session.device)
             
             # Format comprehensive results untuk tampilan di frame analisis
             latest_analysis_text = f"""
@@ -286,9 +526,9 @@ PENGATURAN PENGUKURAN:
   • Tinggi Sensor dari Lantai    : {sensor_height:.1f} cm
   • Ambang Deteksi Pantulan      : {bounce_threshold:.1f} cm
   • Selisih Tinggi Minimum       : {min_height_difference:.1f} cm
-  • Jarak Minimum Pantulan       : {min_bounce_distance} titik data
-  • Total Titik Data Terkumpul   : {len(distance_data)}
-  • Durasi Pengukuran            : {max(time_data):.2f} detik
+  • Jarak Minimum Pantulan       : {spacing_text}
+  • Total Titik Data Terkumpul   : {result["n_samples"]}
+  • Durasi Pengukuran            : {time_data.max():.2f} detik
   • Waktu Mulai dari             : 0.00 detik (direset setiap mulai)
 
 {'─'*60}
@@ -305,18 +545,18 @@ PERHITUNGAN KOEFISIEN:
 """
             
             # Add individual coefficient calculations - PERBAIKAN: hanya untuk pantulan valid
-            valid_pairs = 0
-            for i, (e, h_before, h_after, dt) in enumerate(zip(coefficients, heights[:-1], heights[1:], bounce_intervals)):
-                if h_before >= bounce_threshold and h_after >= bounce_threshold:
-                    valid_pairs += 1
-                    latest_analysis_text += f"  Pantulan {i+1} → {i+2} (VALID - MENURUN):\n"
+            for pair in result["pairs"]:
+                i, h_before, h_after = pair["index"], pair["h_before"], pair["h_after"]
+                if pair["valid"]:
+                    e = pair["e"]
+                    latest_analysis_text += f"  Pantulan {i} → {i+1} (VALID - MENURUN):\n"
                     latest_analysis_text += f"    Tinggi: {h_before:.2f} cm → {h_after:.2f} cm\n"
                     latest_analysis_text += f"    Penurunan: {h_before - h_after:.2f} cm\n"
                     latest_analysis_text += f"    Koefisien: e = √({h_after:.2f}/{h_before:.2f}) = {e:.3f}\n"
-                    latest_analysis_text += f"    Interval Waktu: {dt:.3f} detik\n"
+                    latest_analysis_text += f"    Interval Waktu: {pair['dt']:.3f} detik\n"
                     latest_analysis_text += f"    Energi Tersisa: {(e**2)*100:.1f}%\n\n"
                 else:
-                    latest_analysis_text += f"  Pantulan {i+1} → {i+2} (DIABAIKAN):\n"
+                    latest_analysis_text += f"  Pantulan {i} → {i+1} (DIABAIKAN):\n"
                     latest_analysis_text += f"    Tinggi: {h_before:.2f} cm → {h_after:.2f} cm\n"
                     latest_analysis_text += f"    Alasan: Ketinggian < {bounce_threshold}cm\n\n"
             
@@ -328,7 +568,7 @@ RINGKASAN STATISTIK:
   • Koefisien Minimum            : {min_coefficient:.4f}
   • Koefisien Maksimum           : {max_coefficient:.4f}
   • Rentang Koefisien            : {max_coefficient - min_coefficient:.4f}
-
+{fit_text}
 ANALISIS ENERGI:
   • Retensi Energi Rata-rata     : {energy_retention*100:.2f}%
   • Kehilangan Energi Rata-rata  : {energy_loss_percent:.2f}%
@@ -367,7 +607,7 @@ PENGATURAN FILTER:
 
 {'='*60}
 Analisis {selected_ball_type} selesai pada: {time.strftime('%Y-%m-%d %H:%M:%S')}
-Waktu pengukuran: 0.00 - {max(time_data):.2f} detik
+Waktu pengukuran: 0.00 - {time_data.max():.2f} detik
 {'='*60}
 """
             
@@ -381,7 +621,7 @@ Waktu pengukuran: 0.00 - {max(time_data):.2f} detik
                               f"Koefisien rata-rata: {avg_coefficient:.3f}\n"
                               f"Kualitas pantulan: {quality}\n"
                               f"Retensi energi: {energy_retention*100:.1f}%\n"
-                              f"Durasi pengukuran: {max(time_data):.2f} detik\n\n"
+                              f"Durasi pengukuran: {time_data.max():.2f} detik\n\n"
                               f"Hasil lengkap ditampilkan di panel Analisis Real-time")
             
         else:
@@ -391,6 +631,22 @@ Waktu pengukuran: 0.00 - {max(time_data):.2f} detik
         messagebox.showerror("Error", f"Error menghitung koefisien:\n{str(e)}\n\nSilakan periksa data dan pengaturan Anda")
         print(f"Calculation error details: {e}")
 
+def set_mqtt_status(text, color):
+    """Queue a connection status for status_label (safe to call from the paho thread)"""
+    mqtt_status_updates.put((text, color))
+
+def apply_mqtt_status():
+    """Show queued connection status changes (Tk thread)"""
+    latest = None
+    while True:
+        try:
+            latest = mqtt_status_updates.get_nowait()
+        except queue.Empty:
+            break
+    if latest is not None:
+        text, color = latest
+        status_label.config(text=text, fg=color)
+
 def on_connect(client, userdata, flags, reason_code, properties=None):
     """MQTT connection callback - compatible with ESP8266/ESP32"""
     if reason_code == 0:
@@ -398,132 +654,203 @@ def on_connect(client, userdata, flags, reason_code, properties=None):
         # Subscribe ke topik data untuk menerima sensor data saja
         client.subscribe(MQTT_TOPIC)
         # HAPUS subscription ke command topic untuk menghindari loop
-        status_label.config(text="Status: Terhubung ke MQTT", fg="blue")
+        set_mqtt_status("Status: Terhubung ke MQTT", "blue")
         print(f"Berlangganan ke: {MQTT_TOPIC}")
     else:
         print(f"Gagal terhubung, kode alasan {reason_code}")
-        status_label.config(text="Status: Koneksi MQTT Gagal", fg="red")
+        set_mqtt_status("Status: Koneksi MQTT Gagal, mencoba lagi...", "red")
+
+def on_connect_fail(client, userdata):
+    """MQTT connection attempt failed (network/DNS); paho retries with backoff"""
+    print("Gagal terhubung ke MQTT Broker, mencoba lagi...")
+    set_mqtt_status("Status: Broker tidak terjangkau, mencoba lagi...", "red")
 
 def on_disconnect(client, userdata, flags, reason_code, properties=None):
     """MQTT disconnection callback"""
     print("Terputus dari MQTT Broker")
-    status_label.config(text="Status: MQTT Terputus", fg="orange")
+    set_mqtt_status("Status: MQTT Terputus, menyambung ulang...", "orange")
 
 def on_message(client, userdata, msg):
-    """Process incoming MQTT messages from ESP8266/ESP32"""
-    global time_data, distance_data, collecting, start_time, update_needed, sensor_height
-    
+    """Queue incoming MQTT messages from ESP8266/ESP32 (runs on the paho network thread)"""
     # Abaikan messages dari command topic untuk menghindari loop
     if msg.topic.endswith("/cmd"):
-        print(f"Mengabaikan echo perintah: {msg.payload.decode()}")
         return
     
     if not collecting:
         return
-        
+    
+    # Hanya antrekan payload mentah; parsing & update GUI dilakukan di thread Tk
+    ingest_queue.put(msg.topic, msg.payload)
+
+def process_ingest_queue():
+    """Drain queued MQTT messages in one batch and route them to their device sessions (Tk thread)"""
+    global update_needed
+    
+    messages = ingest_queue.drain(INGEST_BATCH_LIMIT)
+    if not messages:
+        return 0
+    
     try:
-        # Try to parse as JSON first
-        try:
-            payload = json.loads(msg.payload.decode())
-            print(f"Menerima JSON: {payload}")
-            
-            # Handle different message formats from ESP devices
-            if isinstance(payload, dict):
-                # Modern format with multiple fields
-                t = payload.get("timestamp", payload.get("time", 0))
-                d = payload.get("distance", payload.get("dist", 0))
-                device = payload.get("device", payload.get("id", "ESP_Device"))
-                
-                # Handle status messages
-                if "status" in payload or "error" in payload:
-                    print(f"Pesan perangkat: {payload}")
-                    return
-            else:
-                print(f"Format payload tidak terduga: {payload}")
-                return
-                
-        except json.JSONDecodeError:
-            # Handle simple text format: "distance:25.4"
-            msg_str = msg.payload.decode().strip()
-            print(f"Menerima teks: {msg_str}")
-            
-            if ":" in msg_str:
-                parts = msg_str.split(":")
-                if len(parts) == 2 and parts[0].lower() in ["distance", "dist"]:
-                    try:
-                        d = float(parts[1])
-                        t = 0
-                        device = "ESP_Text"
-                    except ValueError:
-                        print(f"Nilai jarak tidak valid: {parts[1]}")
-                        return
-                else:
-                    print(f"Format teks tidak dikenal: {msg_str}")
-                    return
-            else:
-                # Try direct number
-                try:
-                    d = float(msg_str)
-                    t = 0
-                    device = "ESP_Raw"
-                except ValueError:
-                    print(f"Tidak dapat mengurai pesan: {msg_str}")
-                    return
-        
-        # PERBAIKAN: Validasi data yang lebih ketat
-        if not isinstance(d, (int, float)) or d <= 0 or d > 400:
-            print(f"Jarak di luar rentang: {d}")
-            return
-        
-        if not isinstance(t, (int, float)) or t < 0:
-            print(f"Timestamp tidak valid: {t}")
-            if t < 0:
-                t = 0  # Reset ke 0 jika negatif
-        
-        # Convert distance to ball height (sensor_height - distance_reading)
-        ball_height = sensor_height - d
-        
-        # Validate ball height (should be positive for bouncing ball)
-        if ball_height < 0:
-            print(f"Tinggi bola negatif: {ball_height:.1f}cm (sensor terlalu rendah?)")
-            return
+        # JSON/teks dan frame biner diurai menjadi array sekaligus
+        with perf.stage("parse"):
+            t, d, received_at, devices = decode_messages(messages)
+    except Exception as e:
+        log.exception("Error memproses pesan: %s", e)
+        return 0
+    if len(d) == 0:
+        return 0
+    
+    # PERBAIKAN: Validasi data yang lebih ketat (vektor untuk seluruh batch)
+    in_range = (d > 0) & (d <= 400)
+    if not in_range.all():
+        log.warning("%d data jarak di luar rentang diabaikan", np.count_nonzero(~in_range))
+    
+    invalid_time = ~(t >= 0)
+    if invalid_time.any():
+        log.warning("%d timestamp tidak valid, direset ke 0", np.count_nonzero(invalid_time))
+        t = np.where(invalid_time, 0.0, t)
+    
+    # Convert distance to ball height (sensor_height - distance_reading)
+    ball_height = sensor_height - d
+    
+    # Validate ball height (should be positive for bouncing ball)
+    negative = in_range & (ball_height < 0)
+    if negative.any():
+        log.warning("%d data tinggi bola negatif diabaikan (sensor terlalu rendah?)", np.count_nonzero(negative))
+    
+    keep = in_range & ~negative & np.isfinite(ball_height)
+    if not keep.any():
+        return 0
+    
+    # Routing per perangkat (satu lookup dict per perangkat dalam batch)
+    devices = np.asarray(devices, dtype=object)
+    known_devices = len(sessions)
+    stored = 0
+    for device in dict.fromkeys(devices[keep]):
+        idx = keep & (devices == device) if len(devices) > 1 else keep
+        session = sessions.get(device)
         
         # PERBAIKAN: Handle timestamp dengan reset ke 0 setiap mulai baru
-        if t > 0:
-            # Use ESP provided timestamp, but adjust to start from 0
-            if start_time is None:
-                start_time = time.time()
-            # Jika menggunakan timestamp ESP, pastikan dimulai dari 0
-            current_time = float(t)
-        else:
-            # Generate local timestamp starting from 0
-            if start_time is None:
-                start_time = time.time()
-            current_time = time.time() - start_time
+        if session.start_time is None:
+            session.start_time = float(received_at[idx][0])
+        if collecting and session.journal is None:
+            open_session_journal(session)
+        # Timestamp ESP jika ada, selain itu waktu lokal saat pesan diterima (mulai dari 0)
+        current_time = np.where(t[idx] > 0, t[idx], received_at[idx] - session.start_time)
+        perf.observe_lag(device, t[idx], received_at[idx])
         
         # PERBAIKAN: Validasi final sebelum menyimpan
-        if np.isnan(current_time) or np.isinf(current_time) or np.isnan(ball_height) or np.isinf(ball_height):
-            print(f"Data mengandung NaN atau Inf, diabaikan")
-            return
-        
-        # Store data (now storing ball height instead of raw distance)
-        time_data.append(float(current_time))
-        distance_data.append(float(ball_height))
-        update_needed = True
-        
-        # Update GUI
-        data_count_label.config(text=f"Jumlah Data: {len(distance_data)}")
-        latest_data_label.config(text=f"Terbaru: {ball_height:.1f}cm @ {current_time:.2f}s [{device}]")
+        finite = np.isfinite(current_time)
+        new_times = current_time[finite]
+        new_heights = ball_height[idx][finite]
+        if len(new_times) == 0:
+            continue
         
-        print(f"Disimpan: Waktu={current_time:.2f}s, Tinggi Bola={ball_height:.1f}cm (Mentah={d:.1f}cm), Perangkat={device}")
+        # Store data sekaligus (now storing ball height instead of raw distance)
+        session.extend(new_times, new_heights)
+        stored += len(new_times)
+        if CONTINUOUS_MODE:
+            feed_trial_segmenter(session, new_times, new_heights)
         
-    except Exception as e:
-        print(f"Error memproses pesan: {e}")
+        if session is active_session:
+            # Update GUI sekali per batch
+            data_count_label.config(text=f"Jumlah Data: {len(samples)}")
+            latest_data_label.config(text=f"Terbaru: {new_heights[-1]:.1f}cm @ {new_times[-1]:.2f}s [{device}]")
+            update_needed = True
+    
+    if len(sessions) != known_devices:
+        refresh_device_selector()
+        # Tampilkan otomatis perangkat pertama yang mengirim data
+        if len(active_session) == 0:
+            for session in sessions:
+                if len(session):
+                    select_device(session.device)
+                    break
+    return stored
+
+def feed_trial_segmenter(session, times, heights):
+    """Continuous mode: split a device's stream into trials and queue the finished ones"""
+    if session.trial_segmenter is None:
+        session.trial_segmenter = TrialSegmenter(session.device)
+    with perf.stage("segment"):
+        trials = session.trial_segmenter.extend(times, heights)
+    for trial in trials:
+        submit_trial(trial)
+
+def submit_trial(trial):
+    """Hand a finished trial to the background worker with the current settings"""
+    global trial_pipeline
+    if trial_pipeline is None:
+        trial_pipeline = TrialPipeline(CONTINUOUS_DIR)
+    log.debug("Percobaan %s #%d: %d sampel, %.1f detik", trial.device, trial.index, len(trial), trial.duration)
+    trial_pipeline.submit(trial, selected_ball_type, sensor_height, detection_settings())
+
+def flush_trial_segmenters():
+    """End the trials still in progress (collection stopped) and drop the segmenters"""
+    for session in sessions:
+        if session.trial_segmenter is not None:
+            trial = session.trial_segmenter.flush()
+            if trial is not None:
+                submit_trial(trial)
+            session.trial_segmenter = None
+
+def format_trial_summary(session):
+    """Analysis panel text listing the trials saved for a device in continuous mode"""
+    lines = [f"PERCOBAAN KONTINU - {session.device}", "=" * 30, f"Folder: {CONTINUOUS_DIR}", "",
+             f"{'No':>3}  {'Jenis Bola':<18} {'e':>6} {'Pasangan':>8} {'Durasi':>7}"]
+    for outcome in session.trials:
+        lines.append(f"{outcome.number:>3}  {outcome.ball_type:<18} {outcome.coefficient:>6.3f} "
+                     f"{outcome.result['valid_pairs']:>8} {outcome.trial.duration:>6.1f}s")
+    coefficients = [o.coefficient for o in session.trials if o.ball_type == selected_ball_type]
+    lines.append("")
+    if coefficients:
+        lines.append(f"{selected_ball_type}: e = {np.mean(coefficients):.4f} ± {np.std(coefficients):.4f} "
+                     f"({len(coefficients)} percobaan)")
+    if trial_pipeline is not None and trial_pipeline.pending:
+        lines.append(f"Sedang diproses: {trial_pipeline.pending} percobaan")
+    return "\n".join(lines) + "\n"
+
+def apply_trial_outcomes():
+    """Show the trials finished by the background worker (Tk thread)"""
+    global latest_analysis_text, latest_analysis_record
+    if trial_pipeline is None:
+        return
+    saved = [outcome for outcome in trial_pipeline.poll() if outcome.status == "ok"]
+    if not saved:
+        return
+    updated = []
+    for outcome in saved:
+        session = sessions.get(outcome.trial.device)
+        session.trials.append(outcome)
+        if session not in updated:
+            updated.append(session)
+    for session in updated:
+        session.latest_analysis_text = format_trial_summary(session)
+        session.latest_analysis_record = None  # ringkasan, bukan analisis satu run
+    if active_session in updated:
+        latest_analysis_text = active_session.latest_analysis_text
+        latest_analysis_record = None
+        update_analysis_display()
+    last = saved[-1]
+    status_label.config(text=f"Status: Percobaan {last.number} ({last.ball_type}) tersimpan - "
+                             f"e = {last.coefficient:.3f}", fg="green")
+
+def toggle_continuous_mode():
+    """Switch continuous acquisition (automatic trial segmentation) on or off"""
+    global CONTINUOUS_MODE
+    CONTINUOUS_MODE = continuous_var.get()
+    # Percobaan yang sedang berjalan tetap diproses; segmenter baru mulai dari sampel berikutnya
+    flush_trial_segmenters()
+    if CONTINUOUS_MODE:
+        status_label.config(text=f"Status: Mode kontinu aktif - percobaan disimpan ke {CONTINUOUS_DIR}", fg="blue")
+    else:
+        status_label.config(text="Status: Mode kontinu nonaktif", fg="blue")
+    print(f"Mode kontinu: {'aktif' if CONTINUOUS_MODE else 'nonaktif'}")
 
 def send_mqtt_command(command):
     """Send command to ESP8266/ESP32"""
     try:
-        if client.is_connected():
+        if client is not None and client.is_connected():
             # Send to command topic
             command_topic = MQTT_TOPIC + "/cmd"
             result = client.publish(command_topic, command)
@@ -539,62 +866,166 @@ def send_mqtt_command(command):
         print(f"Error sending command: {e}")
         return False
 
+def create_mqtt_client():
+    """Create the paho client - compatible with both ESP versions"""
+    import paho.mqtt.client as mqtt
+    try:
+        # Try new API first (for newer paho-mqtt versions)
+        return mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+    except AttributeError:
+        # Fallback to old API (for older paho-mqtt versions)
+        return mqtt.Client()
+
 def setup_mqtt():
-    """Setup MQTT client with ESP8266/ESP32 compatibility"""
+    """Setup MQTT client with ESP8266/ESP32 compatibility (non-blocking)"""
+    global client
     try:
+        client = create_mqtt_client()
+        
         # Set callbacks
         client.on_connect = on_connect
+        client.on_connect_fail = on_connect_fail
         client.on_message = on_message
         client.on_disconnect = on_disconnect
+        client.reconnect_delay_set(MQTT_RECONNECT_MIN_DELAY, MQTT_RECONNECT_MAX_DELAY)
         
+        # Koneksi dilakukan oleh thread jaringan paho; GUI tidak menunggu broker
         print(f"Connecting to MQTT broker: {MQTT_BROKER}")
-        client.connect(MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE)
+        status_label.config(text=f"Status: Menghubungkan ke {MQTT_BROKER}...", fg="orange")
+        client.connect_async(MQTT_BROKER, MQTT_PORT, MQTT_KEEPALIVE)
         client.loop_start()
         
     except Exception as e:
         print(f"MQTT Setup Error: {str(e)}")
         status_label.config(text="Status: MQTT Setup Failed", fg="red")
 
-def start_collection():
+def start_collection(send_command=True):
     """Start data collection"""
-    global collecting, start_time, update_needed
+    global collecting, update_needed
     collecting = True
-    start_time = time.time()  # PERBAIKAN: Reset start_time setiap kali mulai
+    for session in sessions:
+        session.start_time = time.time()  # PERBAIKAN: Reset start_time setiap kali mulai
+        session.trial_segmenter = None    # waktu mulai dari 0 lagi: segmentasi juga
+    perf.reset_lag()  # jam ESP mulai dari 0 lagi setelah START_READING
     update_needed = True
     status_label.config(text="Status: Mengumpulkan Data", fg="green")
+    open_session_journal(active_session)
     
     # PERBAIKAN: Reset data waktu agar dimulai dari 0
-    if time_data:
+    if len(samples):
         print("Mereset waktu ke 0 untuk pembacaan baru")
     
     # Kirim perintah ke ESP untuk mulai
-    send_mqtt_command("START_READING")
+    if send_command:
+        send_mqtt_command("START_READING")
     print("Pengumpulan data dimulai - waktu direset ke 0")
 
-def stop_collection():
+def stop_collection(send_command=True):
     """Stop data collection"""
     global collecting, update_needed
+    if replayer is not None and replayer.running:
+        # Replay dihentikan manual: tidak ada ESP yang perlu diberi perintah
+        replayer.stop()
+        replayer.join()
+        send_command = False
     collecting = False
     update_needed = True
     status_label.config(text="Status: Berhenti", fg="red")
     
     # Kirim perintah ke ESP untuk berhenti
-    send_mqtt_command("STOP_READING")
+    if send_command:
+        send_mqtt_command("STOP_READING")
     print("Pengumpulan data dihentikan")
     
+    # Antrean terakhir masuk ke jurnal sebelum jurnal ditutup
+    process_ingest_queue()
+    close_session_journals()
+    
+    # Filter zero-phase hanya dijalankan sekali di akhir pengumpulan
+    get_final_filtered()
+    
+    if CONTINUOUS_MODE:
+        # Setiap percobaan sudah dianalisis sendiri; seluruh aliran bukan satu run
+        flush_trial_segmenters()
+        return
+    
     # Auto-calculate coefficient setelah pengumpulan data selesai
-    if len(distance_data) >= 10:
+    if len(samples) >= 10:
         print("Menghitung koefisien restitusi otomatis...")
         root.after(1000, calculate_restitution_coefficient)  # Delay 1 detik untuk memastikan plot terupdate
 
+def start_replay():
+    """Replay a recorded run (xlsx/npz/journal) through on_message as if the rig were connected"""
+    global replayer
+    if collecting:
+        messagebox.showwarning("Peringatan", "Hentikan pengumpulan data terlebih dahulu.")
+        return
+    path = filedialog.askopenfilename(
+        title="Pilih Run untuk Diputar Ulang",
+        initialdir=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data", "data-percobaan"),
+        filetypes=[("Data run", "*.xlsx *.npz *.krj *.part"), ("All files", "*.*")])
+    if not path:
+        return
+    speed = simpledialog.askfloat("Kecepatan Putar Ulang",
+                                  "Faktor kecepatan (1 = waktu asli, 10 = 10x lebih cepat)\n"
+                                  "Isi 0 untuk secepat mungkin:",
+                                  initialvalue=1.0, minvalue=0.0, maxvalue=1000.0)
+    if speed is None:
+        return
+    repeat = simpledialog.askinteger("Pengulangan", "Putar run berapa kali berturut-turut?",
+                                     initialvalue=1, minvalue=1, maxvalue=10000)
+    if repeat is None:
+        return
+    
+    # Payload masuk lewat on_message persis seperti dari thread paho
+    transport = InProcessTransport()
+    transport.subscribe(MQTT_TOPIC, on_message)
+    try:
+        replayer = RunReplayer.from_file(transport, path, sensor_height=sensor_height,
+                                          speed=speed, repeat=repeat)
+    except Exception as e:
+        messagebox.showerror("Error", f"Gagal membaca run:\n{str(e)}")
+        return
+    
+    sessions.get(replayer.device).reset()
+    data_table.reset()
+    refresh_device_selector()
+    select_device(replayer.device)
+    perf.reset()  # statistik performa khusus untuk replay ini
+    start_collection(send_command=False)
+    replayer.start()
+    status_label.config(text=f"Status: Memutar ulang {os.path.basename(path)} ({speed:g}x)", fg="purple")
+    print(f"Memutar ulang {path}: {replayer.total} sampel, kecepatan {speed:g}x")
+    root.after(200, check_replay)
+
+def check_replay():
+    """Finish the replay once every sample has been sent and processed"""
+    if replayer is None:
+        return
+    if replayer.running or len(ingest_queue):
+        root.after(200, check_replay)
+        return
+    if not collecting:
+        return  # sudah dihentikan lewat tombol
+    stop_collection(send_command=False)
+    
+    frame = perf.stats("frame").summary()
+    backlog = perf.gauges.get("antrean", (0, 0))[1]
+    summary = (f"Replay selesai: {replayer.summary()}; {frame['count']} frame "
+               f"(rata-rata {frame['mean_ms']:.1f} ms, maks {frame['max_ms']:.1f} ms), "
+               f"antrean maksimum {backlog} pesan")
+    print(summary)
+    print(perf.format_overlay())
+    status_label.config(text=f"Status: Replay selesai - {replayer.sent} sampel", fg="blue")
+
 def reset_data():
-    """Reset all collected data"""
-    global time_data, distance_data, start_time, update_needed, latest_analysis_text
-    time_data.clear()
-    distance_data.clear()
-    start_time = None
+    """Reset all collected data of the active device"""
+    global update_needed, latest_analysis_text, latest_analysis_record
+    active_session.reset()
+    data_table.reset()
     update_needed = True
     latest_analysis_text = ""  # PERBAIKAN: Reset hasil analisis juga
+    latest_analysis_record = None
     
     data_count_label.config(text="Jumlah Data: 0")
     latest_data_label.config(text="Terbaru: -")
@@ -604,140 +1035,65 @@ def reset_data():
     print("Data dan hasil analisis telah direset.")
 
 def update_data_table():
-    """Update the data table with latest measurements"""
-    global data_tree
-    
+    """Update the data table with latest measurements (only new rows are added)"""
     try:
-        # Clear existing items
-        for item in data_tree.get_children():
-            data_tree.delete(item)
-        
-        # PERBAIKAN: Validasi data sebelum menampilkan
-        if not time_data or not distance_data:
-            return
-        
-        if len(time_data) != len(distance_data):
-            print(f"Warning: Data length mismatch - time: {len(time_data)}, distance: {len(distance_data)}")
-            return
-        
-        # Add latest 50 data points (or all if less than 50)
-        start_idx = max(0, len(time_data) - 50)
-        
-        for i in range(start_idx, len(time_data)):
-            try:
-                # PERBAIKAN: Validasi setiap data point
-                if i < len(time_data) and i < len(distance_data):
-                    t = time_data[i]
-                    d = distance_data[i]
-                    
-                    # Validasi tipe data
-                    if isinstance(t, (int, float)) and isinstance(d, (int, float)):
-                        if not (np.isnan(t) or np.isnan(d) or np.isinf(t) or np.isinf(d)):
-                            raw_distance = sensor_height - d
-                            
-                            data_tree.insert('', 'end', values=(
-                                i + 1,
-                                f"{float(t):.2f}",
-                                f"{float(d):.1f}",
-                                f"{float(raw_distance):.1f}"
-                            ))
-                        else:
-                            print(f"Skipping invalid data point {i}: NaN or Inf values")
-                    else:
-                        print(f"Skipping invalid data point {i}: wrong data type")
-                        
-            except Exception as e:
-                print(f"Error processing data point {i}: {e}")
-                continue
-        
-        # Scroll to bottom
-        if data_tree.get_children():
-            data_tree.see(data_tree.get_children()[-1])
-            
+        with perf.stage("table"):
+            data_table.refresh(samples, sensor_height)
     except Exception as e:
-        print(f"Error updating data table: {e}")
+        log.error("Error updating data table: %s", e)
+
+def toggle_table_mode():
+    """Switch the data table between the last 50 rows and browsing the whole run"""
+    virtual = table_virtual_var.get()
+    table_frame.config(text="Tabel Data (Semua Data)" if virtual else "Tabel Data (50 Terakhir)")
+    data_table.set_virtual(virtual)
 
 def save_analysis_to_file():
-    """Save analysis results to file"""
-    global latest_analysis_text
-    
+    """Save analysis results to file (written by the export worker)"""
     if not latest_analysis_text:
         messagebox.showwarning("Peringatan", "Tidak ada hasil analisis untuk disimpan.\nSilakan hitung koefisien restitusi terlebih dahulu.")
         return
     
-    try:
-        # Generate filename with ball type and timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
-        default_filename = f"Analisis_{ball_name}_{timestamp}.txt"
-        
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("File Teks", "*.txt"), ("File CSV", "*.csv"), ("Semua file", "*.*")],  # PERBAIKAN: Tambah format CSV
-            title="Simpan Hasil Analisis",
-            initialdir=os.getcwd(),
-            initialfile=default_filename
-        )
-        
-        if file_path:
-            # PERBAIKAN: Validasi dan bersihkan teks analisis
-            clean_analysis_text = latest_analysis_text
-            
-            # Ganti karakter yang bermasalah
-            clean_analysis_text = clean_analysis_text.replace('\x00', '')  # Hapus null character
-            clean_analysis_text = clean_analysis_text.replace('\r\n', '\n')  # Standardize line endings
-            clean_analysis_text = clean_analysis_text.replace('\r', '\n')
-            
-            # PERBAIKAN: Tulis dengan encoding UTF-8 dan error handling
-            with open(file_path, 'w', encoding='utf-8', errors='replace') as f:
-                f.write(clean_analysis_text)
-            
-            messagebox.showinfo("Berhasil", f"Hasil analisis {selected_ball_type} disimpan ke {file_path}")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Gagal menyimpan file analisis:\n{str(e)}")
-        print(f"Analysis save error details: {e}")
+    # Generate filename with ball type and timestamp
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
+    default_filename = f"Analisis_{ball_name}_{timestamp}.txt"
+    
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".txt",
+        filetypes=[("File Teks", "*.txt"), ("File CSV", "*.csv"), ("Semua file", "*.*")],  # PERBAIKAN: Tambah format CSV
+        title="Simpan Hasil Analisis",
+        initialdir=os.getcwd(),
+        initialfile=default_filename
+    )
+    
+    if file_path:
+        snapshot = export_snapshot(include_plot=False)
+        submit_export(ExportJob(f"Analisis {selected_ball_type}", [("Analisis", analysis_task(file_path, snapshot))]))
 
-def update_analysis_display():
-    """Update the analysis display with current statistics"""
-    global analysis_text, latest_analysis_text
-    
-    if len(distance_data) < 2:
-        analysis_info = "Tidak ada data tersedia untuk analisis"
+def format_live_analysis():
+    """Real-time panel text (before a full coefficient analysis) from the cached statistics"""
+    stats = get_height_stats()
+    bounce_distances, coefficients = get_live_bounces()
+    if len(coefficients):
+        coefficient_text = f"{np.mean(coefficients):.3f}"
+        retention = np.mean(coefficients) ** 2 * 100
     else:
-        # Check if we have detailed analysis results
-        if latest_analysis_text:
-            analysis_info = latest_analysis_text
-        else:
-            # Basic statistics jika belum ada analisis koefisien
-            min_height = min(distance_data)
-            max_height = max(distance_data)
-            avg_height = np.mean(distance_data)
-            std_height = np.std(distance_data)
-            
-            # Bounce detection
-            bounce_times, bounce_distances = detect_bounces(distance_data, time_data)
-            
-            # Calculate coefficient if possible
-            coefficients = []
-            if len(bounce_distances) >= 2:
-                for i in range(1, len(bounce_distances)):
-                    if bounce_distances[i-1] > 0:
-                        e = np.sqrt(bounce_distances[i] / bounce_distances[i-1])
-                        coefficients.append(e)
-            
-            analysis_info = f"""ANALISIS REAL-TIME - {selected_ball_type.upper()}
+        coefficient_text = "N/A"
+        retention = 0
+    
+    return f"""ANALISIS REAL-TIME - {selected_ball_type.upper()}
 {"="*30}
 
 JENIS BOLA: {selected_ball_type}
 
 STATISTIK DATA:
-• Jumlah Data: {len(distance_data)}
-• Durasi: {max(time_data) if time_data else 0:.1f}s
-• Tinggi Min: {min_height:.1f} cm
-• Tinggi Max: {max_height:.1f} cm
-• Tinggi Rata-rata: {avg_height:.1f} cm
-• Standar Deviasi: {std_height:.1f} cm
+• Jumlah Data: {stats["count"]}
+• Durasi: {stats["time_max"]:.1f}s
+• Tinggi Min: {stats["min"]:.1f} cm
+• Tinggi Max: {stats["max"]:.1f} cm
+• Tinggi Rata-rata: {stats["mean"]:.1f} cm
+• Standar Deviasi: {stats["std"]:.1f} cm
 
 DETEKSI PANTULAN:
 • Ambang Batas: {bounce_threshold:.1f} cm
@@ -746,8 +1102,8 @@ DETEKSI PANTULAN:
 
 ANALISIS KOEFISIEN:
 • Pasangan Valid: {len(coefficients)}
-• Koefisien Rata-rata: {np.mean(coefficients):.3f if coefficients else 'N/A'}
-• Retensi Energi: {np.mean(coefficients)**2*100 if coefficients else 0:.1f}%
+• Koefisien Rata-rata: {coefficient_text}
+• Retensi Energi: {retention:.1f}%
 
 PENGATURAN:
 • Tinggi Sensor: {sensor_height:.1f} cm
@@ -758,6 +1114,25 @@ CATATAN:
 Klik "Hitung Koefisien Restitusi" untuk 
 analisis lengkap dan detail perhitungan.
 """
+
+def update_analysis_display():
+    """Update the analysis display; the Text widget is only rewritten when the text changed"""
+    global analysis_display_text
+    
+    if len(samples) < 2:
+        analysis_info = "Tidak ada data tersedia untuk analisis"
+    elif latest_analysis_text:
+        # Hasil analisis koefisien lengkap (atau ringkasan mode kontinu)
+        analysis_info = latest_analysis_text
+    else:
+        key = (samples.version, bounce_threshold, min_bounce_distance, BOUNCE_PROMINENCE,
+               min_height_difference, sensor_height, selected_ball_type, collecting)
+        analysis_info = active_session.analysis_cache.get("panel_text", key,
+                                                          lambda previous: format_live_analysis())
+    
+    if analysis_info == analysis_display_text:
+        return
+    analysis_display_text = analysis_info
     
     # Update analysis text widget
     analysis_text.config(state=tk.NORMAL)
@@ -768,81 +1143,63 @@ analisis lengkap dan detail perhitungan.
 def update_plot():
     """Update the matplotlib plot"""
     try:
-        if len(time_data) == 0:
-            ax.clear()
-            ax.set_xlabel("Waktu (detik)")
-            ax.set_ylabel("Tinggi Bola (cm)")
-            ax.set_title(f"Pengukuran Tinggi {selected_ball_type} Real-time")
-            ax.grid(True, alpha=0.3)
-            canvas.draw_idle()
+        if len(samples) == 0:
+            plot_renderer.clear(f"Pengukuran Tinggi {selected_ball_type} Real-time")
+            update_data_table()
             return
         
-        ax.clear()
-        
-        # Apply filter if enough data
-        if len(distance_data) > 20:
-            filtered = lowpass_filter(distance_data)
+        if collecting:
+            # Selama pengumpulan: hasil filter kausal inkremental, tanpa menghitung ulang riwayat
+            time_data = filtered_samples.times
+            filtered = filtered_samples.heights
+            bounce_times, bounce_distances = plot_bounce_detector.bounces()
         else:
-            filtered = distance_data
-        
-        # Plot main line
-        ax.plot(time_data, filtered, 'b-', label=f"Tinggi {selected_ball_type}", linewidth=2)
-        
-        # Show bounces if enough data
-        if len(filtered) > 20:
-            bounce_times, bounce_distances = detect_bounces(filtered, time_data, 
-                                                           bounce_threshold, min_bounce_distance)
-            if bounce_times and bounce_distances:
-                ax.plot(bounce_times, bounce_distances, "ro", label=f"Puncak Pantulan", markersize=8)
-                
-                # Add height annotations on peaks
-                for i, (bt, bd) in enumerate(zip(bounce_times, bounce_distances)):
-                    ax.annotate(f'{bd:.1f}', (bt, bd), 
-                               textcoords="offset points", xytext=(0,10), ha='center',
-                               fontsize=8, color='red', weight='bold')
-        
-        ax.set_xlabel("Waktu (detik)")
-        ax.set_ylabel("Tinggi Bola (cm)")
-        ax.set_title(f"Monitor Tinggi {selected_ball_type} (Sensor: {sensor_height}cm, Ambang: {bounce_threshold}cm)")
-        ax.legend(loc='upper right')
-        ax.grid(True, alpha=0.3)
+            # Setelah berhenti: filtfilt zero-phase & deteksi pantulan, dihitung sekali per versi data/pengaturan
+            time_data, filtered, bounce_times, bounce_distances = get_final_bounces()
         
-        # Set axis limits
-        if len(time_data) > 1:
-            time_range = max(max(time_data) - min(time_data), 1)
-            x_margin = time_range * 0.05
-            ax.set_xlim(min(time_data) - x_margin, max(time_data) + x_margin)
-        
-        if len(filtered) > 1:
-            dist_range = max(max(filtered) - min(filtered), 5)
-            y_margin = dist_range * 0.1
-            ax.set_ylim(max(0, min(filtered) - y_margin), max(filtered) + y_margin)
-        
-        canvas.draw_idle()
+        # Artist dipakai ulang (set_data + blitting), bukan ax.clear() setiap frame
+        with perf.stage("draw"):
+            plot_renderer.update(time_data, filtered, bounce_times, bounce_distances,
+                                 title=f"Monitor Tinggi {selected_ball_type} (Sensor: {sensor_height}cm, Ambang: {bounce_threshold}cm)",
+                                 line_label=f"Tinggi {selected_ball_type}",
+                                 follow=collecting, first_index=filtered_samples.first_index)
         
         # Update other displays
         update_data_table()
-        update_analysis_display()
+        with perf.stage("analysis"):
+            update_analysis_display()
         
     except Exception as e:
-        print(f"Plot update error: {e}")
+        log.error("Plot update error: %s", e)
 
 def periodic_update():
     """Periodic update for real-time display"""
     global update_needed
     
     try:
-        if update_needed and len(time_data) >= 0:
+        frame_start = time.perf_counter()
+        apply_mqtt_status()
+        perf.gauge("antrean", len(ingest_queue))
+        perf.update_rate("mqtt", ingest_queue.received)
+        stored = process_ingest_queue()
+        apply_trial_outcomes()
+        apply_export_progress()
+        
+        drew = update_needed
+        if update_needed:
             update_plot()
             update_needed = False
         
         root.update_idletasks()
+        # Waktu frame hanya dicatat untuk frame yang benar-benar bekerja
+        if stored or drew:
+            perf.record("frame", time.perf_counter() - frame_start)
         
     except Exception as e:
-        print(f"Periodic update error: {e}")
+        log.exception("Periodic update error: %s", e)
     
     # Schedule next update
-    interval = 50 if collecting or len(time_data) > 0 else 200
+    interval = 50 if collecting or len(samples) > 0 else 200
     root.after(interval, periodic_update)
 
 def set_interval():
@@ -856,6 +1213,22 @@ def set_interval():
     except Exception as e:
         print(f"Error setting interval: {e}")
 
+def set_payload_format():
+    """Switch the ESP between JSON payloads and packed binary batches"""
+    try:
+        batch = simpledialog.askinteger("Format Payload",
+                                        "Jumlah sampel per pesan biner (1-32)\n"
+                                        "Isi 0 untuk kembali ke format JSON:",
+                                        initialvalue=10, minvalue=0, maxvalue=32)
+        if batch is None:
+            return
+        if batch == 0:
+            send_mqtt_command("FORMAT:JSON")
+        else:
+            send_mqtt_command(f"FORMAT:BINARY:{batch}")
+    except Exception as e:
+        print(f"Error setting payload format: {e}")
+
 def set_sensor_height():
     """Set sensor height from ground"""
     global sensor_height, update_needed
@@ -880,6 +1253,7 @@ def set_bounce_threshold():
                                             initialvalue=bounce_threshold, minvalue=1.0, maxvalue=50.0)
         if new_threshold:
             bounce_threshold = new_threshold
+            sync_bounce_detector()
             update_needed = True
             status_label.config(text=f"Status: Ambang pantulan diatur ke {bounce_threshold}cm", fg="blue")
             print(f"Ambang pantulan diubah ke: {bounce_threshold}cm")
@@ -895,6 +1269,7 @@ def set_min_height_difference():
                                        initialvalue=min_height_difference, minvalue=0.1, maxvalue=10.0)
         if new_diff:
             min_height_difference = new_diff
+            sync_bounce_detector()
             update_needed = True
             status_label.config(text=f"Status: Selisih tinggi minimum diatur ke {min_height_difference}cm", fg="blue")
             print(f"Selisih tinggi minimum diubah ke: {min_height_difference}cm")
@@ -910,128 +1285,224 @@ def set_min_bounce_distance():
                                              initialvalue=min_bounce_distance, minvalue=1, maxvalue=100)
         if new_distance:
             min_bounce_distance = new_distance
+            sync_bounce_detector()
             update_needed = True
             status_label.config(text=f"Status: Jarak minimum pantulan diatur ke {min_bounce_distance}", fg="blue")
             print(f"Jarak minimum pantulan diubah ke: {min_bounce_distance}")
     except Exception as e:
         print(f"Error setting min bounce distance: {e}")
 
+def export_snapshot(include_plot=True):
+    """Copy the active run, the plot contents and the analysis for the export worker (Tk thread)"""
+    session = active_session
+    
+    # Tanpa I/O di thread Tk: run yang masih utuh di memori disalin; bila mode ring
+    # sudah membuang sampel terlama, thread ekspor membaca jurnal (menunggu penulisnya sendiri)
+    journal, journal_samples, journal_path = None, 0, None
+    times, heights = samples.times, samples.heights
+    if samples.first_index > 0:
+        if session.journal is not None:
+            journal, journal_samples = session.journal, session.journal.appended
+        elif session.journal_path and os.path.exists(session.journal_path):
+            journal_path = session.journal_path
+        if journal is not None or journal_path is not None:
+            times, heights = None, None
+    
+    plot = None
+    if include_plot and len(samples):
+        # Isi grafik seperti yang sedang tampil (kausal saat live, zero-phase setelah berhenti)
+        if collecting:
+            time_data, filtered = filtered_samples.times, filtered_samples.heights
+            bounce_times, bounce_heights = plot_bounce_detector.bounces()
+        else:
+            time_data, filtered, bounce_times, bounce_heights = get_final_bounces()
+        plot = PlotSnapshot(time_data, filtered, bounce_times, bounce_heights,
+                            title=ax.get_title(), line_label=f"Tinggi {selected_ball_type}",
+                            xlim=ax.get_xlim(), ylim=ax.get_ylim(), figsize=fig.get_size_inches())
+    return RunSnapshot(selected_ball_type, sensor_height, times, heights, journal_path, plot,
+                       latest_analysis_text, latest_analysis_record, journal, journal_samples)
+
+def submit_export(job):
+    """Queue an export job; progress and results appear in the status bar"""
+    export_queue.submit(job)
+    status_label.config(text=f"Status: Ekspor {job.name} dimulai (antrean: {export_queue.pending})", fg="blue")
+
+def apply_export_progress():
+    """Show the progress and results of the export worker (Tk thread)"""
+    events = export_queue.poll()
+    if not events:
+        return
+    for event in events:
+        if not event.done:
+            continue
+        for result in event.results:
+            print(f"Ekspor tersimpan: {result}")
+        if event.errors:
+            details = "\n".join(f"{label}: {error}" for label, error in event.errors)
+            status_label.config(text=f"Status: Ekspor {event.job.name} gagal", fg="red")
+            messagebox.showerror("Error", f"Gagal mengekspor {event.job.name}:\n{details}\n\n"
+                                          f"Pastikan file tidak sedang dibuka di aplikasi lain.")
+        else:
+            status_label.config(text=f"Status: Ekspor {event.job.name} selesai "
+                                     f"({len(event.results)} file)", fg="blue")
+    last = events[-1]
+    if not last.done:
+        status_label.config(text=f"Status: Ekspor {last.job.name} - {last.label} "
+                                 f"{last.fraction * 100:.0f}%", fg="blue")
+
 def save_excel():
-    """Save collected data to an Excel file."""
-    if not time_data or not distance_data:
+    """Save collected data to an Excel file (written by the export worker)."""
+    if len(samples) == 0:
         messagebox.showwarning("Peringatan", "Tidak ada data untuk disimpan.")
         return
     
-    # PERBAIKAN: Validasi data sebelum menyimpan
-    if len(time_data) != len(distance_data):
-        messagebox.showerror("Error", f"Ketidakcocokan jumlah data:\nWaktu: {len(time_data)}\nJarak: {len(distance_data)}")
-        return
-    
-    try:
-        # Generate filename with ball type and timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
-        default_filename = f"Data_{ball_name}_{timestamp}.xlsx"
-        
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".xlsx", 
-            filetypes=[("File Excel", "*.xlsx")],
-            title="Simpan Data ke Excel",
-            initialdir=os.getcwd(),  # PERBAIKAN: Simpan di direktori kerja saat ini
-            initialfile=default_filename
-        )
-        
-        if file_path:
-            # PERBAIKAN: Validasi dan bersihkan data
-            clean_time_data = []
-            clean_distance_data = []
-            clean_sensor_heights = []
-            clean_ball_types = []
-            
-            for i, (t, d) in enumerate(zip(time_data, distance_data)):
-                # Validasi setiap data point
-                if isinstance(t, (int, float)) and isinstance(d, (int, float)):
-                    if not (np.isnan(t) or np.isnan(d) or np.isinf(t) or np.isinf(d)):
-                        clean_time_data.append(float(t))
-                        clean_distance_data.append(float(d))
-                        clean_sensor_heights.append(float(sensor_height))
-                        clean_ball_types.append(str(selected_ball_type))
-                    else:
-                        print(f"Data point {i} diabaikan: nilai tidak valid (NaN/Inf)")
-                else:
-                    print(f"Data point {i} diabaikan: tipe data tidak valid")
-            
-            if not clean_time_data:
-                messagebox.showerror("Error", "Tidak ada data valid untuk disimpan.")
-                return
-            
-            # PERBAIKAN: Buat DataFrame dengan data yang sudah dibersihkan
-            df = pd.DataFrame({
-                "Waktu (detik)": clean_time_data, 
-                f"Tinggi {selected_ball_type} (cm)": clean_distance_data,
-                "Tinggi Sensor (cm)": clean_sensor_heights,
-                "Jenis Bola": clean_ball_types
-            })
-            
-            # PERBAIKAN: Validasi DataFrame sebelum menyimpan
-            if df.empty:
-                messagebox.showerror("Error", "DataFrame kosong, tidak dapat menyimpan.")
-                return
-            
-            df.to_excel(file_path, index=False, engine='openpyxl')
-            messagebox.showinfo("Berhasil", f"Data {selected_ball_type} disimpan ke {file_path}\nTotal data valid: {len(clean_time_data)}")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Gagal menyimpan data ke Excel:\n{str(e)}\n\nPastikan file tidak sedang dibuka di aplikasi lain.")
-        print(f"Excel save error details: {e}")
+    # Generate filename with ball type and timestamp
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
+    default_filename = f"Data_{ball_name}_{timestamp}.xlsx"
+    
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".xlsx", 
+        filetypes=[("File Excel", "*.xlsx")],
+        title="Simpan Data ke Excel",
+        initialdir=os.getcwd(),  # PERBAIKAN: Simpan di direktori kerja saat ini
+        initialfile=default_filename
+    )
+    
+    if file_path:
+        # PERBAIKAN: Validasi data sebelum menyimpan (sekaligus untuk seluruh array)
+        if not (np.isfinite(samples.times) & np.isfinite(samples.heights)).any():
+            messagebox.showerror("Error", "Tidak ada data valid untuk disimpan.")
+            return
+        snapshot = export_snapshot(include_plot=False)
+        submit_export(ExportJob(f"Excel {selected_ball_type}", [("Excel", excel_task(file_path, snapshot))]))
 
 def save_png():
-    """Save the current plot as a PNG file."""
-    try:
-        # PERBAIKAN: Validasi plot sebelum menyimpan
-        if fig is None or ax is None:
+    """Save the current plot as a PNG file (rendered on a separate Agg figure by the export worker)."""
+    # PERBAIKAN: Validasi plot sebelum menyimpan
+    if fig is None or ax is None:
+        messagebox.showerror("Error", "Grafik belum tersedia untuk disimpan.")
+        return
+    
+    # Generate filename with ball type and timestamp
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
+    default_filename = f"Grafik_{ball_name}_{timestamp}.png"
+    
+    file_path = filedialog.asksaveasfilename(
+        defaultextension=".png", 
+        filetypes=[("File PNG", "*.png"), ("File JPG", "*.jpg"), ("File PDF", "*.pdf")],  # PERBAIKAN: Tambah format lain
+        title="Simpan Grafik",
+        initialdir=os.getcwd(),  # PERBAIKAN: Simpan di direktori kerja saat ini
+        initialfile=default_filename
+    )
+    
+    if file_path:
+        snapshot = export_snapshot()
+        if snapshot.plot is None:
             messagebox.showerror("Error", "Grafik belum tersedia untuk disimpan.")
             return
-        
-        # Generate filename with ball type and timestamp
-        timestamp = time.strftime("%Y%m%d_%H%M%S")
-        ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")  # PERBAIKAN: Hapus karakter invalid
-        default_filename = f"Grafik_{ball_name}_{timestamp}.png"
-        
-        file_path = filedialog.asksaveasfilename(
-            defaultextension=".png", 
-            filetypes=[("File PNG", "*.png"), ("File JPG", "*.jpg"), ("File PDF", "*.pdf")],  # PERBAIKAN: Tambah format lain
-            title="Simpan Grafik",
-            initialdir=os.getcwd(),  # PERBAIKAN: Simpan di direktori kerja saat ini
-            initialfile=default_filename
-        )
-        
-        if file_path:
-            # PERBAIKAN: Update plot sebelum menyimpan
-            update_plot()
-            
-            # PERBAIKAN: Simpan dengan parameter yang lebih aman
-            fig.savefig(file_path, 
-                       dpi=300, 
-                       bbox_inches='tight',
-                       facecolor='white',  # PERBAIKAN: Background putih
-                       edgecolor='none',   # PERBAIKAN: Tanpa border
-                       format=None)        # PERBAIKAN: Auto-detect format
-            
-            messagebox.showinfo("Berhasil", f"Grafik {selected_ball_type} disimpan ke {file_path}")
-            
-    except Exception as e:
-        messagebox.showerror("Error", f"Gagal menyimpan grafik:\n{str(e)}")
-        print(f"PNG save error details: {e}")
+        submit_export(ExportJob(f"Grafik {selected_ball_type}", [("PNG", png_task(file_path, snapshot))]))
+
+def export_all():
+    """Export the data (Excel), plot (PNG) and analysis text of the active run as one background job"""
+    if len(samples) == 0:
+        messagebox.showwarning("Peringatan", "Tidak ada data untuk diekspor.")
+        return
+    directory = filedialog.askdirectory(title="Pilih Folder Ekspor", initialdir=os.getcwd())
+    if not directory:
+        return
+    
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    ball_name = selected_ball_type.replace(" ", "_").replace("/", "_")
+    snapshot = export_snapshot()
+    tasks = [("Excel", excel_task(os.path.join(directory, f"Data_{ball_name}_{timestamp}.xlsx"), snapshot)),
+             ("PNG", png_task(os.path.join(directory, f"Grafik_{ball_name}_{timestamp}.png"), snapshot))]
+    if snapshot.analysis_text:
+        tasks.append(("Analisis", analysis_task(os.path.join(directory, f"Analisis_{ball_name}_{timestamp}.txt"),
+                                                snapshot)))
+    else:
+        print("Ekspor semua: belum ada hasil analisis, file analisis dilewati")
+    submit_export(ExportJob(f"Semua {selected_ball_type}", tasks))
+
+def toggle_perf_panel():
+    """Show or hide the per-stage performance panel"""
+    global perf_visible
+    perf_visible = not perf_visible
+    if perf_visible:
+        perf_frame.pack(fill=tk.X, padx=5, pady=2, after=status_frame)
+        refresh_perf_panel()
+    else:
+        perf_frame.pack_forget()
+
+def refresh_perf_panel():
+    """Redraw the performance panel once per second while it is visible"""
+    if not perf_visible:
+        return
+    text = perf.format_overlay()
+    suppressed = sum(app_logging.suppressed_counts().values())
+    if suppressed:
+        text += f"\nlog ditahan: {suppressed}"
+    perf_label.config(text=text)
+    root.after(PERF_REFRESH_MS, refresh_perf_panel)
+
+def save_perf_stats():
+    """Dump the pipeline statistics to a JSON file for later diagnosis"""
+    filename = filedialog.asksaveasfilename(
+        title="Simpan Statistik Performa",
+        defaultextension=".json",
+        initialfile=f"Performa_{time.strftime('%Y%m%d_%H%M%S')}.json",
+        filetypes=[("JSON files", "*.json"), ("All files", "*.*")])
+    if not filename:
+        return
+    try:
+        perf.dump(filename, **perf_context())
+        status_label.config(text="Status: Statistik performa disimpan", fg="blue")
+        print(f"Statistik performa disimpan: {filename}")
+    except OSError as e:
+        messagebox.showerror("Error", f"Gagal menyimpan statistik performa:\n{str(e)}")
+
+def perf_context():
+    """Session context written next to the statistics"""
+    return {
+        "devices": {session.device: len(session) for session in sessions},
+        "collecting": collecting,
+        "ingest_backlog": len(ingest_queue),
+        "mqtt_received": ingest_queue.received,
+        "settings": {"sensor_height": sensor_height, "bounce_threshold": bounce_threshold,
+                     "ingest_batch_limit": INGEST_BATCH_LIMIT},
+        "log_suppressed": app_logging.suppressed_counts(),
+        "exports_pending": export_queue.pending,
+        "analysis_cache": {session.device: session.analysis_cache.summary() for session in sessions},
+        "continuous": {"enabled": CONTINUOUS_MODE, "output_dir": CONTINUOUS_DIR,
+                       "trials_saved": sum(len(session.trials) for session in sessions),
+                       "trials_pending": trial_pipeline.pending if trial_pipeline is not None else 0},
+    }
 
 def close_app():
     """Handle application close event"""
     try:
-        if client.is_connected():
-            client.loop_stop()
+        if client is not None:
             client.disconnect()
+            client.loop_stop()
     except Exception as e:
         print(f"Error during disconnect: {e}")
+    if replayer is not None:
+        replayer.stop()
+    close_session_journals()
+    # Percobaan yang sudah terdeteksi tetap disimpan sebelum keluar
+    flush_trial_segmenters()
+    if trial_pipeline is not None:
+        trial_pipeline.shutdown(wait=True)
+    # File yang sedang/akan diekspor diselesaikan dulu
+    export_queue.shutdown(wait=True)
+    if perf_dump_path:
+        try:
+            perf.dump(perf_dump_path, **perf_context())
+            print(f"Statistik performa disimpan: {perf_dump_path}")
+        except OSError as e:
+            print(f"Gagal menyimpan statistik performa: {e}")
+    app_logging.shutdown()
     if root is not None:
         root.destroy()
 
@@ -1039,10 +1510,17 @@ def refresh_plot_manually():
     """Manually refresh the plot."""
     update_plot()
 
+class PlotToolbar(NavigationToolbar2Tk):
+    """Matplotlib toolbar whose Home button returns the plot to following the data."""
+
+    def home(self, *args):
+        plot_renderer.release_view()
+
 def setup_gui():
     """Initialize GUI components with improved 2-row layout"""
-    global root, fig, ax, canvas, status_label, data_count_label, latest_data_label
-    global data_tree, analysis_text
+    global root, fig, ax, canvas, plot_renderer, status_label, data_count_label, latest_data_label
+    global data_tree, data_table, table_frame, table_virtual_var, analysis_text
+    global device_var, device_selector, status_frame, perf_frame, perf_label, continuous_var
     
     root = tk.Tk()
     root.title(f"Monitor Tinggi Bola HC-SR04 - {selected_ball_type}")
@@ -1097,6 +1575,10 @@ def setup_gui():
     ax.grid(True, alpha=0.3)
     
     canvas = FigureCanvasTkAgg(fig, master=plot_frame)
+    plot_renderer = LivePlotRenderer(fig, ax, canvas)
+    # Toolbar zoom/pan; garis didesimasi ulang per perubahan tampilan
+    toolbar = PlotToolbar(canvas, plot_frame, pack_toolbar=False)
+    toolbar.pack(side=tk.BOTTOM, fill=tk.X)
     canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
     
     # -------------------------------------------
@@ -1137,6 +1619,13 @@ def setup_gui():
     v_scrollbar.config(command=data_tree.yview)
     h_scrollbar.config(command=data_tree.xview)
     
+    data_table = DataTable(data_tree, v_scrollbar, max_rows=50)
+    
+    # Mode jelajah: seluruh data dapat di-scroll tanpa membuat item Treeview untuk setiap baris
+    table_virtual_var = tk.BooleanVar(value=False)
+    tk.Checkbutton(table_frame, text="Jelajahi semua data", variable=table_virtual_var,
+                   command=toggle_table_mode, font=("Arial", 9)).pack(anchor="w", padx=5)
+    
     # -------------------------------------------
     # KOLOM 3: BAGIAN ANALISIS
     # -------------------------------------------
@@ -1174,6 +1663,20 @@ def setup_gui():
     data_count_label = tk.Label(status_frame, text="Jumlah Data: 0", font=("Arial", 12))
     data_count_label.pack(side=tk.RIGHT)
     
+    # Pilihan perangkat: tampilan mengikuti sesi perangkat yang dipilih
+    device_var = tk.StringVar(value=active_session.device)
+    device_selector = ttk.Combobox(status_frame, textvariable=device_var, values=sessions.devices(),
+                                   state="readonly", width=18)
+    device_selector.pack(side=tk.RIGHT, padx=5)
+    device_selector.bind("<<ComboboxSelected>>", on_device_selected)
+    tk.Label(status_frame, text="Perangkat:", font=("Arial", 12)).pack(side=tk.RIGHT)
+    
+    # Panel performa (tersembunyi sampai tombol "Panel Performa" ditekan)
+    perf_frame = tk.LabelFrame(control_frame, text="Performa Pipeline", font=("Arial", 11, "bold"))
+    perf_label = tk.Label(perf_frame, text="", font=("Courier", 9), justify=tk.LEFT, anchor="w")
+    perf_label.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+    tk.Button(perf_frame, text="Simpan Statistik", command=save_perf_stats,
+             bg="lightgray", width=14, font=("Arial", 10)).pack(side=tk.RIGHT, padx=3, pady=3)
     # Configuration row
     config_frame = tk.LabelFrame(control_frame, text="Konfigurasi", font=("Arial", 11, "bold"))
     config_frame.pack(fill=tk.X, padx=5, pady=3)
@@ -1203,6 +1706,14 @@ def setup_gui():
              bg="lightyellow", width=12, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
     tk.Button(main_control_frame, text="Refresh Grafik", command=refresh_plot_manually, 
              bg="lightcyan", width=12, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
+    tk.Button(main_control_frame, text="Putar Ulang Run", command=start_replay, 
+             bg="plum", width=14, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
+    tk.Button(main_control_frame, text="Panel Performa", command=toggle_perf_panel, 
+             bg="lightgray", width=14, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
+    # Mode kontinu: percobaan dipisah, dianalisis & disimpan otomatis selama pengumpulan
+    continuous_var = tk.BooleanVar(value=CONTINUOUS_MODE)
+    tk.Checkbutton(main_control_frame, text="Mode Kontinu", variable=continuous_var,
+                   command=toggle_continuous_mode, font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=3, pady=3)
     
     # Analysis and export row
     analysis_control_frame = tk.LabelFrame(control_frame, text="Analisis & Ekspor", font=("Arial", 11, "bold"))
@@ -1216,6 +1727,8 @@ def setup_gui():
              bg="lightblue", width=15, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
     tk.Button(analysis_control_frame, text="Simpan Grafik (PNG)", command=save_png, 
              bg="lightblue", width=15, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
+    tk.Button(analysis_control_frame, text="Ekspor Semua", command=export_all, 
+             bg="lightgreen", width=12, font=("Arial", 10, "bold")).pack(side=tk.LEFT, padx=3, pady=3)
     
     # ESP control row
     esp_control_frame = tk.LabelFrame(control_frame, text="Kontrol ESP8266/ESP32", font=("Arial", 11, "bold"))
@@ -1229,6 +1742,8 @@ def setup_gui():
              bg="lightyellow", width=12, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
     tk.Button(esp_control_frame, text="Atur Interval", command=set_interval, 
              bg="lightcyan", width=12, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
+    tk.Button(esp_control_frame, text="Format Payload", command=set_payload_format, 
+             bg="lightcyan", width=14, font=("Arial", 10)).pack(side=tk.LEFT, padx=3, pady=3)
     
     # Exit button
     tk.Button(esp_control_frame, text="Keluar Aplikasi", command=close_app, 
@@ -1237,8 +1752,54 @@ def setup_gui():
     # Initialize displays
     update_analysis_display()
 
+def preload_modules():
+    """Import heavy modules on a background thread so the first analysis does not stall"""
+    def worker():
+        import importlib
+        for name in PRELOAD_MODULES:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                print(f"Gagal memuat {name}: {e}")
+        if startup_timing:
+            print(f"[startup] modul analisis siap      : {time.perf_counter() - STARTUP_T0:.3f} s")
+    threading.Thread(target=worker, name="preload", daemon=True).start()
+
+def report_window_shown(event=None):
+    """Print the time until the main window is mapped (--startup-time)"""
+    root.unbind("<Map>")
+    print(f"[startup] jendela tampil            : {time.perf_counter() - STARTUP_T0:.3f} s")
+
 def main():
     """Main application entry point"""
+    global startup_timing, perf_dump_path, CONTINUOUS_MODE, CONTINUOUS_DIR
+    parser = argparse.ArgumentParser(description="Monitor Tinggi Bola HC-SR04")
+    parser.add_argument("--startup-time", action="store_true",
+                        help="ukur waktu startup, lalu tutup aplikasi otomatis")
+    parser.add_argument("--perf-dump", metavar="FILE", default=None,
+                        help="simpan statistik performa per tahap (JSON) saat aplikasi ditutup")
+    parser.add_argument("--log-level", default=app_logging.DEFAULT_LEVEL,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+                        help="level log konsol (DEBUG menampilkan detail per puncak/sampel)")
+    parser.add_argument("--log-file", metavar="FILE", default=None,
+                        help="tulis semua log (termasuk DEBUG) ke file JSONL untuk analisis offline")
+    parser.add_argument("--resample", action="store_true",
+                        help="filter & deteksi pada grid seragam dengan laju sampel dari timestamp")
+    parser.add_argument("--continuous", action="store_true",
+                        help="mode kontinu: pisahkan percobaan otomatis, analisis & simpan di latar")
+    parser.add_argument("--trial-dir", metavar="DIR", default=CONTINUOUS_DIR,
+                        help="folder run & record percobaan pada mode kontinu")
+    args = parser.parse_args()
+    app_logging.configure(args.log_level, args.log_file)
+    if args.resample:
+        enable_resampling()
+    CONTINUOUS_MODE = args.continuous
+    CONTINUOUS_DIR = args.trial_dir
+    startup_timing = args.startup_time
+    perf_dump_path = args.perf_dump
+    if startup_timing:
+        print(f"[startup] impor modul selesai       : {time.perf_counter() - STARTUP_T0:.3f} s")
+    
     print("=== Monitor Tinggi Bola HC-SR04 ===")
     print("Kompatibel dengan ESP8266 dan ESP32")
     print(f"MQTT Broker: {MQTT_BROKER}")
@@ -1248,12 +1809,18 @@ def main():
     
     # Setup GUI
     setup_gui()
+    if startup_timing:
+        print(f"[startup] GUI dibangun              : {time.perf_counter() - STARTUP_T0:.3f} s")
+        root.bind("<Map>", report_window_shown)
+        root.after(5000, close_app)
     
     # Setup MQTT
     setup_mqtt()
     
     # Start periodic updates
     root.after(100, periodic_update)
+    root.after(500, recover_unfinished_journals)
+    root.after_idle(preload_modules)
     
     print("Aplikasi dimulai!")
     print("- Klik 'Mulai' untuk memulai pengumpulan data")
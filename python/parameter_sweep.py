@@ -0,0 +1,178 @@
+"""Sapuan (sweep) parameter deteksi pantulan terhadap seluruh arsip percobaan.
+
+Setiap kombinasi ambang tinggi, jarak minimum, prominence dan selisih tinggi
+minimum dievaluasi pada semua run di arsip percobaan. Hasilnya adalah
+jumlah pantulan terdeteksi serta rata-rata dan varians koefisien restitusi
+per jenis bola, sehingga pengaturan dapat dipilih berdasarkan data.
+
+Contoh:
+    python parameter_sweep.py
+    python parameter_sweep.py --thresholds 10:20:1 --prominences 1:5:0.5 -o sweep.csv
+"""
+import argparse
+import itertools
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.signal import peak_prominences
+
+import analysis_core
+from run_archive import default_data_dir, list_runs, load_run
+
+DEFAULT_OUTPUT = "hasil_sweep_parameter.csv"
+
+# Grid bawaan di sekitar pengaturan yang dipakai GUI
+DEFAULT_GRID = {
+    "thresholds": "10:20:1",
+    "distances": "1,2,3",
+    "prominences": "1:5:0.5",
+    "height_differences": "0.1,0.5,1",
+}
+
+_runs = None  # (jenis bola, array tinggi) per run, dimuat sekali per proses worker
+
+
+def parse_grid(text):
+    """Parse "a,b,c" or an inclusive range "start:stop:step" into a list of floats."""
+    if ":" in text:
+        start, stop, step = (float(v) for v in text.split(":"))
+        return [float(v) for v in np.round(np.arange(start, stop + step / 2, step), 6)]
+    return [float(v) for v in text.split(",") if v.strip()]
+
+
+def _init_worker(runs):
+    global _runs
+    _runs = runs
+
+
+def sweep_peak_settings(job):
+    """Worker: evaluate every prominence / height-difference combination for one
+    (threshold, distance) pair on all runs.
+
+    `find_bounce_peaks` applies the height and distance filters before the
+    prominence filter, and a peak's prominence does not depend on the other
+    peaks, so peaks and prominences are computed once per run here and every
+    prominence value becomes a vectorized mask.
+    """
+    threshold, distance, prominences, height_differences = job
+    prominences = np.asarray(prominences)
+    rows = []
+    for run_index, (ball_type, heights) in enumerate(_runs):
+        if len(heights) < analysis_core.MIN_PEAK_SAMPLES:
+            peaks = np.empty(0, dtype=np.intp)
+        else:
+            peaks = analysis_core.find_bounce_peaks(heights, threshold, distance)
+        peak_prom = peak_prominences(heights, peaks)[0] if len(peaks) else np.empty(0)
+        # masks[i, j]: puncak j lolos prominence ke-i
+        masks = peak_prom[np.newaxis, :] >= prominences[:, np.newaxis]
+
+        for prominence, mask in zip(prominences, masks):
+            peak_heights = heights[peaks[mask]].tolist()
+            for height_difference in height_differences:
+                kept = analysis_core.filter_descending_peaks(peak_heights, height_difference)
+                bounce_heights = np.asarray([peak_heights[i] for i in kept])
+                if len(bounce_heights) >= 2:
+                    coefficients = np.sqrt(bounce_heights[1:] / bounce_heights[:-1])
+                    mean_e = float(coefficients.mean())
+                else:
+                    mean_e = np.nan
+                rows.append((threshold, distance, float(prominence), height_difference,
+                             ball_type, run_index, len(bounce_heights), mean_e))
+    return rows
+
+
+def run_sweep(runs, thresholds, distances, prominences, height_differences, workers=None):
+    """Evaluate the full parameter grid; returns one row per (combination, run)."""
+    jobs = [(threshold, int(distance), list(prominences), list(height_differences))
+            for threshold, distance in itertools.product(thresholds, distances)]
+    if workers == 1:
+        _init_worker(runs)
+        chunks = [sweep_peak_settings(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(runs,)) as pool:
+            chunks = list(pool.map(sweep_peak_settings, jobs))
+    columns = ["threshold", "min_distance", "prominence", "min_height_difference",
+               "Jenis Bola", "run", "bounces", "mean_e"]
+    return pd.DataFrame([row for chunk in chunks for row in chunk], columns=columns)
+
+
+def summarize_sweep(per_run):
+    """Aggregate per ball type: bounce counts and the mean/variance of e across runs."""
+    keys = ["threshold", "min_distance", "prominence", "min_height_difference", "Jenis Bola"]
+    grouped = per_run.groupby(keys, sort=True)
+    summary = grouped.agg(
+        runs=("run", "size"),
+        runs_ok=("mean_e", "count"),
+        bounces_mean=("bounces", "mean"),
+        bounces_min=("bounces", "min"),
+        bounces_max=("bounces", "max"),
+        e_mean=("mean_e", "mean"),
+        e_var=("mean_e", "var"),
+    )
+    return summary.reset_index()
+
+
+def best_settings(summary):
+    """Per ball type, the combination with the lowest variance of e among those
+    that produce a coefficient for every run."""
+    complete = summary[summary["runs_ok"] == summary["runs"]]
+    if complete.empty:
+        return complete
+    best = complete.loc[complete.groupby("Jenis Bola")["e_var"].idxmin()]
+    return best.set_index("Jenis Bola")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep parameter deteksi pantulan pada arsip percobaan")
+    parser.add_argument("--data-dir", default=default_data_dir(),
+                        help="folder arsip run (npz + manifest) atau Data_Bola_*.xlsx")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="file ringkasan (.csv atau .xlsx)")
+    parser.add_argument("--thresholds", default=DEFAULT_GRID["thresholds"],
+                        help="ambang tinggi pantulan (cm), mis. 10:20:1 atau 12,15")
+    parser.add_argument("--distances", default=DEFAULT_GRID["distances"],
+                        help="jarak minimum antar puncak (titik data)")
+    parser.add_argument("--prominences", default=DEFAULT_GRID["prominences"], help="prominence minimum (cm)")
+    parser.add_argument("--height-diffs", default=DEFAULT_GRID["height_differences"],
+                        help="selisih tinggi minimum antar puncak (cm)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="jumlah proses (bawaan: semua CPU)")
+    args = parser.parse_args()
+
+    thresholds = parse_grid(args.thresholds)
+    distances = [max(1, int(d)) for d in parse_grid(args.distances)]
+    prominences = parse_grid(args.prominences)
+    height_differences = parse_grid(args.height_diffs)
+
+    # Setiap run hanya dibaca sekali (npz atau Excel)
+    start = time.perf_counter()
+    runs = [(ball_type, load_run(path)[1]) for ball_type, _, path in list_runs(args.data_dir)]
+    if not runs:
+        print(f"Tidak ada file run di {args.data_dir}")
+        return
+    load_time = time.perf_counter() - start
+
+    combinations = len(thresholds) * len(distances) * len(prominences) * len(height_differences)
+    start = time.perf_counter()
+    per_run = run_sweep(runs, thresholds, distances, prominences, height_differences, args.workers)
+    summary = summarize_sweep(per_run)
+    sweep_time = time.perf_counter() - start
+
+    if args.output.lower().endswith(".xlsx"):
+        summary.to_excel(args.output, index=False, engine="openpyxl")
+    else:
+        summary.to_csv(args.output, index=False)
+
+    print(f"{len(runs)} run dimuat dalam {load_time:.2f} detik")
+    print(f"{combinations} kombinasi x {len(runs)} run dievaluasi dalam {sweep_time:.2f} detik -> {args.output}")
+    best = best_settings(summary)
+    if best.empty:
+        print("Tidak ada kombinasi yang menghasilkan koefisien untuk semua run")
+    else:
+        print("\nPengaturan dengan varians e terkecil per jenis bola:")
+        print(best[["threshold", "min_distance", "prominence", "min_height_difference",
+                    "bounces_mean", "e_mean", "e_var"]].to_string())
+
+
+if __name__ == "__main__":
+    main()
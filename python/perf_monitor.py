@@ -0,0 +1,209 @@
+"""Instrumentasi ringan per tahap pipeline (parse, store, filter, detect, draw, table, analysis).
+
+Setiap tahap dicatat dengan `time.perf_counter` (monoton) ke histogram
+bucket logaritmik plus jendela nilai terbaru untuk persentil. Selain itu
+dicatat laju pesan MQTT, keterlambatan (lag) ESP -> penerimaan, dan
+waktu frame `periodic_update`. Biayanya sekitar 1-2 mikrodetik per
+pengukuran (per batch, bukan per sampel), jadi selalu aktif.
+
+    from perf_monitor import monitor as perf
+    with perf.stage("parse"):
+        ...
+    perf.dump("performa.json")
+"""
+import bisect
+import json
+import os
+import platform
+import time
+from collections import deque
+
+import numpy as np
+
+# Batas atas bucket histogram (ms); bucket terakhir menampung sisanya
+BUCKET_EDGES_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+_BUCKET_EDGES_S = tuple(edge / 1000 for edge in BUCKET_EDGES_MS)
+RECENT_WINDOW = 256  # nilai terbaru per tahap untuk rata-rata & persentil
+RATE_WINDOW = 5.0    # detik, jendela laju pesan
+
+# Urutan tampilan di panel performa
+STAGES = ("parse", "store", "filter", "detect", "draw", "table", "analysis", "coefficient", "frame", "lag")
+
+
+class StageStats:
+    """Counters, a log-bucket histogram and a window of recent durations."""
+
+    __slots__ = ("count", "total", "max", "last", "buckets", "recent")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.buckets = [0] * (len(BUCKET_EDGES_MS) + 1)
+        self.recent = deque(maxlen=RECENT_WINDOW)
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.buckets[bisect.bisect_left(_BUCKET_EDGES_S, seconds)] += 1
+        self.recent.append(seconds)
+
+    def add_many(self, seconds):
+        """Record an array of values at once (e.g. the lag of every sample in a batch)."""
+        seconds = np.asarray(seconds, dtype=np.float64)
+        if len(seconds) == 0:
+            return
+        self.count += len(seconds)
+        self.total += float(seconds.sum())
+        self.last = float(seconds[-1])
+        self.max = max(self.max, float(seconds.max()))
+        counts = np.bincount(np.searchsorted(_BUCKET_EDGES_S, seconds),
+                             minlength=len(self.buckets))
+        self.buckets = [a + int(b) for a, b in zip(self.buckets, counts)]
+        self.recent.extend(seconds[-RECENT_WINDOW:].tolist())
+
+    def summary(self):
+        """Plain dict (milliseconds) for the overlay and the dump file."""
+        recent = np.fromiter(self.recent, dtype=np.float64) * 1000
+        return {
+            "count": self.count,
+            "mean_ms": self.total / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+            "recent_mean_ms": float(recent.mean()) if len(recent) else 0.0,
+            "recent_p95_ms": float(np.percentile(recent, 95)) if len(recent) else 0.0,
+            "histogram": {"edges_ms": list(BUCKET_EDGES_MS), "counts": list(self.buckets)},
+        }
+
+
+class _StageTimer:
+    __slots__ = ("stats", "start")
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.add(time.perf_counter() - self.start)
+        return False
+
+
+class PerfMonitor:
+    """Per-stage timings, rates, lag and gauges of the live pipeline (Tk thread)."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.started = time.time()
+        self.stages = {}
+        self.gauges = {}
+        self._rates = {}
+        self._lag_offsets = {}
+
+    def stats(self, name):
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = StageStats()
+        return stats
+
+    def stage(self, name):
+        """Context manager timing one execution of a pipeline stage."""
+        return _StageTimer(self.stats(name))
+
+    def record(self, name, seconds):
+        self.stats(name).add(seconds)
+
+    def gauge(self, name, value):
+        """Track the latest and the maximum of a level (e.g. queue backlog)."""
+        latest, peak = self.gauges.get(name, (0, 0))
+        self.gauges[name] = (value, max(peak, value))
+
+    def update_rate(self, name, total):
+        """Feed a monotonically increasing counter; returns its rate per second
+        over the last RATE_WINDOW seconds."""
+        now = time.monotonic()
+        history = self._rates.setdefault(name, deque())
+        history.append((now, total))
+        while len(history) > 2 and now - history[1][0] >= RATE_WINDOW:
+            history.popleft()
+        (t0, c0), (t1, c1) = history[0], history[-1]
+        return (c1 - c0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def rate(self, name):
+        history = self._rates.get(name)
+        if not history or len(history) < 2:
+            return 0.0
+        (t0, c0), (t1, c1) = history[0], history[-1]
+        return (c1 - c0) / (t1 - t0) if t1 > t0 else 0.0
+
+    def observe_lag(self, device, esp_times, received_at):
+        """Record ESP timestamp -> receipt lag for a batch of one device.
+
+        The ESP clock counts from START_READING and is not synchronized
+        with the PC, so the smallest `received - timestamp` seen so far is
+        taken as the clock offset; the lag is the delay beyond that (network,
+        broker, queue and batching).
+        """
+        esp_times = np.asarray(esp_times, dtype=np.float64)
+        received_at = np.asarray(received_at, dtype=np.float64)
+        has_time = esp_times > 0
+        if not has_time.any():
+            return
+        delta = received_at[has_time] - esp_times[has_time]
+        offset = min(self._lag_offsets.get(device, np.inf), float(delta.min()))
+        self._lag_offsets[device] = offset
+        self.stats("lag").add_many(delta - offset)
+
+    def reset_lag(self):
+        """Forget the clock offsets (the ESP clock restarts on START_READING)."""
+        self._lag_offsets.clear()
+
+    def snapshot(self):
+        return {
+            "stages": {name: stats.summary() for name, stats in self.stages.items()},
+            "rates": {name: self.rate(name) for name in self._rates},
+            "gauges": {name: {"latest": latest, "max": peak} for name, (latest, peak) in self.gauges.items()},
+        }
+
+    def format_overlay(self):
+        """Compact multi-line text for the performance panel."""
+        lines = [f"{'tahap':12s}{'n':>9s}{'terakhir':>11s}{'rata2':>11s}{'p95':>11s}{'maks':>11s}  (ms)"]
+        names = [name for name in STAGES if name in self.stages]
+        names += sorted(name for name in self.stages if name not in STAGES)
+        for name in names:
+            s = self.stages[name].summary()
+            lines.append(f"{name:12s}{s['count']:9d}{s['last_ms']:11.2f}{s['recent_mean_ms']:11.2f}"
+                         f"{s['recent_p95_ms']:11.2f}{s['max_ms']:11.1f}")
+        rates = "  ".join(f"{name}: {self.rate(name):.0f}/s" for name in self._rates)
+        gauges = "  ".join(f"{name}: {latest} (maks {peak})" for name, (latest, peak) in self.gauges.items())
+        if rates:
+            lines.append(rates)
+        if gauges:
+            lines.append(gauges)
+        return "\n".join(lines)
+
+    def dump(self, path, **extra):
+        """Write a snapshot (plus `extra` context) as JSON."""
+        report = {
+            "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "since": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(self.started)),
+            "python": platform.python_version(),
+            "pid": os.getpid(),
+            **extra,
+            **self.snapshot(),
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=1)
+        return path
+
+
+# Monitor bersama untuk seluruh aplikasi (diisi dari thread Tk)
+monitor = PerfMonitor()
@@ -0,0 +1,238 @@
+import numpy as np
+
+from decimation import MinMaxPyramid, apex_indices, visible_range
+
+
+class LivePlotRenderer:
+    """Real-time height plot that updates persistent artists with blitting.
+
+    Instead of `ax.clear()` and re-creating every artist per frame, the line,
+    the peak markers and a pool of annotations are created once and updated
+    with `set_data` / `set_position`. The static parts of the figure (axes,
+    grid, labels, title, legend) are rendered into a cached background; a
+    normal frame only restores that background and redraws the animated
+    artists. A full redraw happens only when the data leaves the current view,
+    the title/legend changes or the canvas is resized.
+
+    The line never gets the full series: a MinMaxPyramid reduces the visible
+    time window to about two points per pixel column (bounce apexes always
+    kept), and it is re-queried whenever the x limits change, so the cost of
+    a frame, a zoom or a pan depends on the canvas width, not the run length.
+    A zoom or pan by the user (toolbar) holds the view until `release_view`.
+    """
+
+    X_HEADROOM = 0.5  # ruang kosong di kanan saat live, relatif terhadap rentang waktu
+
+    def __init__(self, fig, ax, canvas):
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.line, = ax.plot([], [], 'b-', linewidth=2, animated=True)
+        self.peaks, = ax.plot([], [], "ro", markersize=8, animated=True)
+        # Batas sumbu diatur sendiri; autoscale bawaan akan terbaca sebagai zoom pengguna
+        ax.set_autoscale_on(False)
+        self.annotations = []  # pool anotasi yang dipakai ulang
+        self._active_annotations = 0
+        self._legend_key = None
+        self._background = None
+        self.full_draws = 0
+        self.pyramid = MinMaxPyramid()
+        self._series = None      # (times, heights, apex) yang sedang ditampilkan
+        self._pyramid_source = None
+        self.user_view = False   # True setelah zoom/pan oleh pengguna
+        self._own_limits = False
+        canvas.mpl_connect('draw_event', self._on_draw)
+        ax.callbacks.connect('xlim_changed', self._on_xlim_changed)
+
+    # ------------------------------------------------------------------
+    # Background / blitting
+    # ------------------------------------------------------------------
+    def _on_draw(self, event):
+        """Cache the static background after every full draw, then overlay the artists."""
+        self.full_draws += 1
+        self._background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated()
+
+    def _draw_animated(self):
+        self.ax.draw_artist(self.line)
+        self.ax.draw_artist(self.peaks)
+        for annotation in self.annotations[:self._active_annotations]:
+            self.ax.draw_artist(annotation)
+
+    def _full_draw(self):
+        self._background = None
+        self.canvas.draw_idle()
+
+    def _blit(self):
+        if self._background is None:
+            # Background belum ada (atau sedang menunggu draw_idle); tunggu full draw
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self._background)
+        self._draw_animated()
+        self.canvas.blit(self.fig.bbox)
+
+    # ------------------------------------------------------------------
+    # Decimation
+    # ------------------------------------------------------------------
+    def _set_series(self, times, heights, bounce_times, append_only, first_index=0):
+        """Keep the pyramid in sync with the series shown by the line."""
+        times = np.asarray(times, dtype=np.float64)
+        heights = np.asarray(heights, dtype=np.float64)
+        if append_only:
+            # Data live hanya bertambah (mode ring: sampel terlama ikut bergeser keluar)
+            if self._pyramid_source != "live":
+                self.pyramid.rebuild(heights, first_index)
+            else:
+                self.pyramid.extend(heights, first_index)
+            self._pyramid_source = "live"
+        elif self._pyramid_source is not heights:
+            # Seri baru (mis. hasil filtfilt per versi data, atau ganti perangkat)
+            self.pyramid.rebuild(heights)
+            self._pyramid_source = heights
+        self._series = (times, heights, apex_indices(times, bounce_times))
+
+    def _decimate(self):
+        """Set the line to the decimated visible window of the current series."""
+        if self._series is None:
+            return
+        times, heights, apex = self._series
+        start, stop = visible_range(times, *sorted(self.ax.get_xlim()))
+        n_bins = max(int(self.ax.get_window_extent().width), 1)
+        indices = self.pyramid.query(heights, start, stop, n_bins, keep=apex)
+        self.line.set_data(times[indices], heights[indices])
+
+    def _on_xlim_changed(self, ax):
+        if not self._own_limits:
+            # Zoom/pan dari toolbar: tahan tampilan pengguna
+            self.user_view = True
+        self._decimate()
+
+    def _set_limits(self, xlim, ylim):
+        self._own_limits = True
+        try:
+            self.ax.set_xlim(*xlim)
+            self.ax.set_ylim(*ylim)
+        finally:
+            self._own_limits = False
+
+    def release_view(self):
+        """Return from a user zoom/pan to following the data."""
+        self.user_view = False
+        if self._series is not None and len(self._series[0]) > 1:
+            times, heights, _ = self._series
+            self._update_limits(times, heights, follow=False)
+        self._full_draw()
+
+    # ------------------------------------------------------------------
+    # Update
+    # ------------------------------------------------------------------
+    def clear(self, title):
+        """Show an empty plot with the given title."""
+        self._series = None
+        self._pyramid_source = None
+        self.line.set_data([], [])
+        self.peaks.set_data([], [])
+        self._set_annotations([], [])
+        self._set_legend(None, False)
+        self.ax.set_title(title)
+        self.reset_view()
+
+    def reset_view(self):
+        """Force the next frame to fit the axes to its data (e.g. after switching device)."""
+        # Seri perangkat lain tidak boleh dianggap lanjutan seri sebelumnya
+        self._pyramid_source = None
+        self.user_view = False
+        self._set_limits((0, 1), (0, 1))
+        self._full_draw()
+
+    def update(self, times, heights, bounce_times, bounce_heights, title, line_label, follow=True,
+               first_index=0):
+        """Draw one frame.
+
+        `follow=True` (while collecting) leaves headroom to the right so the
+        axes only need relimiting occasionally and treats the series as
+        append-only; `follow=False` fits the view exactly to the data.
+        `first_index` is the absolute index of the first sample
+        (SampleStore.first_index), which moves once a ring-mode store is full.
+        """
+        needs_full_draw = False
+
+        self._set_series(times, heights, bounce_times, append_only=follow, first_index=first_index)
+        self.peaks.set_data(bounce_times, bounce_heights)
+        self._set_annotations(bounce_times, bounce_heights)
+
+        if self.ax.get_title() != title:
+            self.ax.set_title(title)
+            needs_full_draw = True
+        if self._set_legend(line_label, len(bounce_times) > 0):
+            needs_full_draw = True
+        if len(times) > 1 and not self.user_view and self._update_limits(times, heights, follow):
+            needs_full_draw = True
+        # Desimasi setelah batas sumbu final, sesuai jendela yang terlihat
+        self._decimate()
+
+        if needs_full_draw:
+            self._full_draw()
+        else:
+            self._blit()
+
+    def _set_annotations(self, bounce_times, bounce_heights):
+        for i, (bt, bd) in enumerate(zip(bounce_times, bounce_heights)):
+            if i == len(self.annotations):
+                self.annotations.append(self.ax.annotate(
+                    '', (0, 0), textcoords="offset points", xytext=(0, 10), ha='center',
+                    fontsize=8, color='red', weight='bold', animated=True))
+            annotation = self.annotations[i]
+            annotation.xy = (bt, bd)
+            annotation.set_text(f'{bd:.1f}')
+            annotation.set_visible(True)
+        count = len(bounce_times)
+        for annotation in self.annotations[count:self._active_annotations]:
+            annotation.set_visible(False)
+        self._active_annotations = count
+
+    def _set_legend(self, line_label, has_peaks):
+        """Rebuild the legend only when its content changes. Returns True if it did."""
+        key = (line_label, has_peaks)
+        if key == self._legend_key:
+            return False
+        self._legend_key = key
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if line_label is None:
+            self.line.set_label(None)
+            return True
+        self.line.set_label(line_label)
+        handles = [self.line]
+        if has_peaks:
+            self.peaks.set_label("Puncak Pantulan")
+            handles.append(self.peaks)
+        self.ax.legend(handles=handles, loc='upper right')
+        return True
+
+    def _update_limits(self, times, heights, follow):
+        """Relimit the axes if the data left the view. Returns True if the limits changed."""
+        t_min, t_max = float(np.min(times)), float(np.max(times))
+        h_min, h_max = float(np.min(heights)), float(np.max(heights))
+        x_lo, x_hi = self.ax.get_xlim()
+        y_lo, y_hi = self.ax.get_ylim()
+
+        time_range = max(t_max - t_min, 1)
+        x_margin = time_range * 0.05
+        dist_range = max(h_max - h_min, 5)
+        y_margin = dist_range * 0.1
+        new_x = (t_min - x_margin, t_max + x_margin)
+        new_y = (max(0, h_min - y_margin), h_max + y_margin)
+
+        if follow:
+            inside = x_lo <= t_min and t_max <= x_hi and y_lo <= h_min and h_max <= y_hi
+            if inside:
+                return False
+            new_x = (new_x[0], new_x[1] + time_range * self.X_HEADROOM)
+        elif np.allclose((x_lo, x_hi, y_lo, y_hi), new_x + new_y):
+            return False
+
+        self._set_limits(new_x, new_y)
+        return True
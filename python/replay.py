@@ -0,0 +1,205 @@
+"""Putar ulang run yang terekam melalui jalur ingest yang sama dengan MQTT.
+
+Sumber: Data_Bola_*.xlsx / .npz dari arsip percobaan atau jurnal (.krj /
+.krj.part). Setiap sampel dikirim sebagai payload JSON seperti dari ESP
+(`timestamp`, `distance`, `device`), atau sebagai frame biner "KR", dengan
+jadwal sesuai waktu aslinya dibagi faktor kecepatan, atau secepat mungkin.
+
+Di GUI, tombol "Putar Ulang Run" menyalurkan payload langsung ke
+`main.on_message`. Dari baris perintah payload dipublikasikan ke broker
+sehingga GUI yang sedang berjalan menerimanya seolah alat terhubung.
+
+Contoh:
+    python replay.py ../data/data-percobaan/Data_Bola_Bekel_1.xlsx --broker localhost
+    python replay.py ../data/journal/run_20250101_120000_ESP32_HCSR04.krj --speed 10
+    python replay.py ../data/data-percobaan/Data_Bola_Bekel_1.xlsx --speed 0 --repeat 100
+"""
+import argparse
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+import run_journal
+from ingest import encode_binary_frame
+from run_archive import load_run
+
+DATA_TOPIC = "sensor/distance"
+DEFAULT_SENSOR_HEIGHT = 35.0
+FAST_CHUNK = 200  # sampel per giliran pada mode secepat mungkin
+
+
+def load_replay_source(path):
+    """Read (times, heights, sensor height, label) from a run or journal file."""
+    if path.endswith(run_journal.JOURNAL_SUFFIX) or path.endswith(run_journal.PART_SUFFIX):
+        metadata, times, heights = run_journal.read_journal(path)
+        sensor_height = metadata.get("sensor_height")
+    else:
+        times, heights, sensor_height = load_run(path)
+    label = os.path.basename(path).split(".")[0]
+    return times, heights, sensor_height, label
+
+
+def replay_schedule(times):
+    """Offsets (s) at which each sample is sent, relative to the first one.
+
+    Recorded timestamps may jump back (e.g. the first row of some archive
+    runs); the schedule never goes backwards.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    finite = np.isfinite(times)
+    if not finite.any():
+        return np.zeros(len(times))
+    offsets = np.where(finite, times - times[finite][0], 0.0)
+    return np.maximum.accumulate(np.maximum(offsets, 0.0))
+
+
+class RunReplayer:
+    """Send a recorded run to `transport.publish(topic, payload)` from a thread.
+
+    `speed` is the time scale (1 = real time, 10 = ten times faster);
+    `speed=0` sends as fast as possible. Distances are computed against
+    `sensor_height`, so a receiver using the same sensor height recovers the
+    recorded heights. With `binary_batch` > 1 samples are packed into binary
+    frames like FORMAT:BINARY:N.
+    """
+
+    def __init__(self, transport, times, heights, device="REPLAY", sensor_height=None,
+                 speed=1.0, binary_batch=0, repeat=1, topic=DATA_TOPIC):
+        self.transport = transport
+        self.times = np.asarray(times, dtype=np.float64)
+        self.heights = np.asarray(heights, dtype=np.float64)
+        self.device = device
+        self.sensor_height = DEFAULT_SENSOR_HEIGHT if sensor_height is None else float(sensor_height)
+        self.speed = speed
+        self.binary_batch = binary_batch
+        self.repeat = max(1, int(repeat))
+        self.topic = topic
+
+        self.sent = 0
+        self.started_at = None
+        self.finished_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_file(cls, transport, path, sensor_height=None, **options):
+        times, heights, file_sensor_height, label = load_replay_source(path)
+        options.setdefault("device", f"Replay_{label}")
+        return cls(transport, times, heights,
+                   sensor_height=file_sensor_height if sensor_height is None else sensor_height,
+                   **options)
+
+    @property
+    def total(self):
+        return len(self.times) * self.repeat
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def elapsed(self):
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="replay", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def join(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _publish(self, times, distances):
+        if self.binary_batch and self.binary_batch > 1:
+            for i in range(0, len(times), self.binary_batch):
+                self.transport.publish(self.topic, encode_binary_frame(
+                    times[i:i + self.binary_batch], distances[i:i + self.binary_batch], self.device))
+        else:
+            for t, d in zip(times.tolist(), distances.tolist()):
+                self.transport.publish(self.topic, json.dumps(
+                    {"timestamp": t, "distance": d, "device": self.device}))
+        self.sent += len(times)
+
+    def run(self):
+        """Replay on the calling thread (`start` runs this on a worker thread)."""
+        self.started_at = time.perf_counter()
+        self.finished_at = None
+        distances = self.sensor_height - self.heights
+        offsets = replay_schedule(self.times)
+        duration = offsets[-1] if len(offsets) else 0.0
+        # Interval rata-rata dipakai sebagai jeda antar pengulangan
+        gap = duration / max(len(offsets) - 1, 1)
+
+        for loop in range(self.repeat):
+            # Pengulangan melanjutkan timestamp agar grafik tetap maju
+            shift = loop * (duration + gap)
+            times = self.times + shift
+            loop_start = time.perf_counter()
+            i = 0
+            while i < len(times) and not self._stop.is_set():
+                if self.speed:
+                    # Kirim semua sampel yang sudah jatuh tempo, lalu tidur sampai sampel berikutnya
+                    now = (time.perf_counter() - loop_start) * self.speed
+                    j = int(np.searchsorted(offsets, now, side="right"))
+                    if j <= i:
+                        time.sleep(min((offsets[i] - now) / self.speed, 0.1))
+                        continue
+                else:
+                    j = min(i + FAST_CHUNK, len(times))
+                self._publish(times[i:j], distances[i:j])
+                i = j
+                if not self.speed:
+                    time.sleep(0)  # beri giliran ke thread lain (GUI)
+            if self._stop.is_set():
+                break
+        self.finished_at = time.perf_counter()
+        return self.sent
+
+    def summary(self):
+        rate = self.sent / self.elapsed if self.elapsed > 0 else 0.0
+        return f"{self.sent} sampel dikirim dalam {self.elapsed:.2f} s ({rate:,.0f} sampel/s)"
+
+
+def main():
+    from esp_simulator import PahoTransport
+
+    parser = argparse.ArgumentParser(description="Putar ulang run terekam ke broker MQTT")
+    parser.add_argument("path", help="Data_Bola_*.xlsx / .npz atau jurnal .krj")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="faktor kecepatan (1 = waktu asli, 0 = secepat mungkin)")
+    parser.add_argument("--repeat", type=int, default=1, help="jumlah pengulangan run")
+    parser.add_argument("--binary", type=int, default=0, metavar="N", help="kirim frame biner N sampel")
+    parser.add_argument("--device", default=None, help="ID perangkat (bawaan: Replay_<nama file>)")
+    parser.add_argument("--sensor-height", type=float, default=None,
+                        help="tinggi sensor di GUI penerima (bawaan: dari file run)")
+    parser.add_argument("--broker", default="broker.hivemq.com", help="alamat broker MQTT")
+    parser.add_argument("--port", type=int, default=1883, help="port broker MQTT")
+    args = parser.parse_args()
+
+    transport = PahoTransport(args.broker, args.port, client_id=f"replay-{int(time.time())}")
+    options = {"speed": args.speed, "binary_batch": args.binary, "repeat": args.repeat}
+    if args.device:
+        options["device"] = args.device
+    replayer = RunReplayer.from_file(transport, args.path, args.sensor_height, **options)
+    print(f"Memutar ulang {args.path} ({replayer.total} sampel) sebagai {replayer.device} "
+          f"ke {args.broker}:{args.port}")
+    try:
+        replayer.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        transport.close()
+        print(replayer.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Resampling ke grid waktu seragam berdasarkan timestamp asli.
+
+Timestamp berasal dari ESP (`timestamp`) atau dari waktu terima lokal,
+sehingga jaraknya tidak rata (jitter jaringan, batch) dan berubah jika
+INTERVAL: dikirim. Filter Butterworth dan `distance` pada `find_peaks`
+mengandaikan laju tetap; modul ini memperkirakan laju sebenarnya,
+menginterpolasi data ke grid seragam dan menandai celah (gap) serta
+sampel yang hilang (dropout), sehingga cutoff filter dapat diberikan
+dalam Hz dan jarak antar pantulan dalam detik.
+"""
+import numpy as np
+
+GAP_FACTOR = 2.5      # selisih waktu > GAP_FACTOR x interval dianggap celah
+DROPOUT_FACTOR = 1.5  # selisih waktu > DROPOUT_FACTOR x interval berarti ada sampel hilang
+MIN_RATE_SAMPLES = 3  # sampel minimum untuk memperkirakan laju
+
+
+def estimate_rate(times):
+    """Sample rate (Hz) from the median positive timestamp step, or None.
+
+    The median ignores jitter, dropouts and gaps; repeated timestamps
+    (several samples stamped at the same receive time) are skipped.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    times = times[np.isfinite(times)]
+    if len(times) < MIN_RATE_SAMPLES:
+        return None
+    steps = np.diff(np.sort(times))
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return None
+    return float(1.0 / np.median(steps))
+
+
+def seconds_to_samples(seconds, fs):
+    """Spacing in samples (at least 1) for a duration in seconds at rate `fs`."""
+    return max(1, int(round(seconds * fs)))
+
+
+class UniformSeries:
+    """A series interpolated onto a uniform grid.
+
+    `valid` is False for grid points that fall inside a gap (no real sample
+    within GAP_FACTOR intervals); there the values are a straight line
+    between the samples on both sides and must not be trusted as peaks.
+    `gaps` holds (start, end) times of the gaps and `dropouts` the number of
+    samples estimated missing outside them.
+    """
+
+    def __init__(self, times, values, fs, valid, gaps, dropouts, source_count):
+        self.times = times
+        self.values = values
+        self.fs = fs
+        self.valid = valid
+        self.gaps = gaps
+        self.dropouts = dropouts
+        self.source_count = source_count
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def interval(self):
+        return 1.0 / self.fs
+
+    def summary(self):
+        """Plain dict for analysis records."""
+        return {
+            "fs": self.fs,
+            "samples": self.source_count,
+            "grid_points": len(self.times),
+            "gaps": [list(gap) for gap in self.gaps],
+            "dropouts": self.dropouts,
+        }
+
+
+def monotonic_samples(times, values):
+    """Sort by time and average samples that share a timestamp."""
+    finite = np.isfinite(times) & np.isfinite(values)
+    times, values = times[finite], values[finite]
+    if len(times) and not (np.diff(times) > 0).all():
+        order = np.argsort(times, kind="stable")
+        times, values = times[order], values[order]
+        times, first, counts = np.unique(times, return_index=True, return_counts=True)
+        values = np.add.reduceat(values, first) / counts
+    return times, values
+
+
+def find_gaps(times, interval, gap_factor=GAP_FACTOR):
+    """(start, end) times of the steps longer than `gap_factor` intervals in sorted `times`."""
+    steps = np.diff(times)
+    starts = np.flatnonzero(steps > gap_factor * interval)
+    return [(float(times[i]), float(times[i + 1])) for i in starts]
+
+
+def resample_uniform(times, values, fs=None, gap_factor=GAP_FACTOR):
+    """Interpolate (times, values) onto a uniform grid at `fs` (estimated if None).
+
+    Returns a UniformSeries, or None if there are too few usable samples.
+    The grid starts at the first sample, so for clean data at the native
+    rate the grid points coincide with the samples.
+    """
+    times, values = monotonic_samples(np.asarray(times, dtype=np.float64),
+                                      np.asarray(values, dtype=np.float64))
+    if fs is None:
+        fs = estimate_rate(times)
+    if fs is None or len(times) < MIN_RATE_SAMPLES:
+        return None
+
+    interval = 1.0 / fs
+    count = int(np.floor((times[-1] - times[0]) * fs + 1e-9)) + 1
+    grid = times[0] + np.arange(count) * interval
+    resampled = np.interp(grid, times, values)
+
+    gaps = find_gaps(times, interval, gap_factor)
+    valid = np.ones(count, dtype=bool)
+    for start, end in gaps:
+        valid[np.searchsorted(grid, start, side="right"):np.searchsorted(grid, end, side="left")] = False
+
+    # Sampel hilang di luar celah: langkah yang memuat lebih dari satu interval
+    steps = np.diff(times)
+    short = (steps > DROPOUT_FACTOR * interval) & (steps <= gap_factor * interval)
+    dropouts = int(np.round(steps[short] * fs).sum() - np.count_nonzero(short))
+    return UniformSeries(grid, resampled, fs, valid, gaps, dropouts, len(times))
@@ -0,0 +1,216 @@
+"""Arsip run dalam format kolumnar (.npz) dengan indeks manifest.
+
+Setiap run disimpan sebagai satu file .npz tak terkompresi berisi kolom
+`times` dan `heights` (float32) plus metadata (jenis bola, tinggi sensor).
+`manifest.json` mencatat jenis bola, nomor percobaan, jumlah sampel dan hash
+isi setiap run; entri hanya dihitung ulang bila mtime/ukuran file berubah.
+
+Contoh:
+    python run_archive.py convert      # xlsx di data/data-percobaan -> data/arsip-run
+    python run_archive.py index        # tampilkan/perbarui manifest
+"""
+import argparse
+import hashlib
+import json
+import os
+import re
+import time
+
+import numpy as np
+
+DATA_ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+XLSX_DIR = os.path.join(DATA_ROOT, "data-percobaan")
+ARCHIVE_DIR = os.path.join(DATA_ROOT, "arsip-run")
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+RUN_DTYPE = np.float32
+
+# Data_Bola_Tenis_Meja_7.xlsx / .npz -> ("Bola Tenis Meja", 7)
+RUN_FILE_PATTERN = re.compile(r"^Data_(Bola_.+)_(\d+)\.(xlsx|npz)$")
+
+
+def parse_run_filename(filename):
+    """Return (ball type, trial number) from a run file name, or None."""
+    match = RUN_FILE_PATTERN.match(os.path.basename(filename))
+    if not match:
+        return None
+    return match.group(1).replace("_", " "), int(match.group(2))
+
+
+def run_filename(ball_type, trial, extension=".npz"):
+    """Inverse of parse_run_filename: ("Bola Tenis Meja", 7) -> Data_Bola_Tenis_Meja_7.npz."""
+    return f"Data_{ball_type.replace(' ', '_').replace('/', '_')}_{int(trial)}{extension}"
+
+
+def default_data_dir():
+    """The npz archive if it has been built, otherwise the xlsx archive."""
+    if os.path.isfile(os.path.join(ARCHIVE_DIR, MANIFEST_NAME)):
+        return ARCHIVE_DIR
+    return XLSX_DIR
+
+
+# ----------------------------------------------------------------------
+# Baca / tulis satu run
+# ----------------------------------------------------------------------
+def content_hash(times, heights):
+    """SHA-256 of the float32 column data (independent of file timestamps)."""
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(times, dtype=RUN_DTYPE).tobytes())
+    digest.update(np.ascontiguousarray(heights, dtype=RUN_DTYPE).tobytes())
+    return digest.hexdigest()
+
+
+def write_run(path, times, heights, sensor_height=None, ball_type=None):
+    """Write one run as an uncompressed .npz with float32 columns."""
+    np.savez(path,
+             times=np.asarray(times, dtype=RUN_DTYPE),
+             heights=np.asarray(heights, dtype=RUN_DTYPE),
+             sensor_height=np.float64(np.nan if sensor_height is None else sensor_height),
+             ball_type=np.str_(ball_type or ""))
+
+
+def load_run_xlsx(path):
+    """Read (times, heights, sensor height) from a run saved by the GUI."""
+    import pandas as pd
+
+    df = pd.read_excel(path, engine="openpyxl")
+    times = df.iloc[:, 0].to_numpy(dtype=np.float64)
+    heights = df.iloc[:, 1].to_numpy(dtype=np.float64)
+    sensor_height = float(df["Tinggi Sensor (cm)"].iloc[0]) if "Tinggi Sensor (cm)" in df else None
+    return times, heights, sensor_height
+
+
+def load_run(path):
+    """Read (times, heights, sensor height) from a .npz or .xlsx run.
+
+    Columns are returned as float64 so the analysis code sees the same types
+    whichever format the run came from.
+    """
+    if not path.endswith(".npz"):
+        return load_run_xlsx(path)
+    with np.load(path) as data:
+        times = data["times"].astype(np.float64)
+        heights = data["heights"].astype(np.float64)
+        sensor_height = float(data["sensor_height"])
+    return times, heights, None if np.isnan(sensor_height) else sensor_height
+
+
+# ----------------------------------------------------------------------
+# Manifest
+# ----------------------------------------------------------------------
+def _manifest_entry(path, stat):
+    times, heights, sensor_height = load_run(path)
+    ball_type, trial = parse_run_filename(path)
+    return {
+        "ball_type": ball_type,
+        "trial": trial,
+        "samples": int(len(times)),
+        "sensor_height": sensor_height,
+        "sha256": content_hash(times, heights),
+        "mtime": stat.st_mtime,
+        "size": stat.st_size,
+    }
+
+
+def update_index(archive_dir=ARCHIVE_DIR):
+    """Bring `manifest.json` up to date and return its run entries.
+
+    Only files whose mtime or size differ from the manifest are re-read;
+    entries of deleted files are dropped. The manifest is rewritten only if
+    something changed.
+    """
+    manifest_path = os.path.join(archive_dir, MANIFEST_NAME)
+    runs = {}
+    if os.path.isfile(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("version") == MANIFEST_VERSION:
+            runs = manifest["runs"]
+
+    changed = False
+    current = {}
+    for entry in os.scandir(archive_dir):
+        if not entry.name.endswith(".npz") or not parse_run_filename(entry.name):
+            continue
+        stat = entry.stat()
+        cached = runs.get(entry.name)
+        if cached and cached["mtime"] == stat.st_mtime and cached["size"] == stat.st_size:
+            current[entry.name] = cached
+        else:
+            current[entry.name] = _manifest_entry(entry.path, stat)
+            changed = True
+    if changed or current.keys() != runs.keys():
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "runs": current}, f, indent=1, sort_keys=True)
+    return current
+
+
+def list_runs(data_dir):
+    """(ball type, trial, path) of every run in `data_dir`, sorted.
+
+    For an npz archive the manifest is used (and refreshed), so no run file
+    has to be opened; otherwise the run files are listed by name.
+    """
+    if os.path.isfile(os.path.join(data_dir, MANIFEST_NAME)):
+        index = update_index(data_dir)
+        runs = [(entry["ball_type"], entry["trial"], os.path.join(data_dir, name))
+                for name, entry in index.items()]
+    else:
+        # Tanpa manifest: .npz (mis. yang ditulis save_excel) didahulukan dari .xlsx bernama sama
+        found = {}
+        for filename in sorted(os.listdir(data_dir), key=lambda f: f.endswith(".npz")):
+            parsed = parse_run_filename(filename)
+            if parsed:
+                found[parsed] = os.path.join(data_dir, filename)
+        runs = [(ball_type, trial, path) for (ball_type, trial), path in found.items()]
+    return sorted(runs)
+
+
+# ----------------------------------------------------------------------
+# Konversi dari arsip xlsx
+# ----------------------------------------------------------------------
+def convert_archive(source_dir=XLSX_DIR, archive_dir=ARCHIVE_DIR, force=False):
+    """Convert every run in `source_dir` to .npz (only new or changed files) and
+    update the manifest. Returns the number of converted files."""
+    os.makedirs(archive_dir, exist_ok=True)
+    converted = 0
+    for ball_type, _, source in list_runs(source_dir):
+        target = os.path.join(archive_dir, os.path.splitext(os.path.basename(source))[0] + ".npz")
+        if not force and os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(source):
+            continue
+        try:
+            times, heights, sensor_height = load_run(source)
+        except Exception as e:
+            print(f"Gagal membaca {source}: {e}")
+            continue
+        write_run(target, times, heights, sensor_height, ball_type)
+        converted += 1
+    update_index(archive_dir)
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arsip run kolumnar (.npz) dan manifest")
+    sub = parser.add_subparsers(dest="command", required=True)
+    convert = sub.add_parser("convert", help="konversi arsip xlsx ke npz")
+    convert.add_argument("--source", default=XLSX_DIR, help="folder Data_Bola_*.xlsx")
+    convert.add_argument("--archive", default=ARCHIVE_DIR, help="folder arsip npz")
+    convert.add_argument("--force", action="store_true", help="konversi ulang semua file")
+    index = sub.add_parser("index", help="perbarui dan tampilkan manifest")
+    index.add_argument("--archive", default=ARCHIVE_DIR, help="folder arsip npz")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "convert":
+        converted = convert_archive(args.source, args.archive, args.force)
+        print(f"{converted} file dikonversi ke {args.archive} dalam {time.perf_counter() - start:.2f} detik")
+    else:
+        runs = update_index(args.archive)
+        for name, entry in sorted(runs.items()):
+            print(f"{name:36s} {entry['ball_type']:18s} #{entry['trial']:<3d} "
+                  f"{entry['samples']:6d} sampel  {entry['sha256'][:12]}")
+        print(f"{len(runs)} run, indeks diperbarui dalam {time.perf_counter() - start:.3f} detik")
+
+
+if __name__ == "__main__":
+    main()
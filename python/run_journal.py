@@ -0,0 +1,263 @@
+"""Jurnal biner append-only untuk sampel selama pengumpulan data.
+
+Format file:
+    header  : magic "KRJL", versi (uint8), panjang metadata (uint32)
+    metadata: JSON UTF-8 (perangkat, jenis bola, tinggi sensor, waktu mulai)
+    sampel  : N x (waktu float64 [s], tinggi float64 [cm]), little-endian
+
+Selama pengumpulan file bernama `*.krj.part`; thread penulis menulis sampel
+per batch dan melakukan fsync berkala. Saat pengumpulan berhenti file
+di-rename menjadi `*.krj`. File `.part` yang tersisa saat aplikasi dibuka
+berarti aplikasi berhenti mendadak dan run-nya dapat dipulihkan.
+"""
+import json
+import os
+import queue
+import struct
+import threading
+import time
+
+import numpy as np
+
+from app_logging import get_logger
+from run_archive import DATA_ROOT, write_run
+
+JOURNAL_DIR = os.path.join(DATA_ROOT, "journal")
+JOURNAL_MAGIC = b"KRJL"
+JOURNAL_VERSION = 1
+JOURNAL_HEADER = struct.Struct("<4sBI")
+JOURNAL_SUFFIX = ".krj"
+PART_SUFFIX = ".part"
+RECORD_DTYPE = np.dtype([("time", "<f8"), ("height", "<f8")])
+XLSX_CHUNK = 5000  # baris Excel per langkah penulisan (laporan kemajuan)
+
+_CLOSE = object()
+
+log = get_logger("journal")
+
+
+class JournalWriter:
+    """Append samples to a journal file from a background writer thread.
+
+    `append` only copies the chunk into a queue, so it is cheap on the Tk
+    thread. The writer thread drains everything queued, writes it in one
+    call and fsyncs at most every `FLUSH_INTERVAL` seconds.
+    """
+
+    FLUSH_INTERVAL = 0.5  # detik
+
+    def __init__(self, path, metadata):
+        self.final_path = path
+        self.path = path + PART_SUFFIX
+        self.metadata = metadata
+        self.written = 0
+        self.appended = 0  # sampel yang sudah diserahkan ke append (Tk thread)
+        self.error = None
+        self._queue = queue.SimpleQueue()
+
+        meta = json.dumps(metadata, ensure_ascii=False).encode("utf-8")
+        self._file = open(self.path, "wb")
+        self._file.write(JOURNAL_HEADER.pack(JOURNAL_MAGIC, JOURNAL_VERSION, len(meta)) + meta)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+        self._thread = threading.Thread(target=self._run, name="journal-writer", daemon=True)
+        self._thread.start()
+
+    def append(self, times, heights):
+        """Queue a chunk of samples (called from the Tk thread)."""
+        chunk = np.empty(len(times), dtype=RECORD_DTYPE)
+        chunk["time"] = times
+        chunk["height"] = heights
+        self.appended += len(chunk)
+        self._queue.put(chunk)
+
+    def sync(self, timeout=5.0):
+        """Block until everything appended so far is on disk."""
+        if not self._thread.is_alive():
+            return True  # penulis sudah berhenti (close): semua sampel sudah di disk
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout) or not self._thread.is_alive()
+
+    def read_back(self, count, timeout=5.0):
+        """(times, heights) of the first `count` samples appended, read from disk.
+
+        Waits for the writer thread, so call it from a background thread
+        (e.g. the export worker), never from the Tk thread. Works before and
+        after `close`.
+        """
+        if not self.sync(timeout):
+            raise TimeoutError(f"Jurnal {self.path} belum selesai ditulis")
+        if self.error is not None:
+            raise self.error
+        # Jurnal bisa sudah di-rename oleh close() sejak snapshot diambil
+        path = self.path if os.path.exists(self.path) else self.final_path
+        _, times, heights = read_journal(path)
+        return times[:count], heights[:count]
+
+    def close(self):
+        """Flush, stop the writer and finalize the file.
+
+        Returns the final path, or None if no samples were written (the empty
+        journal is then deleted).
+        """
+        self._queue.put(_CLOSE)
+        self._thread.join()
+        self._file.close()
+        # sync() yang masuk antrean setelah _CLOSE: semua sudah di disk
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, threading.Event):
+                item.set()
+        if self.written == 0:
+            os.remove(self.path)
+            return None
+        os.replace(self.path, self.final_path)
+        return self.final_path
+
+    def _run(self):
+        last_sync = time.monotonic()
+        closing = False
+        while not closing:
+            try:
+                items = [self._queue.get(timeout=self.FLUSH_INTERVAL)]
+            except queue.Empty:
+                items = []
+            # Ambil semua yang sudah mengantre agar ditulis dalam satu panggilan
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            chunks = [item for item in items if isinstance(item, np.ndarray)]
+            waiters = [item for item in items if isinstance(item, threading.Event)]
+            closing = any(item is _CLOSE for item in items)
+
+            try:
+                if chunks:
+                    data = np.concatenate(chunks) if len(chunks) > 1 else chunks[0]
+                    self._file.write(data.tobytes())
+                    self.written += len(data)
+                now = time.monotonic()
+                if waiters or closing or (chunks and now - last_sync >= self.FLUSH_INTERVAL):
+                    self._file.flush()
+                    os.fsync(self._file.fileno())
+                    last_sync = now
+            except OSError as e:
+                self.error = e
+                log.error("Gagal menulis jurnal %s: %s", self.path, e)
+            for waiter in waiters:
+                waiter.set()
+
+
+def new_journal_path(device, journal_dir=None):
+    """Unique journal path for a new recording of `device`."""
+    journal_dir = journal_dir or JOURNAL_DIR
+    os.makedirs(journal_dir, exist_ok=True)
+    safe_device = "".join(c if c.isalnum() or c in "-_" else "_" for c in device)
+    stamp = time.strftime("%Y%m%d_%H%M%S")
+    path = os.path.join(journal_dir, f"run_{stamp}_{safe_device}{JOURNAL_SUFFIX}")
+    counter = 1
+    while os.path.exists(path) or os.path.exists(path + PART_SUFFIX):
+        counter += 1
+        path = os.path.join(journal_dir, f"run_{stamp}_{safe_device}_{counter}{JOURNAL_SUFFIX}")
+    return path
+
+
+def _parse_journal(raw, path):
+    if len(raw) < JOURNAL_HEADER.size:
+        raise ValueError(f"Jurnal terlalu pendek: {path}")
+    magic, version, meta_len = JOURNAL_HEADER.unpack_from(raw)
+    if magic != JOURNAL_MAGIC or version != JOURNAL_VERSION:
+        raise ValueError(f"Bukan file jurnal yang didukung: {path}")
+    offset = JOURNAL_HEADER.size + meta_len
+    metadata = json.loads(raw[JOURNAL_HEADER.size:offset].decode("utf-8"))
+    count = (len(raw) - offset) // RECORD_DTYPE.itemsize
+    return metadata, offset, np.frombuffer(raw, dtype=RECORD_DTYPE, count=count, offset=offset)
+
+
+def read_journal(path):
+    """Read (metadata, times, heights) from a finalized or unfinished journal.
+
+    A partially written trailing record (crash mid-write) is ignored.
+    """
+    with open(path, "rb") as f:
+        metadata, _, records = _parse_journal(f.read(), path)
+    return metadata, records["time"].copy(), records["height"].copy()
+
+
+def find_unfinished(journal_dir=None):
+    """Journals left behind by a crashed session (still named `*.part`)."""
+    journal_dir = journal_dir or JOURNAL_DIR
+    if not os.path.isdir(journal_dir):
+        return []
+    return sorted(os.path.join(journal_dir, name) for name in os.listdir(journal_dir)
+                  if name.endswith(JOURNAL_SUFFIX + PART_SUFFIX))
+
+
+def recover(path):
+    """Finalize an unfinished journal: drop a partial trailing record and
+    rename it to `*.krj`. Returns (final path, metadata, times, heights);
+    a journal without samples is deleted and its final path is None."""
+    with open(path, "r+b") as f:
+        metadata, offset, records = _parse_journal(f.read(), path)
+        f.truncate(offset + records.nbytes)
+    if len(records) == 0:
+        os.remove(path)
+        return None, metadata, records["time"].copy(), records["height"].copy()
+    final_path = path[:-len(PART_SUFFIX)]
+    os.replace(path, final_path)
+    return final_path, metadata, records["time"].copy(), records["height"].copy()
+
+
+def export_xlsx(xlsx_path, ball_type, sensor_height, journal_path=None, times=None, heights=None,
+                progress=None):
+    """Write a run to Excel in the layout of the data archive (meant for a
+    background thread).
+
+    The samples come from `journal_path` if given, otherwise from `times` /
+    `heights`. Rows are streamed with openpyxl's write-only mode in chunks
+    of XLSX_CHUNK, so memory stays constant however long the run is;
+    `progress(fraction)` is called after every chunk. A float32 .npz copy
+    is written next to the .xlsx. Returns the number of rows written.
+    """
+    from openpyxl import Workbook
+
+    if journal_path is not None:
+        _, times, heights = read_journal(journal_path)
+    times = np.asarray(times, dtype=np.float64)
+    heights = np.asarray(heights, dtype=np.float64)
+
+    # PERBAIKAN: Validasi dan bersihkan data (sekaligus untuk seluruh array)
+    valid = np.isfinite(times) & np.isfinite(heights)
+    invalid_count = int(len(valid) - np.count_nonzero(valid))
+    if invalid_count:
+        log.warning("%d data point diabaikan: nilai tidak valid (NaN/Inf)", invalid_count)
+    times = times[valid]
+    heights = heights[valid]
+    if len(times) == 0:
+        raise ValueError("Tidak ada data valid untuk disimpan.")
+
+    # Tata letak sama dengan DataFrame.to_excel sebelumnya (dibaca load_run_xlsx)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Sheet1")
+    sheet.append(["Waktu (detik)", f"Tinggi {ball_type} (cm)", "Tinggi Sensor (cm)", "Jenis Bola"])
+    sensor_height = float(sensor_height)
+    ball_type = str(ball_type)
+    for start in range(0, len(times), XLSX_CHUNK):
+        stop = start + XLSX_CHUNK
+        for t, h in zip(times[start:stop].tolist(), heights[start:stop].tolist()):
+            sheet.append([t, h, sensor_height, ball_type])
+        if progress is not None:
+            progress(min(stop, len(times)) / len(times))
+    workbook.save(xlsx_path)
+
+    # Salinan kolumnar (.npz float32) untuk alat analisis batch, dimuat jauh lebih cepat dari xlsx
+    if xlsx_path.lower().endswith(".xlsx"):
+        write_run(os.path.splitext(xlsx_path)[0] + ".npz", times, heights, sensor_height, ball_type)
+    return len(times)
@@ -0,0 +1,155 @@
+import numpy as np
+
+
+class SampleStore:
+    """Preallocated float64 storage for (time, ball height) samples.
+
+    Data is kept in NumPy arrays that grow by doubling, so appending a sample
+    is O(1) amortized and `times` / `heights` return zero-copy views that can
+    be handed straight to matplotlib, scipy and numpy without converting the
+    whole history every frame.
+
+    If `max_samples` is given the store runs in ring mode: only the newest
+    `max_samples` samples are kept. Each sample is written twice (at `i` and
+    `i + max_samples`) so the window is always one contiguous slice and the
+    views stay zero-copy.
+    """
+
+    def __init__(self, initial_capacity=1024, max_samples=None):
+        if max_samples is not None and max_samples < 1:
+            raise ValueError("max_samples harus >= 1")
+
+        self.max_samples = max_samples
+        if max_samples is not None:
+            capacity = 2 * max_samples
+        else:
+            capacity = max(int(initial_capacity), 16)
+
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._heights = np.empty(capacity, dtype=np.float64)
+        self._start = 0
+        self._count = 0
+        self.total_count = 0  # jumlah sampel yang pernah ditambahkan (termasuk yang sudah terbuang)
+        self.version = 0      # naik setiap kali isi store berubah
+        self.generation = 0   # naik setiap clear(): data lama diganti, bukan ditambah
+
+    def __len__(self):
+        return self._count
+
+    @property
+    def capacity(self):
+        return self.max_samples if self.max_samples is not None else len(self._times)
+
+    @property
+    def first_index(self):
+        """Absolute index (0-based, since the last clear) of the oldest sample kept."""
+        return self.total_count - self._count
+
+    @property
+    def times(self):
+        """Zero-copy view of the stored timestamps (seconds)."""
+        return self._view(self._times)
+
+    @property
+    def heights(self):
+        """Zero-copy view of the stored ball heights (cm)."""
+        return self._view(self._heights)
+
+    def _view(self, buffer):
+        view = buffer[self._start:self._start + self._count]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        """Return the newest (time, height) pair, or None if the store is empty."""
+        if self._count == 0:
+            return None
+        i = self._start + self._count - 1
+        return float(self._times[i]), float(self._heights[i])
+
+    def append(self, t, h):
+        """Append a single sample."""
+        if self.max_samples is not None:
+            cap = self.max_samples
+            pos = (self._start + self._count) % cap
+            self._times[pos] = self._times[pos + cap] = t
+            self._heights[pos] = self._heights[pos + cap] = h
+            if self._count == cap:
+                self._start = (self._start + 1) % cap
+            else:
+                self._count += 1
+            self.total_count += 1
+            self.version += 1
+        else:
+            if self._count == len(self._times):
+                self._grow(self._count + 1)
+            self._times[self._count] = t
+            self._heights[self._count] = h
+            self._count += 1
+            self.total_count += 1
+            self.version += 1
+
+    def extend(self, times, heights):
+        """Append a batch of samples in one vectorized copy."""
+        times = np.asarray(times, dtype=np.float64).ravel()
+        heights = np.asarray(heights, dtype=np.float64).ravel()
+        if len(times) != len(heights):
+            raise ValueError(f"Panjang data tidak sama: waktu {len(times)}, tinggi {len(heights)}")
+        n = len(times)
+        if n == 0:
+            return
+
+        if self.max_samples is not None:
+            self._ring_write(times, heights)
+            return
+
+        if self._count + n > len(self._times):
+            self._grow(self._count + n)
+        self._times[self._count:self._count + n] = times
+        self._heights[self._count:self._count + n] = heights
+        self._count += n
+        self.total_count += n
+        self.version += 1
+
+    def clear(self):
+        """Drop all samples while keeping the allocated buffers."""
+        self._start = 0
+        self._count = 0
+        self.total_count = 0
+        self.version += 1
+        self.generation += 1
+
+    def _grow(self, needed):
+        new_capacity = len(self._times)
+        while new_capacity < needed:
+            new_capacity *= 2
+        for name in ("_times", "_heights"):
+            old = getattr(self, name)
+            new = np.empty(new_capacity, dtype=np.float64)
+            new[:self._count] = old[:self._count]
+            setattr(self, name, new)
+
+    def _ring_write(self, times, heights):
+        cap = self.max_samples
+        n = len(times)
+        if n > cap:
+            # Hanya sampel terbaru yang muat di ring
+            times = times[-cap:]
+            heights = heights[-cap:]
+            self.total_count += n - cap
+            n = cap
+
+        # Posisi tulis logis dalam ring [0, cap)
+        write_pos = (self._start + self._count) % cap
+        idx = (write_pos + np.arange(n)) % cap
+        for buffer, values in ((self._times, times), (self._heights, heights)):
+            buffer[idx] = values
+            buffer[idx + cap] = values  # salinan cermin agar jendela selalu kontigu
+
+        self._count += n
+        self.total_count += n
+        if self._count > cap:
+            overflow = self._count - cap
+            self._start = (self._start + overflow) % cap
+            self._count = cap
+        self.version += 1
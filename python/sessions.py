@@ -0,0 +1,136 @@
+from analysis_cache import AnalysisCache
+from bounce_detector import StreamingBounceDetector
+from perf_monitor import monitor as perf
+from resampling import estimate_rate
+from run_journal import JournalWriter, new_journal_path
+from sample_store import SampleStore
+from streaming_filter import StreamingLowpass
+
+RATE_WINDOW = 64  # sampel terakhir untuk memperkirakan laju sampel live
+
+
+class DeviceSession:
+    """Everything that belongs to one measuring rig, keyed by its `device` ID.
+
+    Each session has its own sample store, causal live filter, bounce
+    detectors, analysis cache and result, so several rigs publishing to the same
+    topic never mix their runs. With `adaptive_rate` the live filter follows
+    the sample rate estimated from the timestamps instead of a fixed `fs`.
+    """
+
+    def __init__(self, device, detection, lowpass, max_samples=None, adaptive_rate=False):
+        self.device = device
+        self.adaptive_rate = adaptive_rate
+        self.samples = SampleStore(max_samples=max_samples)
+        self.filtered_samples = SampleStore(max_samples=max_samples)
+        self.live_filter = StreamingLowpass(*lowpass)
+        self.bounce_detector = StreamingBounceDetector(*detection)
+        self.plot_bounce_detector = StreamingBounceDetector(*detection)
+        self.start_time = None
+        self.latest_analysis_text = ""
+        self.latest_analysis_record = None
+        self.analysis_cache = AnalysisCache()  # hasil turunan per (versi data, parameter)
+        self.journal = None       # JournalWriter aktif selama pengumpulan
+        self.journal_path = None  # jurnal terakhir yang sudah selesai
+        self.trial_segmenter = None  # TrialSegmenter pada mode kontinu
+        self.trials = []             # percobaan yang sudah dianalisis & disimpan (TrialOutcome)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def extend(self, times, heights):
+        """Store a batch of (time, height) samples and feed the filter and detectors."""
+        with perf.stage("store"):
+            self.samples.extend(times, heights)
+            if self.journal is not None:
+                self.journal.append(times, heights)
+
+        # Filter kausal inkremental untuk grafik real-time
+        with perf.stage("filter"):
+            if self.adaptive_rate:
+                self.live_filter.set_rate(estimate_rate(self.samples.times[-RATE_WINDOW:]))
+            filtered = self.live_filter.process(heights)
+            self.filtered_samples.extend(times, filtered)
+
+        with perf.stage("detect"):
+            self.bounce_detector.extend(times, heights)
+            self.plot_bounce_detector.extend(times, filtered)
+
+    def configure_detection(self, detection):
+        """Apply new detection settings, re-feeding stored samples if they changed."""
+        for detector, store in ((self.bounce_detector, self.samples),
+                                (self.plot_bounce_detector, self.filtered_samples)):
+            if detector.configure(*detection):
+                detector.extend(store.times, store.heights)
+
+    def open_journal(self, metadata):
+        """Start journaling this session to disk; samples already stored are written first."""
+        if self.journal is None:
+            self.journal = JournalWriter(new_journal_path(self.device), metadata)
+            if len(self.samples):
+                self.journal.append(self.samples.times, self.samples.heights)
+        return self.journal
+
+    def close_journal(self):
+        """Finalize the active journal (if any) and return the latest journal path."""
+        if self.journal is not None:
+            path = self.journal.close()
+            self.journal = None
+            if path is not None:
+                self.journal_path = path
+        return self.journal_path
+
+    def reset(self):
+        """Drop all samples and results of this device."""
+        self.close_journal()
+        self.journal_path = None
+        self.samples.clear()
+        self.filtered_samples.clear()
+        self.live_filter.reset()
+        self.bounce_detector.reset()
+        self.plot_bounce_detector.reset()
+        self.start_time = None
+        self.latest_analysis_text = ""
+        self.latest_analysis_record = None
+        self.analysis_cache.clear()
+        self.trial_segmenter = None
+        self.trials = []
+
+
+class SessionRegistry:
+    """Dictionary of DeviceSession objects; routing a message is one dict lookup."""
+
+    def __init__(self, detection, lowpass, max_samples=None, adaptive_rate=False):
+        self.detection = tuple(detection)
+        self.lowpass = tuple(lowpass)
+        self.max_samples = max_samples
+        self.adaptive_rate = adaptive_rate
+        self._sessions = {}
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, device):
+        return device in self._sessions
+
+    def __iter__(self):
+        return iter(list(self._sessions.values()))
+
+    def devices(self):
+        """Device IDs in order of first appearance."""
+        return list(self._sessions)
+
+    def get(self, device):
+        """Return the session for `device`, creating it on first use."""
+        session = self._sessions.get(device)
+        if session is None:
+            session = DeviceSession(device, self.detection, self.lowpass, self.max_samples,
+                                    self.adaptive_rate)
+            self._sessions[device] = session
+        return session
+
+    def configure_detection(self, detection):
+        """Apply detection settings to every session."""
+        self.detection = tuple(detection)
+        for session in self._sessions.values():
+            session.configure_detection(self.detection)
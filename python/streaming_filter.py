@@ -0,0 +1,74 @@
+from functools import lru_cache
+
+import numpy as np
+
+MAX_NORMAL_CUTOFF = 0.9  # cutoff dibatasi di bawah Nyquist jika laju sampel turun
+RATE_TOLERANCE = 0.1     # perubahan laju relatif yang memicu koefisien baru
+
+
+@lru_cache(maxsize=32)
+def butter_lowpass(cutoff, fs, order):
+    """Return cached Butterworth low-pass coefficients (b, a) and the unit initial state.
+
+    A cutoff at or above the Nyquist frequency of `fs` is lowered to just
+    below it, so a slower sample rate weakens the filter instead of failing.
+    """
+    from scipy.signal import butter, lfilter_zi  # impor lazily: scipy.signal lambat dimuat
+
+    nyq = 0.5 * fs
+    normal_cutoff = min(cutoff / nyq, MAX_NORMAL_CUTOFF)
+    b, a = butter(order, normal_cutoff, btype='low', analog=False)
+    zi = lfilter_zi(b, a)
+    for arr in (b, a, zi):
+        arr.flags.writeable = False  # dipakai bersama oleh semua pemanggil
+    return b, a, zi
+
+
+class StreamingLowpass:
+    """Causal Butterworth low-pass that carries the `lfilter` state between calls.
+
+    Samples can be fed one at a time or in chunks; the output is identical to
+    running `lfilter` once over the whole series (with the initial state set
+    from the first sample), but the cost only depends on the new samples.
+    """
+
+    def __init__(self, cutoff=5, fs=20, order=4):
+        self.cutoff = cutoff
+        self.fs = fs
+        self.order = order
+        self.reset()
+
+    def reset(self):
+        """Forget the filter state; the next sample re-initialises it."""
+        self._zi = None
+        self._last = None
+
+    def set_rate(self, fs):
+        """Follow a changed sample rate (Hz) estimated from the timestamps.
+
+        Small changes (jitter) are ignored. On a real change the coefficients
+        are recomputed and the state restarts in steady state at the last
+        input sample, like at the start of a run. Returns True if it changed.
+        """
+        if fs is None or abs(fs - self.fs) <= RATE_TOLERANCE * self.fs:
+            return False
+        self.fs = fs
+        if self._zi is not None:
+            _, _, zi = butter_lowpass(self.cutoff, self.fs, self.order)
+            self._zi = zi * self._last
+        return True
+
+    def process(self, values):
+        """Filter a chunk of new samples and return the filtered chunk."""
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return values
+        from scipy.signal import lfilter
+
+        b, a, zi = butter_lowpass(self.cutoff, self.fs, self.order)
+        if self._zi is None:
+            # Mulai dari kondisi tunak pada sampel pertama agar tidak ada lonjakan awal
+            self._zi = zi * values[0]
+        filtered, self._zi = lfilter(b, a, values, zi=self._zi)
+        self._last = values[-1]
+        return filtered
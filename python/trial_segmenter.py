@@ -0,0 +1,295 @@
+"""Segmentasi otomatis percobaan untuk akuisisi kontinu.
+
+Tanpa START/STOP per percobaan, aliran tinggi bola dipecah menjadi
+percobaan bernomor: bola diam (dipegang di atas atau tergeletak di lantai)
+-> jatuh & memantul -> diam lagi. "Diam" berarti selama REST_SECONDS
+rentang tinggi (max - min) tidak melebihi REST_TOLERANCE; percobaan
+dimulai pada sampel diam terakhir sebelum bola bergerak dan berakhir pada
+sampel pertama periode diam berikutnya. Jendela diam dihitung dalam
+sampel dari laju sampel yang diperkirakan dari timestamp, dan pemindaian
+hanya meliputi sampel baru setiap batch.
+
+Setiap percobaan yang selesai dianalisis dan disimpan oleh TrialPipeline
+di satu thread pekerja (run .npz bernomor + record .json), sementara
+akuisisi tetap berjalan di thread Tk. Segmen yang bukan jatuhan (bola
+diangkat ke posisi lepas) atau tidak menghasilkan koefisien tidak disimpan.
+
+    segmenter = TrialSegmenter("ESP_Device")
+    pipeline = TrialPipeline("../data/sesi-kontinu")
+    for trial in segmenter.extend(times, heights):
+        pipeline.submit(trial, "Bola Bekel", 35.0, settings)
+    for outcome in pipeline.poll():
+        print(outcome.trial.index, outcome.status, outcome.path)
+"""
+import os
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+import analysis_core
+from app_logging import get_logger
+from resampling import estimate_rate, seconds_to_samples
+from run_archive import parse_run_filename, run_filename, write_run
+
+REST_SECONDS = 1.0        # lama bola harus diam agar dianggap berhenti/dipegang
+REST_TOLERANCE = 2.0      # cm, rentang tinggi maksimum selama diam (derau + kuantisasi 1 cm)
+MIN_REST_SAMPLES = 5      # jendela diam minimum (sampel) pada laju rendah
+MAX_TRIAL_SECONDS = 60.0  # percobaan yang tidak pernah diam dipotong (bola menggelinding, dll.)
+RATE_WINDOW = 64          # sampel terakhir untuk memperkirakan laju sampel
+
+log = get_logger("trials")
+
+
+class Trial:
+    """One segmented trial: the samples from the last rest sample before the
+    drop to the first sample of the following rest.
+
+    `start_level` / `end_level` are the rest heights before and after;
+    `complete` is False for a trial cut by MAX_TRIAL_SECONDS or by the end
+    of acquisition instead of a rest period.
+    """
+
+    def __init__(self, index, device, times, heights, start_level, end_level, complete=True):
+        self.index = index
+        self.device = device
+        self.times = times
+        self.heights = heights
+        self.start_level = start_level
+        self.end_level = end_level
+        self.complete = complete
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return float(self.times[-1] - self.times[0]) if len(self.times) else 0.0
+
+    @property
+    def fall(self):
+        """Highest point above the final rest height (cm); small for a ball being lifted."""
+        return float(self.heights.max() - self.end_level) if len(self.heights) else 0.0
+
+
+class TrialSegmenter:
+    """Streaming rest/active state machine over the samples of one device.
+
+    `extend()` takes each new batch and returns the trials that ended in
+    it. Only the samples of the open trial (or, at rest, the last rest
+    window) are kept, so memory does not grow with the session length.
+    """
+
+    def __init__(self, device=None, rest_seconds=REST_SECONDS, tolerance=REST_TOLERANCE,
+                 max_seconds=MAX_TRIAL_SECONDS):
+        self.device = device
+        self.rest_seconds = rest_seconds
+        self.tolerance = tolerance
+        self.max_seconds = max_seconds
+        self.count = 0
+        self.reset()
+
+    def reset(self):
+        self._times = np.empty(0)
+        self._heights = np.empty(0)
+        self.active = False
+        self.level = None         # tinggi diam saat ini (median jendela diam)
+        self._start = 0           # indeks awal percobaan yang sedang berjalan
+        self._start_level = None
+        self._scan = 0            # sampel berikutnya yang belum diperiksa
+
+    def _window(self):
+        fs = estimate_rate(self._times[-RATE_WINDOW:])
+        if fs is None:
+            return None
+        return max(MIN_REST_SAMPLES, seconds_to_samples(self.rest_seconds, fs))
+
+    def extend(self, times, heights):
+        """Add a batch of samples; return the list of trials that finished."""
+        self._times = np.concatenate((self._times, np.asarray(times, dtype=np.float64)))
+        self._heights = np.concatenate((self._heights, np.asarray(heights, dtype=np.float64)))
+        window = self._window()
+        if window is None or len(self._heights) < window:
+            return []
+
+        trials = []
+        while self._scan < len(self._heights):
+            if not self.active:
+                if not self._find_start(window):
+                    break
+            else:
+                trial = self._find_end(window)
+                if trial is None:
+                    break
+                trials.append(trial)
+        self._trim(window)
+        return trials
+
+    def flush(self):
+        """End the open trial at the last sample (acquisition stopped); None if at rest."""
+        if not self.active or len(self._heights) - self._start < 2:
+            return None
+        return self._emit(len(self._heights), float(self._heights[-1]), False)
+
+    def _find_start(self, window):
+        heights = self._heights
+        if self.level is None:
+            self.level = float(np.median(heights[:window]))
+        moved = np.flatnonzero(np.abs(heights[self._scan:] - self.level) > self.tolerance)
+        if len(moved) == 0:
+            # Masih diam: tinggi acuan mengikuti jendela terakhir (tangan bergeser pelan)
+            self.level = float(np.median(heights[-window:]))
+            self._scan = len(heights)
+            return False
+        first = self._scan + int(moved[0])
+        self.active = True
+        self._start = max(first - 1, 0)  # sampel diam terakhir sebelum bola bergerak
+        self._start_level = self.level
+        self._scan = first
+        return True
+
+    def _find_end(self, window):
+        heights = self._heights
+        n = len(heights)
+        # Jendela diam harus seluruhnya setelah awal percobaan
+        first = max(self._scan, self._start + window)
+        if first < n:
+            spans = np.ptp(sliding_window_view(heights[first - window + 1:], window), axis=1)
+            quiet = np.flatnonzero(spans <= self.tolerance)
+            if len(quiet):
+                end = first + int(quiet[0])
+                rest = end - window + 1
+                trial = self._emit(rest + 1, float(np.median(heights[rest:end + 1])), True)
+                self._scan = end + 1
+                return trial
+        self._scan = max(self._scan, n)
+        if self._times[-1] - self._times[self._start] > self.max_seconds:
+            log.warning("Percobaan %s #%d tidak berhenti dalam %.0f detik, dipotong",
+                        self.device, self.count + 1, self.max_seconds)
+            return self._emit(n, float(heights[-1]), False)
+        return None
+
+    def _emit(self, stop, end_level, complete):
+        self.count += 1
+        trial = Trial(self.count, self.device, self._times[self._start:stop].copy(),
+                      self._heights[self._start:stop].copy(), self._start_level, end_level, complete)
+        self.active = False
+        self.level = end_level
+        self._scan = stop
+        return trial
+
+    def _trim(self, window):
+        # Buang sampel yang tidak lagi dibutuhkan (di luar percobaan / jendela diam terakhir)
+        cut = self._start if self.active else max(0, self._scan - window)
+        if cut > 0:
+            self._times = self._times[cut:]
+            self._heights = self._heights[cut:]
+            self._start = max(self._start - cut, 0)
+            self._scan -= cut
+
+
+class TrialOutcome:
+    """Result of processing one trial on the worker thread.
+
+    `status` is the `analyze_run` status, "no_drop" for a segment that
+    is not a drop, or "error". Only trials with status "ok" are saved;
+    `number` is their trial number in the file name.
+    """
+
+    def __init__(self, trial, ball_type, status, result=None, number=None, path=None, error=None):
+        self.trial = trial
+        self.ball_type = ball_type
+        self.status = status
+        self.result = result
+        self.number = number
+        self.path = path
+        self.error = error
+
+    @property
+    def coefficient(self):
+        stats = self.result["stats"] if self.result else None
+        return stats["mean"] if stats else None
+
+
+class TrialPipeline:
+    """Analyze and persist finished trials on one background worker.
+
+    A single worker keeps the trial numbers in order and the disk writes
+    sequential; the Tk thread only submits trials and polls `poll()` for
+    outcomes. Runs are numbered per ball type after the runs that already
+    exist in `output_dir`, so the folder can be read by batch_analysis.
+    """
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="trial")
+        self._outcomes = queue.SimpleQueue()
+        self._numbers = {}  # jenis bola -> nomor percobaan terakhir
+
+    def submit(self, trial, ball_type, sensor_height, settings):
+        """Queue a trial; `settings` are analyze_run keyword arguments (copied)."""
+        self.pending += 1
+        self._executor.submit(self._process, trial, ball_type, sensor_height, dict(settings))
+
+    def poll(self):
+        """Outcomes finished since the last call (Tk thread)."""
+        outcomes = []
+        while True:
+            try:
+                outcomes.append(self._outcomes.get_nowait())
+            except queue.Empty:
+                break
+        self.pending -= len(outcomes)
+        return outcomes
+
+    def shutdown(self, wait=True):
+        """Finish (or abandon) the queued trials and stop the worker."""
+        self._executor.shutdown(wait=wait)
+
+    def _next_number(self, ball_type):
+        if ball_type not in self._numbers:
+            existing = [0]
+            if os.path.isdir(self.output_dir):
+                for filename in os.listdir(self.output_dir):
+                    parsed = parse_run_filename(filename)
+                    if parsed and parsed[0] == ball_type:
+                        existing.append(parsed[1])
+            self._numbers[ball_type] = max(existing)
+        self._numbers[ball_type] += 1
+        return self._numbers[ball_type]
+
+    def _process(self, trial, ball_type, sensor_height, settings):
+        try:
+            outcome = self._analyze_and_save(trial, ball_type, sensor_height, settings)
+        except Exception as e:
+            log.exception("Gagal memproses percobaan %s #%d: %s", trial.device, trial.index, e)
+            outcome = TrialOutcome(trial, ball_type, "error", error=e)
+        self._outcomes.put(outcome)
+
+    def _analyze_and_save(self, trial, ball_type, sensor_height, settings):
+        min_height = settings.get("min_height") or analysis_core.DEFAULT_SETTINGS["min_height"]
+        if trial.fall < min_height:
+            log.debug("Segmen %s #%d bukan jatuhan (tinggi maks %.1f cm di atas posisi akhir)",
+                      trial.device, trial.index, trial.fall)
+            return TrialOutcome(trial, ball_type, "no_drop")
+
+        # Waktu setiap percobaan dimulai dari 0 seperti pada mode START/STOP
+        times = trial.times - trial.times[0]
+        result = analysis_core.analyze_run(times, trial.heights, **settings)
+        if result["status"] != "ok":
+            log.info("Percobaan %s #%d tidak disimpan: %s", trial.device, trial.index, result["status"])
+            return TrialOutcome(trial, ball_type, result["status"], result)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        number = self._next_number(ball_type)
+        path = os.path.join(self.output_dir, run_filename(ball_type, number))
+        write_run(path, times, trial.heights, sensor_height, ball_type)
+        record = analysis_core.build_record(
+            result, ball_type, sensor_height, trial=number, device=trial.device,
+            segment=trial.index, complete=trial.complete, source=os.path.basename(path))
+        analysis_core.save_record(analysis_core.record_path(path), record)
+        log.info("Percobaan %s #%d disimpan sebagai %s (e = %.3f)",
+                 trial.device, trial.index, os.path.basename(path), result["stats"]["mean"])
+        return TrialOutcome(trial, ball_type, "ok", result, number, path)